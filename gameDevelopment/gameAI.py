@@ -0,0 +1,1099 @@
+
+import argparse
+import math
+import os
+import random
+import threading
+import time
+from array import array
+from collections import deque, namedtuple
+
+import gameV1_3_2 as game
+
+# ====== 电脑对手 ======
+# 所有 AI 都是“策略”：接收一个 Match，返回当前决定方要执行的动作（动作编码见 gameV1_3_2 的 ACTION_*），
+# 所以既可以直接传给 simulate_match，也可以在人机对战里坐一个座位。
+
+def state_key(match):
+    # 搜索树的局面键：(回合数, Zobrist 键)。Zobrist 键与手牌顺序无关，镜像局面相同（见 Match.zobrist_key），
+    # 所以树上的统计都以节点的当前行动方为视角；回合数放在最前面，方便丢掉已经过去的回合
+    return match.turn, match.zobrist_key()
+
+def evaluate(match, seat):
+    # 未分胜负时的局面估值（seat 一方的胜率估计，0-1）：比较双方最危险的一条属性
+    if match.done:
+        if match.winner is None:
+            return 0.5
+        return 1.0 if match.winner == seat else 0.0
+    mine = min(match.players[seat].stat_values)
+    theirs = min(match.players[1 - seat].stat_values)
+    return min(0.95, max(0.05, 0.5 + 0.1 * (mine - theirs)))
+
+def search_actions(match):
+    # 搜索时考虑的动作：投降永远不会比结束回合更好，不参与搜索；
+    # 行动力不能留到下回合，估值和短推演都看不到提前结束回合的损失，所以只有手里全是期望收益为负的牌时才考虑结束回合
+    actions = [action for action in match.legal_actions() if action != game.ACTION_SURRENDER]
+    if match.phase == game.PHASE_PLAY and any(CARD_WORTH[card_id] >= 0 for card_id in match.current.hand):
+        actions.remove(game.ACTION_END_TURN)
+    return actions
+
+def book_action(book, match):
+    # 搜索之前先查开局库（gameBook.OpeningBook），没有开局库或者查不到时返回 None
+    return None if book is None else book.choose(match)
+
+def _move_of(match, action):
+    # 手牌动作按卡牌编号识别（-1-编号）：局面键不区分手牌顺序，同一张牌无论在第几个位置都是同一个动作
+    if action < game.ACTION_END_TURN:
+        return -1 - match.current.hand[action]
+    return action
+
+def _action_of(match, move):
+    if move >= 0:
+        return move
+    return match.current.hand.index(-1 - move)
+
+# ====== 卡牌期望值 ======
+# 在哑玩家身上用预设点数（_next_roll_value，与调试卡牌同一机制）逐点打出每张卡，得到：
+#   CARD_OUTCOMES[编号]  骰子结果的等价类 [(代表点数, 概率)]，效果和子区间都相同的点数合成一类；没有骰子为 [(None, 1.0)]
+#   CARD_EV[编号]        (使用者属性期望变化, 目标属性期望变化, 跳过回合概率, 300龟概率, 延迟效果的SAN)
+#   CARD_WORTH[编号]     把 CARD_EV 折算成一个数：己方收益 + 对方损失
+#   CARD_CLASSES[编号]   每个等价类的 (概率, 子区间占比, 使用者属性变化, 目标属性变化, 跳过回合, 300龟, 延迟SAN,
+#                        给目标的虚环递归次数, 给目标的裘罗标记)，
+#                        子区间占比是整个骰子范围里落在同一子区间的比例，虚环之匣的递归判定每次都要落回这个子区间
+# 曼妥思之神这类卡内部还有第二次掷骰，每个点数都用同样的随机种子打 PROBE_SAMPLES 次取平均。
+PROBE_SAMPLES = 8
+SKIP_WORTH = 2.0     # 对方跳过一回合约等于少挨一回合的伤害
+TURTLE_WORTH = 20.0  # 骰到300基本等于直接获胜
+
+CARD_OUTCOMES = []
+CARD_EV = []
+CARD_WORTH = []
+CARD_CLASSES = []
+
+def _probe_roll(card, roll):
+    # 返回该点数下 PROBE_SAMPLES 次结算的平均效果
+    totals = [0.0] * (2 * game.NUM_STATS + 5)
+    random.seed(0)
+    for _ in range(PROBE_SAMPLES):
+        user = game.Player("user", [])
+        target = game.Player("target", [])
+        for player in (user, target):
+            for i in range(game.NUM_STATS):
+                player._set_stat(i, game.DEFAULT_STAT_CAP // 2)
+        user._current_turn = 0
+        if roll is not None:
+            user._next_roll_value = roll
+        card.play(user, target)
+        user_delta = tuple(user.stat_modifiers)
+        delayed = 0
+        for _, effect in getattr(user, "_delayed_effects", ()):
+            before = user.stat_modifiers[game.STAT_SAN]
+            effect(user)
+            delayed += user.stat_modifiers[game.STAT_SAN] - before
+        values = (*user_delta, *target.stat_modifiers,
+                  getattr(target, "_skip_next_turn", False), getattr(user, "_pending_turtle_300", False),
+                  delayed, getattr(target, "_void_box_recursion", 0), getattr(target, "_qiu_luo_effect", False))
+        for i, value in enumerate(values):
+            totals[i] += value
+    return tuple(round(total / PROBE_SAMPLES, 6) for total in totals)
+
+def _outcome_class(card, effect, subrange, probability):
+    n = game.NUM_STATS
+    if subrange is None:
+        # 没有骰子的卡不受虚环之匣影响；有骰子但不在任何子区间里的点数，递归判定一定不通过
+        share = 1.0 if not card.dice_sides else 0.0
+    else:
+        rolls = range(card.min_value, card.dice_sides + 1)
+        same = sum(1 for roll in rolls
+                   if next((i for i, (low, high) in enumerate(card.subranges) if low <= roll <= high), None) == subrange)
+        share = same / len(rolls)
+    return (probability, share, effect[:n], effect[n:2 * n], *effect[2 * n:])
+
+def _build_card_values():
+    state = random.getstate()
+    try:
+        with game.headless_mode():
+            for card in game.CARD_REGISTRY:
+                if not card.dice_sides:
+                    classes = {(_probe_roll(card, None), None): [None, 1]}
+                else:
+                    classes = {}
+                    for roll in range(card.min_value, card.dice_sides + 1):
+                        subrange = next((i for i, (low, high) in enumerate(card.subranges) if low <= roll <= high), None)
+                        key = (_probe_roll(card, roll), subrange)
+                        classes.setdefault(key, [roll, 0])[1] += 1
+                total = sum(count for _, count in classes.values())
+                CARD_OUTCOMES.append(tuple((roll, count / total) for roll, count in classes.values()))
+                CARD_CLASSES.append(tuple(_outcome_class(card, effect, subrange, count / total)
+                                          for (effect, subrange), (_, count) in classes.items()))
+                ev = [0.0] * (2 * game.NUM_STATS + 3)
+                for (effect, _), (_, count) in classes.items():
+                    for i in range(len(ev)):
+                        ev[i] += effect[i] * count / total
+                n = game.NUM_STATS
+                user_delta, target_delta = tuple(ev[:n]), tuple(ev[n:2 * n])
+                skip, turtle, delayed = ev[2 * n:]
+                CARD_EV.append((user_delta, target_delta, skip, turtle, delayed))
+                CARD_WORTH.append(sum(user_delta) - sum(target_delta) + delayed
+                                  + SKIP_WORTH * skip + TURTLE_WORTH * turtle)
+    finally:
+        random.setstate(state)
+
+_build_card_values()
+
+# 局面估值：每条属性按 sqrt 计分（越低的属性每一点越值钱），再加上手牌按 CARD_WORTH 折算的潜在收益
+HAND_WEIGHT = 0.2
+EVAL_SCALE = 0.6
+STAT_SCORE = [3.0 * math.sqrt(max(0, v)) for v in range(game.DEFAULT_STAT_CAP + 1)]
+
+def _player_score(player):
+    score = 0.0
+    for value in player.stat_values:
+        score += STAT_SCORE[min(max(value, 0), game.DEFAULT_STAT_CAP)]
+    worth = CARD_WORTH
+    score += HAND_WEIGHT * sum([worth[card_id] for card_id in player.hand])
+    return score
+
+def ev_evaluate(match, seat):
+    # 基于卡牌期望值的局面估值（seat 一方的胜率估计，0-1）
+    if match.done:
+        if match.winner is None:
+            return 0.5
+        return 1.0 if match.winner == seat else 0.0
+    diff = _player_score(match.players[seat]) - _player_score(match.players[1 - seat])
+    return 1.0 / (1.0 + math.exp(-EVAL_SCALE * diff))
+
+def tablebase_evaluator(tablebase, fallback=evaluate):
+    # 用残局库（gameTablebase.Tablebase）作搜索的叶子估值，参数与 evaluate 一致；
+    # 不在表里的局面（属性超过上限、带负行动力）交给 fallback
+    def evaluator(match, seat):
+        value = tablebase.evaluate(match, seat)
+        return fallback(match, seat) if value is None else value
+    return evaluator
+
+# ====== 贪心策略 ======
+# 一步贪心：手里每张牌按 CARD_CLASSES 算出打出后双方属性得分（STAT_SCORE 的 3·sqrt）期望变化多少，出最大的一张。
+# 行动力留不到下回合，手牌留着还会被弃牌上限挤掉，所以只有每张牌都会亏（比如会把自己打死）时才结束回合。
+# 和 CARD_WORTH 的区别是看当前局面：
+#   - 回复按属性上限（stat_caps，默认 10）截断，满血满 SAN 时回复牌不值钱；属性降到 0 按胜负计（WIN_WORTH）
+#   - 自己带着 n 次虚环递归时，骰子牌的每个结果只有 子区间占比**n 的概率生效；骰子牌会把递归用掉，
+#     行动力还够的话再加上手里其他骰子牌因此挽回的收益（RECURSION_LOSS）
+#   - 虚环之匣按对方下一张骰子牌的平均损失（VOID_WORTH）计价，会覆盖对方身上已有的递归，只算增量
+#   - 裘罗只会让终端里的骰子闪现变成乱码，对方已经有裘罗标记时再打没有任何效果
+# 弃牌阶段弃掉 KEEP_WORTH 最低的牌；300龟选对方最低的一条属性（任何属性 -300 都直接归零，行动力只是停几个回合）。
+# 每个决定不到十微秒，可以直接坐一个座位，也可以作为 MCTS/ISMCTS 的推演策略（rollout_policy=greedy_policy）；
+# 这个游戏运气成分很大，推演换成贪心策略实测看不出棋力差别，迭代次数却少两成，所以默认仍是随机推演。
+WIN_WORTH = 100.0
+QIU_LUO_WORTH = 0.25
+
+GREEDY_CLASSES = []  # [编号] → ((概率, 子区间占比, 使用者变化, 目标变化, 固定收益, 虚环递归次数或 None, 裘罗), ...)
+RECURSION_LOSS = []  # [编号][n] 带着 n 次虚环递归打出这张牌损失的静态收益
+VOID_WORTH = []      # [n] 让对方带上 n 次虚环递归的收益（按一副牌的构成平均）
+KEEP_WORTH = []      # [编号] 留在手里的静态价值，弃牌时用
+
+def _class_worth(cls):
+    # 单个等价类的静态收益，口径与 CARD_WORTH 相同
+    _, _, user_delta, target_delta, skip, turtle, delayed, _, _ = cls
+    return sum(user_delta) - sum(target_delta) + delayed + SKIP_WORTH * skip + TURTLE_WORTH * turtle
+
+def _build_greedy_tables():
+    depth = round(max(cls[7] for classes in CARD_CLASSES for cls in classes))
+    for classes in CARD_CLASSES:
+        RECURSION_LOSS.append(tuple(sum(cls[0] * (1.0 - cls[1] ** n) * _class_worth(cls) for cls in classes)
+                                    for n in range(depth + 1)))
+    prototypes = game.playable_prototypes()
+    copies = game.deck_composition(prototypes, game.DEFAULT_DECK_SIZE)
+    for n in range(depth + 1):
+        VOID_WORTH.append(sum(count * RECURSION_LOSS[game.intern_card(card)][n]
+                              for card, count in zip(prototypes, copies)) / sum(copies))
+    for card_id, classes in enumerate(CARD_CLASSES):
+        sets_void = any(cls[7] for cls in classes)
+        entries = []
+        for p, share, user_delta, target_delta, skip, turtle, delayed, void, qiu in classes:
+            # 延迟效果（鸡机）合并到 SAN 上计分，但不参与这一步的胜负判断
+            user_changes = tuple((i, delta, delayed if i == game.STAT_SAN else 0.0)
+                                 for i, delta in enumerate(user_delta) if delta or (delayed and i == game.STAT_SAN))
+            target_changes = tuple((i, delta) for i, delta in enumerate(target_delta) if delta)
+            entries.append((p, share, user_changes, target_changes, SKIP_WORTH * skip + WIN_WORTH * turtle,
+                            round(void) if sets_void else None, qiu))
+        GREEDY_CLASSES.append(tuple(entries))
+        keep = CARD_WORTH[card_id]
+        for p, _, _, _, _, void, qiu in entries:
+            keep += p * (QIU_LUO_WORTH * qiu + (VOID_WORTH[void] if void is not None else 0.0))
+        KEEP_WORTH.append(keep)
+
+_build_greedy_tables()
+
+def _play_worth(card_id, user, enemy, recursion):
+    # 当前局面下打出这张牌，双方属性得分差的期望变化
+    sqrt = math.sqrt
+    values, caps, enemy_values = user.stat_values, user.stat_caps, enemy.stat_values
+    worth = 0.0
+    for p, share, user_changes, target_changes, score, void, qiu in GREEDY_CLASSES[card_id]:
+        if recursion:
+            p *= share ** recursion
+            if not p:
+                continue
+        for i, delta, delayed in user_changes:
+            old = values[i]
+            new = min(caps[i], old + delta)
+            if new <= 0:
+                score = -WIN_WORTH
+                break
+            score += 3.0 * (sqrt(min(caps[i], new + delayed)) - sqrt(old))
+        else:
+            for i, delta in target_changes:
+                old = enemy_values[i]
+                new = old + delta
+                if new <= 0:
+                    score += WIN_WORTH
+                    break
+                score -= 3.0 * (sqrt(new) - sqrt(old))
+            if void is not None:
+                score += VOID_WORTH[void] - VOID_WORTH[min(getattr(enemy, "_void_box_recursion", 0), len(VOID_WORTH) - 1)]
+            if qiu and not getattr(enemy, "_qiu_luo_effect", False):
+                score += QIU_LUO_WORTH * qiu
+        worth += p * score
+    return worth
+
+def greedy_policy(match):
+    """一步贪心策略（见上面的说明）"""
+    current = match.current
+    hand = current.hand
+    if match.phase == game.PHASE_PLAY:
+        enemy = match.enemy
+        recursion = getattr(current, "_void_box_recursion", 0)
+        worths = {}
+        for card_id in hand:
+            if card_id not in worths:
+                worths[card_id] = _play_worth(card_id, current, enemy, recursion)
+        best, best_worth = game.ACTION_END_TURN, -1e-9
+        if recursion and match.actions_remaining > 1:
+            # 先用一张骰子牌把递归消耗掉，后面的骰子牌就能全额生效
+            level = min(recursion, len(VOID_WORTH) - 1)
+            losses = [RECURSION_LOSS[card_id][level] if game.CARD_REGISTRY[card_id].dice_sides else 0.0
+                      for card_id in hand]
+            for index, card_id in enumerate(hand):
+                worth = worths[card_id]
+                if game.CARD_REGISTRY[card_id].dice_sides:
+                    worth += max([loss for j, loss in enumerate(losses) if j != index], default=0.0)
+                if worth > best_worth:
+                    best, best_worth = index, worth
+            return best
+        for index, card_id in enumerate(hand):
+            if worths[card_id] > best_worth:
+                best, best_worth = index, worths[card_id]
+        return best
+    if match.phase == game.PHASE_DISCARD:
+        return min(range(len(hand)), key=lambda index: KEEP_WORTH[hand[index]])
+    if match.phase == game.PHASE_TURTLE_300:
+        values = match.enemy.stat_values
+        return game.ACTION_TURTLE_BASE + min(range(game.NUM_STATS), key=values.__getitem__)
+    return game.ACTION_END_TURN
+
+def metered_choice(bot, match):
+    # bot.choose_action(match)；打开追踪时把这个决定用掉的线程 CPU 记到 bot_cpu_ns
+    if game._tracer is None:
+        return bot.choose_action(match)
+    cpu = time.thread_time_ns()
+    try:
+        return bot.choose_action(match)
+    finally:
+        game.trace_count("bot_cpu_ns", time.thread_time_ns() - cpu)
+
+# ====== 蒙特卡洛树搜索 ======
+def _searching(deadline, stop):
+    if stop is not None and stop.is_set():
+        return False
+    return deadline is None or time.perf_counter() < deadline
+
+class _Node:
+    __slots__ = ("visits", "edges")
+
+    def __init__(self, match):
+        self.visits = 0
+        # 动作 → [访问次数, 累计收益]，收益以在这个局面做决定的一方为视角
+        self.edges = {_move_of(match, action): [0, 0.0] for action in search_actions(match)}
+
+    def select(self, exploration):
+        # UCT：没走过的动作优先
+        log_visits = math.log(self.visits + 1)
+        best, best_score = None, -1.0
+        for move, (visits, total) in self.edges.items():
+            if visits == 0:
+                return move
+            score = total / visits + exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+class MCTSBot:
+    """蒙特卡洛树搜索电脑对手
+
+    每次迭代从根局面的快照恢复，双方牌库重新洗牌（摸牌视为随机事件），然后沿树下行、展开一个新局面、
+    用 rollout_policy 随机推演 rollout_turns 个回合后用 evaluator 估值，再把结果回传到路径上的每一条边。
+    evaluator 默认是 evaluate，可以换成残局库（tablebase_evaluator）。
+    掷骰子就是机会节点：每次经过出牌动作都真实掷一次骰，按掷出的结果落到不同的子局面上，
+    所以一条动作边的统计就是它在骰子分布下的期望。
+    树以局面键为索引保存（同一局面只有一个节点，手牌顺序不同或双方镜像的局面也共用节点），
+    换手之后仍然能在表里找到当前局面，上一步的统计直接复用。
+
+    对手做决定时可以用 Ponderer 在后台线程里继续搜索（ponder），搜到的子树留在表里；
+    后台思考的时间从下一步的 time_budget 里扣除（至少保留 min_think），总计算量不变。
+    max_depth 限制树内下行的决策层数，更深的局面不再展开，直接推演。
+
+    注意：搜索会读取对手的手牌（完全信息），公平对局请使用 ISMCTSBot。
+    棋力用 gameStrength 按固定种子和迭代次数测。
+    """
+
+    def __init__(self, time_budget=0.2, exploration=0.7, rollout_policy=game.random_policy,
+                 rollout_turns=8, max_nodes=200000, max_iterations=None, min_think=0.02, max_depth=None, book=None,
+                 evaluator=evaluate):
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy
+        self.rollout_turns = rollout_turns
+        self.max_nodes = max_nodes
+        self.max_iterations = max_iterations
+        self.min_think = min_think
+        self.max_depth = max_depth
+        self.book = book
+        self.evaluator = evaluator
+        self.table = {}
+        self.last_iterations = 0
+        self.pondered = 0.0  # 上一步之后后台思考的累计时间
+
+    def __call__(self, match):
+        return metered_choice(self, match)
+
+    def reset(self):
+        self.table.clear()
+
+    def choose_action(self, match):
+        actions = search_actions(match)
+        if len(actions) == 1:
+            return actions[0]
+        action = book_action(self.book, match)
+        if action is not None:
+            return action
+        root = self._search(match, match.current_index, time.perf_counter() + self._think_time())
+        return _action_of(match, max(root.edges, key=lambda move: root.edges[move][0]))
+
+    def ponder(self, match, seat, stop):
+        """后台思考：seat 是本方座位，match 是对手要做决定的局面（副本），一直搜到 stop 被设置"""
+        start, cpu = time.perf_counter(), time.thread_time_ns()
+        self._search(match, seat, None, stop)
+        self.pondered += time.perf_counter() - start
+        game.trace_count("bot_cpu_ns", time.thread_time_ns() - cpu)
+
+    def _think_time(self):
+        think = max(self.min_think, self.time_budget - self.pondered)
+        self.pondered = 0.0
+        return think
+
+    def _search(self, match, seat, deadline, stop=None):
+        # 从 match 开始迭代到截止时间或 stop 被设置，返回根节点
+        self._prune(match.turn)
+        root = self._node(match)
+        snap = match.snapshot()
+        sim = match.clone()
+        iterations = 0
+        with game.headless_mode():
+            while _searching(deadline, stop):
+                if self.max_iterations is not None and iterations >= self.max_iterations:
+                    break
+                sim.restore(snap)
+                self._iterate(sim, root)
+                iterations += 1
+        self.last_iterations = iterations
+        return root
+
+    def _node(self, match):
+        key = state_key(match)
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = _Node(match)
+        return node
+
+    def _prune(self, turn):
+        # 丢掉已经过去的回合；表太大时整个清空
+        if len(self.table) > self.max_nodes:
+            self.table.clear()
+            return
+        stale = [key for key in self.table if key[0] < turn]
+        for key in stale:
+            del self.table[key]
+
+    def _iterate(self, match, root):
+        for player in match.players:
+            player._own_piles()
+            random.shuffle(player.deck)
+        path = []
+        node = root
+        while not match.done:
+            if self.max_depth is not None and len(path) >= self.max_depth:
+                self._rollout(match)
+                break
+            move = node.select(self.exploration)
+            path.append((node, move, match.current_index))
+            match.step(_action_of(match, move))
+            if match.done:
+                break
+            key = state_key(match)
+            child = self.table.get(key)
+            if child is None:
+                child = self.table[key] = _Node(match)
+                path.append((child, None, match.current_index))
+                self._rollout(match)
+                break
+            node = child
+        values = (self.evaluator(match, 0), self.evaluator(match, 1))
+        for node, move, mover in path:
+            node.visits += 1
+            if move is not None:
+                edge = node.edges[move]
+                edge[0] += 1
+                edge[1] += values[mover]
+
+    def _rollout(self, match):
+        stop = match.turn + self.rollout_turns
+        policy = self.rollout_policy
+        while not match.done and match.turn < stop:
+            match.step(policy(match))
+
+# ====== 信息集蒙特卡洛树搜索 ======
+# 公平的电脑对手不能读对手的手牌和任何人的牌库顺序。可以观察到的只有：
+#   - 双方一副牌的构成：只由牌堆大小决定（deck_composition），牌堆大小 = 手牌 + 牌库 + 弃牌堆张数
+#   - 弃牌堆：打出和弃掉的牌都会公开
+#   - 各处的张数、属性和状态标记
+# 所以对手“手牌 + 牌库”就是一副牌的构成减去他的弃牌堆，其中哪些在手里、牌库什么顺序都等可能。
+_compositions = {}
+
+def deck_multiset(deck_size, debug_mode=False):
+    # 一副牌的卡牌编号（已排序），按牌堆大小缓存
+    key = (deck_size, debug_mode)
+    if key not in _compositions:
+        prototypes = game.playable_prototypes(debug_mode)
+        copies = game.deck_composition(prototypes, deck_size)
+        ids = []
+        for card, count in zip(prototypes, copies):
+            ids.extend([game.intern_card(card)] * count)
+        _compositions[key] = sorted(ids)
+    return _compositions[key]
+
+def hidden_pool(player, debug_mode=False):
+    # 对手手牌 + 牌库可能包含的牌（多重集），只用到公开信息
+    size = len(player.hand) + len(player.deck) + len(player.discard)
+    pool = list(deck_multiset(size, debug_mode))
+    for card_id in player.discard:
+        if card_id in pool:
+            pool.remove(card_id)
+    hidden = len(player.hand) + len(player.deck)
+    if len(pool) < hidden:
+        # 构成对不上（例如开启了调试卡牌），用同一副牌的构成补齐
+        pool += random.choices(deck_multiset(size, debug_mode), k=hidden - len(pool))
+    return pool[:hidden] if len(pool) > hidden else pool
+
+def info_key(match, seat):
+    # seat 一方视角下的信息集键：对手的手牌和牌库只计张数（见 Match.zobrist_key 的 observer）
+    return match.turn, match.zobrist_key(observer=seat)
+
+class _InfoNode:
+    __slots__ = ("visits", "edges")
+
+    def __init__(self):
+        self.visits = 0
+        self.edges = {}  # 动作 → [访问次数, 累计收益, 可用次数]
+
+    def select(self, moves, exploration):
+        # 只在本次确定化中可用的动作里选，探索项用可用次数代替父节点访问次数
+        best, best_score = None, -1.0
+        for move in moves:
+            edge = self.edges.get(move)
+            if edge is None:
+                edge = self.edges[move] = [0, 0.0, 0]
+            edge[2] += 1
+            if best_score == math.inf:
+                continue
+            if edge[0] == 0:
+                best, best_score = move, math.inf
+                continue
+            score = edge[1] / edge[0] + exploration * math.sqrt(math.log(edge[2]) / edge[0])
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+class ISMCTSBot(MCTSBot):
+    """信息集蒙特卡洛树搜索电脑对手（单观察者版本）
+
+    每次迭代先抽一个与公开信息一致的确定化：对手的手牌和牌库从 hidden_pool 里随机分配，双方牌库重新洗牌，
+    然后在这个确定化上按 MCTSBot 的方式下行、展开和推演。树节点以本方视角的信息集（info_key）为键，
+    所有确定化都落在同一棵树上，共享子树；手牌动作按卡牌编号识别，选择时只考虑当前确定化里可用的动作。
+    确定化按 batch_size 成批生成（洗一次牌池切成手牌和牌库），单次只需几微秒。
+    """
+
+    def __init__(self, time_budget=0.2, exploration=0.7, rollout_policy=game.random_policy,
+                 rollout_turns=8, max_nodes=200000, max_iterations=None, batch_size=64, debug_mode=False,
+                 min_think=0.02, max_depth=None, book=None, evaluator=evaluate):
+        super().__init__(time_budget, exploration, rollout_policy, rollout_turns, max_nodes, max_iterations,
+                         min_think, max_depth, book, evaluator)
+        self.batch_size = batch_size
+        self.debug_mode = debug_mode
+        self.last_determinizations = 0
+
+    def determinizations(self, match, seat):
+        """按公开信息成批生成对手 (手牌, 牌库) 的确定化"""
+        enemy = match.players[1 - seat]
+        pool = array("B", hidden_pool(enemy, self.debug_mode))
+        hand_size = len(enemy.hand)
+        while True:
+            batch = []
+            for _ in range(self.batch_size):
+                random.shuffle(pool)
+                batch.append((pool[:hand_size], pool[hand_size:]))
+            yield from batch
+
+    def choose_action(self, match):
+        actions = search_actions(match)
+        if len(actions) == 1:
+            return actions[0]
+        action = book_action(self.book, match)
+        if action is not None:
+            return action
+        root = self._search(match, match.current_index, time.perf_counter() + self._think_time())
+        own_moves = [_move_of(match, action) for action in actions]
+        best = max(own_moves, key=lambda move: root.edges[move][0] if move in root.edges else -1)
+        return _action_of(match, best)
+
+    def _search(self, match, seat, deadline, stop=None):
+        # 以 seat 一方的视角搜索（后台思考时 seat 不是当前行动方），返回根节点
+        self._prune(match.turn)
+        key = info_key(match, seat)
+        root = self.table.get(key)
+        if root is None:
+            root = self.table[key] = _InfoNode()
+        snap = match.snapshot()
+        sim = match.clone()
+        samples = self.determinizations(match, seat)
+        iterations = 0
+        with game.headless_mode():
+            while _searching(deadline, stop):
+                if self.max_iterations is not None and iterations >= self.max_iterations:
+                    break
+                sim.restore(snap)
+                hand, deck = next(samples)
+                enemy = sim.players[1 - seat]
+                enemy.hand = hand
+                enemy.deck = deck
+                enemy._piles_shared = True
+                enemy._rehash()
+                self._iterate(sim, root, seat)
+                iterations += 1
+        self.last_iterations = self.last_determinizations = iterations
+        return root
+
+    def _iterate(self, match, root, seat):
+        own = match.players[seat]
+        own._own_piles()
+        random.shuffle(own.deck)
+        path = []
+        node = root
+        while not match.done:
+            if self.max_depth is not None and len(path) >= self.max_depth:
+                self._rollout(match)
+                break
+            moves = {_move_of(match, action) for action in search_actions(match)}
+            move = node.select(moves, self.exploration)
+            path.append((node, move, match.current_index))
+            match.step(_action_of(match, move))
+            if match.done:
+                break
+            key = info_key(match, seat)
+            child = self.table.get(key)
+            if child is None:
+                child = self.table[key] = _InfoNode()
+                path.append((child, None, match.current_index))
+                self._rollout(match)
+                break
+            node = child
+        values = (self.evaluator(match, 0), self.evaluator(match, 1))
+        for node, move, mover in path:
+            node.visits += 1
+            if move is not None:
+                edge = node.edges[move]
+                edge[0] += 1
+                edge[1] += values[mover]
+
+# ====== 期望极小极大搜索 ======
+# 置换表键在引擎的 Match.zobrist_key 之上再计入双方牌库最上面两张（回合交替时会被摸到，搜索里是确定的）。
+# 和引擎的键一样以行动方/对方区分而不是座位，镜像局面共用表项，所以表里的估值也以行动方为视角保存。
+_zobrist_random = random.Random(20250908)
+Z_DECK_TOP = [[[_zobrist_random.getrandbits(64) for _ in range(256)] for _ in range(2)] for _ in range(2)]  # [行动方/对方][位置][卡牌编号]
+
+def zobrist_key(match):
+    key = match.zobrist_key()
+    for role, player in enumerate((match.current, match.enemy)):
+        deck = player.deck
+        for position in range(min(2, len(deck))):
+            key ^= Z_DECK_TOP[role][position][deck[position]]
+    return key
+
+EXACT, LOWER, UPPER = range(3)
+_FLIP = (EXACT, UPPER, LOWER)  # 估值换成另一方视角（v → 1-v）时界类型互换
+
+class ExpectiminimaxBot:
+    """深度受限的期望极小极大电脑对手
+
+    决策节点按 alpha-beta 搜索（估值始终是座位 0 的胜率，座位 0 取大、座位 1 取小），
+    出有骰子的牌时展开机会节点，按 CARD_OUTCOMES 枚举点数等价类（用 _next_roll_value 固定点数），
+    机会节点用 Star1/Star2 剪枝：先对每个结果只探测一个动作得到界（Star2），再按概率收窄子窗口（Star1）。
+    深度按决策计数，机会节点不消耗深度；到达深度后用 evaluator 估值（默认 ev_evaluate，可以换成 tablebase_evaluator）。
+    置换表以 zobrist_key 为键，保存 (深度, 估值, 界类型, 最佳动作)，估值和界类型换算成行动方视角，
+    最佳动作用卡牌编号记录以适配手牌顺序变化。
+
+    卡牌内部的第二次掷骰、牌库重洗等其余随机性由 bot 自己的 random.Random 给出（挂在搜索副本的玩家上，
+    见 _search_copy），每次结算前用 (局面键, 动作, 点数) 设定种子，所以同一局面总是得到同一个动作；
+    全局随机状态不受影响，多个线程里的对局和搜索可以同时进行。搜索同样读取对手手牌（完全信息）。
+    """
+
+    def __init__(self, depth=3, max_entries=500000, book=None, evaluator=ev_evaluate):
+        self.depth = depth
+        self.max_entries = max_entries
+        self.book = book
+        self.evaluator = evaluator
+        self.table = {}
+        self.nodes = 0
+        self._rng = random.Random()
+        self._deadline = None  # 由 AnytimeBot 设定，超过后搜索中途放弃
+
+    def __call__(self, match):
+        return metered_choice(self, match)
+
+    def reset(self):
+        self.table.clear()
+
+    def choose_action(self, match):
+        actions = search_actions(match)
+        if len(actions) == 1:
+            return actions[0]
+        action = book_action(self.book, match)
+        if action is not None:
+            return action
+        if len(self.table) > self.max_entries:
+            self.table.clear()
+        self.nodes = 0
+        with game.headless_mode():
+            self._value(self._search_copy(match), self.depth, 0.0, 1.0)
+        entry = self.table.get(zobrist_key(match))
+        action = self._decode_move(match, entry[3]) if entry else None
+        return action if action is not None else actions[0]
+
+    def _search_copy(self, match):
+        # 搜索用的副本：掷骰和洗牌都用 bot 自己的随机数
+        sim = match.clone()
+        for player in sim.players:
+            player._dice = player._rng = self._rng
+        return sim
+
+    # ---- 动作 ----
+    def _encode_move(self, hand, action):
+        # 手牌动作记成 -1-卡牌编号，其余动作原样保存
+        if action is not None and action < game.ACTION_END_TURN:
+            return -1 - hand[action]
+        return action
+
+    def _decode_move(self, match, move):
+        if move is None or move >= 0:
+            return move
+        card_id = -1 - move
+        hand = match.current.hand
+        return hand.index(card_id) if card_id in hand else None
+
+    def _ordered_actions(self, match, best_move):
+        actions = search_actions(match)
+        if match.phase == game.PHASE_PLAY:
+            hand = match.current.hand
+            actions.sort(key=lambda a: -CARD_WORTH[hand[a]] if a < len(hand) else 0.0)
+        elif match.phase == game.PHASE_DISCARD:
+            hand = match.current.hand
+            actions.sort(key=lambda a: CARD_WORTH[hand[a]])
+        else:
+            # 300龟：对方最低的一条属性优先
+            enemy = match.enemy
+            actions.sort(key=lambda a: enemy.stat_values[a - game.ACTION_TURTLE_BASE]
+                         if a - game.ACTION_TURTLE_BASE < game.NUM_STATS else game.DEFAULT_STAT_CAP)
+        best = self._decode_move(match, best_move)
+        if best in actions:
+            actions.remove(best)
+            actions.insert(0, best)
+        return actions
+
+    def _outcomes(self, match, action):
+        current = match.current
+        if match.phase != game.PHASE_PLAY or action >= len(current.hand) or hasattr(current, "_next_roll_value"):
+            return ((None, 1.0),)
+        return CARD_OUTCOMES[current.hand[action]]
+
+    def _play(self, match, snap, key, action, roll):
+        # 每个 (局面, 动作, 点数) 用固定的随机种子结算，剩余的随机性与搜索顺序无关
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _SearchTimeout
+        match.restore(snap)
+        self._rng.seed(key ^ (action << 9 | (roll or 0)))
+        if roll is not None:
+            match.current._next_roll_value = roll
+        match.step(action)
+
+    # ---- 搜索 ----
+    def _value(self, match, depth, alpha, beta):
+        if match.done or depth == 0:
+            return self.evaluator(match, 0)
+        self.nodes += 1
+        key = zobrist_key(match)
+        maximizing = match.current_index == 0
+        entry = self.table.get(key)
+        best_move = None
+        if entry is not None:
+            entry_depth, value, flag, best_move = entry
+            if not maximizing:
+                value, flag = 1.0 - value, _FLIP[flag]
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+        snap = match.snapshot()
+        hand = match.current.hand[:]
+        actions = self._ordered_actions(match, best_move)
+        alpha0, beta0 = alpha, beta
+        best_value, best = (-1.0, None) if maximizing else (2.0, None)
+        for action in actions:
+            value = self._action_value(match, snap, key, action, depth, alpha, beta)
+            if maximizing:
+                if value > best_value:
+                    best_value, best = value, action
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best = value, action
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        flag = UPPER if best_value <= alpha0 else LOWER if best_value >= beta0 else EXACT
+        if maximizing:
+            self.table[key] = (depth, best_value, flag, self._encode_move(hand, best))
+        else:
+            self.table[key] = (depth, 1.0 - best_value, _FLIP[flag], self._encode_move(hand, best))
+        match.restore(snap)
+        return best_value
+
+    def _action_value(self, match, snap, key, action, depth, alpha, beta):
+        match.restore(snap)
+        outcomes = self._outcomes(match, action)
+        if len(outcomes) == 1:
+            self._play(match, snap, key, action, outcomes[0][0])
+            return self._value(match, depth - 1, alpha, beta)
+        # Star2 探测：每个结果只搜第一个动作，决策方为座位 0 时得到下界，否则得到上界
+        count = len(outcomes)
+        low = [0.0] * count
+        high = [1.0] * count
+        for i, (roll, _) in enumerate(outcomes):
+            self._play(match, snap, key, action, roll)
+            if match.done or depth == 1:
+                low[i] = high[i] = self._value(match, depth - 1, 0.0, 1.0)
+                continue
+            child_maximizing = match.current_index == 0
+            child_snap = match.snapshot()
+            first = self._ordered_actions(match, None)[0]
+            probe = self._action_value(match, child_snap, zobrist_key(match), first, depth - 1, 0.0, 1.0)
+            if child_maximizing:
+                low[i] = probe
+            else:
+                high[i] = probe
+        low_total = sum(p * value for (_, p), value in zip(outcomes, low))
+        high_total = sum(p * value for (_, p), value in zip(outcomes, high))
+        if low_total >= beta:
+            return low_total
+        if high_total <= alpha:
+            return high_total
+        # Star1：按已知结果和其余结果的界收窄每个子窗口，一旦越界立即返回
+        total = 0.0
+        low_rest, high_rest = low_total, high_total
+        for i, (roll, p) in enumerate(outcomes):
+            low_rest -= p * low[i]
+            high_rest -= p * high[i]
+            child_alpha = (alpha - total - high_rest) / p
+            child_beta = (beta - total - low_rest) / p
+            # 这个结果的界已经决定了机会节点越界，不用再搜
+            if child_alpha >= high[i]:
+                return total + p * high[i] + high_rest
+            if child_beta <= low[i]:
+                return total + p * low[i] + low_rest
+            if low[i] == high[i]:
+                value = low[i]
+            else:
+                self._play(match, snap, key, action, roll)
+                value = self._value(match, depth - 1, max(child_alpha, low[i]), min(child_beta, high[i]))
+            total += p * value
+            if value <= child_alpha:
+                return total + high_rest
+            if value >= child_beta:
+                return total + low_rest
+        return total
+
+# ====== 迭代加深 ======
+class _SearchTimeout(Exception):
+    pass
+
+class AnytimeBot(ExpectiminimaxBot):
+    """按时间预算迭代加深的期望极小极大电脑对手
+
+    依次搜索深度 1, 2, 3, ...，每完成一层就记下根节点的最佳动作；上一层存进置换表的最佳动作会排在下一层的最前面。
+    截止时间用单调时钟（time.perf_counter）计算，每模拟一步检查一次，超时立即中断当前这一层，
+    返回最后完成的那一层的结果。一层都没有完成时返回按 CARD_WORTH 排序的第一个动作，所以总能在截止前给出合法动作。
+    曼妥思之神的第二次掷骰、虚环之匣等让某些出牌的子树特别大，这时只是少搜几层，不会拖过截止时间。
+    margin 留给复制局面和中断返回的时间。
+    """
+
+    def __init__(self, time_budget=0.05, max_depth=12, margin=0.002, max_entries=500000, book=None,
+                 evaluator=ev_evaluate):
+        super().__init__(depth=max_depth, max_entries=max_entries, book=book, evaluator=evaluator)
+        self.time_budget = time_budget
+        self.margin = margin
+        self.last_depth = 0
+
+    def choose_action(self, match):
+        deadline = time.perf_counter() + self.time_budget - self.margin
+        actions = search_actions(match)
+        if len(actions) == 1:
+            return actions[0]
+        action = book_action(self.book, match)
+        if action is not None:
+            return action
+        if len(self.table) > self.max_entries:
+            self.table.clear()
+        best = self._ordered_actions(match, None)[0]
+        self.last_depth = 0
+        self.nodes = 0
+        try:
+            with game.headless_mode():
+                sim = self._search_copy(match)
+                snap = sim.snapshot()
+                key = zobrist_key(match)
+                self._deadline = deadline
+                for depth in range(1, self.depth + 1):
+                    sim.restore(snap)
+                    try:
+                        self._value(sim, depth, 0.0, 1.0)
+                    except _SearchTimeout:
+                        break
+                    entry = self.table.get(key)
+                    action = self._decode_move(match, entry[3]) if entry else None
+                    if action is not None:
+                        best = action
+                    self.last_depth = depth
+        finally:
+            self._deadline = None
+        return best
+
+# ====== 难度分级 ======
+# 难度不是另写一个电脑对手，而是同一个 ISMCTSBot 的计算预算：
+#   iterations   每步最多迭代（推演）次数，None 表示只受时间限制
+#   depth        树内最多下行的决策层数，None 表示不限
+#   time_budget  每步的时间预算（秒）
+#   match_cpu    每局的 CPU 时间上限（秒），用完后这一局剩下的决定都按最低难度计算
+BotTier = namedtuple("BotTier", "name label iterations depth time_budget match_cpu")
+BOT_TIERS = (
+    BotTier("easy", "简单", 30, 2, 0.02, 1.0),
+    BotTier("normal", "普通", 200, 4, 0.05, 4.0),
+    BotTier("hard", "困难", 1000, 8, 0.2, 15.0),
+    BotTier("expert", "专家", None, None, 0.5, 40.0),
+)
+TIER_INDEX = {tier.name: index for index, tier in enumerate(BOT_TIERS)}
+
+class BotScheduler:
+    """电脑对手的 CPU 记账与按负载降级
+
+    每个决定用掉的 CPU 时间（time.thread_time，只算本线程）按难度累计到 stats：[决定次数, CPU 秒, 墙钟秒]。
+    load() 是最近 window 秒里电脑对手用掉的 CPU 时间占 capacity 个核的比例；
+    负载每超过 downgrade_loads 里的一档，effective_tier 就把请求的难度降一级（最低到第 0 级）。
+    可以被多个线程里的电脑对手共用。
+    """
+
+    def __init__(self, capacity=None, window=10.0, downgrade_loads=(0.75, 0.9)):
+        self.capacity = capacity or os.cpu_count() or 1
+        self.window = window
+        self.downgrade_loads = downgrade_loads
+        self.stats = {tier.name: [0, 0.0, 0.0] for tier in BOT_TIERS}
+        self._recent = deque()  # (结束时刻, CPU 秒)
+        self._recent_cpu = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, tier, cpu, wall):
+        now = time.perf_counter()
+        with self._lock:
+            entry = self.stats[BOT_TIERS[tier].name]
+            entry[0] += 1
+            entry[1] += cpu
+            entry[2] += wall
+            self._recent.append((now, cpu))
+            self._recent_cpu += cpu
+            self._expire(now)
+
+    def load(self):
+        with self._lock:
+            self._expire(time.perf_counter())
+            return self._recent_cpu / (self.window * self.capacity)
+
+    def effective_tier(self, tier):
+        load = self.load()
+        steps = sum(1 for threshold in self.downgrade_loads if load > threshold)
+        return max(0, tier - steps)
+
+    def _expire(self, now):
+        recent = self._recent
+        while recent and recent[0][0] < now - self.window:
+            self._recent_cpu -= recent.popleft()[1]
+
+DEFAULT_SCHEDULER = BotScheduler()
+
+class TieredBot:
+    """按难度分级的电脑对手
+
+    每个决定先问调度器这一步实际用哪一级（负载高时降级），本局 CPU 用完 match_cpu 后固定用最低一级，
+    然后把这一级的预算设到共用的 ISMCTSBot 上搜索，并把用掉的 CPU 时间记到调度器里。
+    传进来的是另一个 Match 对象时视为新的一局，自动清空搜索树和本局 CPU。
+    """
+
+    def __init__(self, tier="normal", scheduler=None, debug_mode=False, book=None):
+        self.tier = TIER_INDEX[tier]
+        self.scheduler = scheduler or DEFAULT_SCHEDULER
+        self.search = ISMCTSBot(debug_mode=debug_mode, min_think=0.0, book=book)
+        self.match_cpu = 0.0
+        self.last_tier = None
+        self._match = None
+
+    def __call__(self, match):
+        return metered_choice(self, match)
+
+    def reset(self):
+        self.search.reset()
+        self.match_cpu = 0.0
+        self._match = None
+
+    def choose_action(self, match):
+        if match is not self._match:
+            self.reset()
+            self._match = match
+        tier = self.scheduler.effective_tier(self.tier)
+        if self.match_cpu >= BOT_TIERS[self.tier].match_cpu:
+            tier = 0
+        budget = BOT_TIERS[tier]
+        search = self.search
+        search.time_budget = budget.time_budget
+        search.max_iterations = budget.iterations
+        search.max_depth = budget.depth
+        cpu, wall = time.thread_time(), time.perf_counter()
+        action = search.choose_action(match)
+        cpu, wall = time.thread_time() - cpu, time.perf_counter() - wall
+        self.match_cpu += cpu
+        self.scheduler.record(tier, cpu, wall)
+        self.last_tier = tier
+        return action
+
+# ====== 后台思考 ======
+class Ponderer:
+    """在对手做决定时让 bot 在工作线程里继续搜索
+
+    start(match) 在对手的局面副本上开始思考（已经在思考就先停下），stop() 设置停止标记并等线程结束，
+    一次迭代不到一毫秒，所以轮到 bot 时几乎立即停下。bot 需要提供 ponder(match, seat, stop)（MCTSBot 系列）。
+    线程里的搜索用的是本线程的 headless_mode，不影响玩家所在线程的骰子闪现和输出。
+    """
+
+    def __init__(self, bot, seat):
+        self.bot = bot
+        self.seat = seat
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, match):
+        self.stop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.bot.ponder, args=(match.clone(), self.seat, self._stop), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+# ====== 人机对战 ======
+def play_vs_bot(bot=None, deck_size=game.DEFAULT_DECK_SIZE, human_seat=0, ponder=True, events=None, tablebase=None):
+    # 终端人机对战：human_seat 一方由玩家输入，另一方由 bot 决定；ponder 时玩家思考期间 bot 在后台继续搜索
+    # events 是对局日志的记录器（见 gameLog）；给了残局库（gameTablebase.Tablebase）时每次轮到玩家都显示玩家的胜率，
+    # 没有指定 bot 时默认的 ISMCTSBot 也用它估值
+    if bot is None:
+        bot = ISMCTSBot(evaluator=tablebase_evaluator(tablebase)) if tablebase is not None else ISMCTSBot()
+    with game.headless_mode():
+        match = game.Match(deck_size=deck_size, names=("玩家", "电脑"), events=events)
+    ponderer = Ponderer(bot, 1 - human_seat) if ponder and hasattr(bot, "ponder") else None
+    print(f"{match.players[match.first].name} 先手")
+    while not match.done:
+        current = match.current
+        if match.current_index != human_seat:
+            if ponderer:
+                ponderer.stop()
+            action = bot(match)
+            with game.headless_mode():
+                match.step(action)
+            if action == game.ACTION_END_TURN:
+                print(f"{current.name} 结束回合")
+            elif match.last_result:
+                print(match.last_result)
+                match.last_result = None
+            continue
+        print(f"\n{match.players[0].stat_summary()} | {match.players[1].stat_summary()}")
+        if tablebase is not None:
+            chance = tablebase.evaluate(match, human_seat)
+            print("胜率（残局库）: 超出残局库" if chance is None else f"胜率（残局库）: {chance:.0%}")
+        print(f"{current.name} 手牌: {current.hand_listing()}")
+        if ponderer:
+            ponderer.start(match)
+        try:
+            if match.phase == game.PHASE_PLAY:
+                choice = game.prompt_input(f"剩余行动 {match.actions_remaining}，出牌编号 / e 结束回合 / q 投降: ", "card").strip().lower()
+                action = {"e": game.ACTION_END_TURN, "q": game.ACTION_SURRENDER}.get(choice)
+                if action is None:
+                    action = int(choice)
+            elif match.phase == game.PHASE_DISCARD:
+                action = int(game.prompt_input(f"手牌超过上限 {game.hand_limit(current)}，选择要弃掉的卡牌编号: ", "discard").strip())
+            else:
+                choice = game.prompt_input(f"骰到300！选择减少对方的数值 ({'/'.join(game.TURTLE_300_CHOICES)}): ", "turtle_300").strip().lower()
+                action = game.ACTION_TURTLE_BASE + game.TURTLE_300_CHOICES.index(choice)
+            match.step(action)
+        except ValueError:
+            print("输入无效，请重新选择。")
+            continue
+        if match.last_result:
+            print(match.last_result)
+            match.last_result = None
+    if ponderer:
+        ponderer.stop()
+    if match.winner is None:
+        print("平局")
+    else:
+        print(f"{match.players[match.winner].name} 获胜！")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="终端人机对战")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    parser.add_argument("--tablebase", nargs="?", const="", help="用残局库显示胜率并作为电脑的估值（不给路径时用默认文件）")
+    args = parser.parse_args()
+    table = None
+    if args.tablebase is not None:
+        import gameTablebase
+        table = gameTablebase.Tablebase(args.tablebase or None, deck_size=args.deck_size)
+    play_vs_bot(deck_size=args.deck_size, tablebase=table)
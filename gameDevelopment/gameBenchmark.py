@@ -0,0 +1,271 @@
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import gameV1_3_2 as game
+
+# ====== 性能基准 ======
+# 每个基准函数返回 {名称: 每次耗时（微秒）}，直接运行本文件会依次打印。
+# 微基准测引擎热点（掷骰、结算、摸牌洗牌、建牌堆、延迟效果、修改器、快照），宏基准测整局无头对局。
+# 每项跑 ROUNDS 轮取最快的一轮，尽量排除调度抖动；每个基准开始前固定随机种子，工作量每次都一样。
+#
+# 结果可以连同机器信息保存成 JSON（--json），并与基准线文件比较（--baseline，默认 bench_baseline.json）：
+# 比基准线慢超过阈值的项会标出来，并以非零状态退出。基准线只在同一台机器上有意义，用 --save-baseline 生成。
+ROUNDS = 5
+SCALE = 1.0  # 所有 repeat 的缩放系数，--quick 时调小
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+def _time_per_call(func, repeat):
+    repeat = max(1, int(repeat * SCALE))
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / repeat * 1e6
+
+def _midgame_match(seed=0, steps=20):
+    # 随机走若干步得到一个对局中盘局面
+    random.seed(seed)
+    with game.headless_mode():
+        match = game.Match(deck_size=game.DEFAULT_DECK_SIZE)
+        for _ in range(steps):
+            if match.done:
+                break
+            match.step(game.random_policy(match))
+    return match
+
+def _card(name):
+    return next(card for card in game.CARD_REGISTRY if card.name == name)
+
+def _fresh_player(name="玩家"):
+    return game.Player(name, game.build_deck_from_prototypes(game.playable_prototypes()))
+
+# ====== 微基准 ======
+def bench_dice(repeat=50000):
+    # 掷骰：Dice.roll 与无头模式下的 interactive_roll（对局里实际走的路径）
+    random.seed(0)
+    player = _fresh_player()
+    with game.headless_mode():
+        return {
+            "Dice.roll(6)": _time_per_call(lambda: game.Dice.roll(6), repeat),
+            "Dice.roll(300, 3)": _time_per_call(lambda: game.Dice.roll(300, times=3), repeat),
+            "interactive_roll(6)": _time_per_call(lambda: game.interactive_roll(6, player), repeat),
+        }
+
+def bench_resolve_outcome(repeat=20000):
+    # 卡牌结算：多结果区间的暮光巫蜥，以及虚环之匣递归 1、2 次的判定
+    random.seed(0)
+    user, target = _fresh_player("使用者"), _fresh_player("目标")
+    lizard = _card("暮光巫蜥")
+    frog = _card("眼镜蛙")
+
+    def resolve(card, recursion):
+        def call():
+            if recursion:
+                user._void_box_recursion = recursion
+            card._resolve_outcome(user, target, card.outcomes, card.dice_sides, card.min_value)
+        return call
+
+    with game.headless_mode():
+        return {
+            "暮光巫蜥": _time_per_call(resolve(lizard, 0), repeat),
+            "眼镜蛙": _time_per_call(resolve(frog, 0), repeat),
+            "眼镜蛙 虚环递归1次": _time_per_call(resolve(frog, 1), repeat),
+            "眼镜蛙 虚环递归2次": _time_per_call(resolve(frog, 2), repeat),
+        }
+
+def bench_piles(repeat=50000):
+    # 摸牌（摸一张再放回牌库底，牌库大小不变）和弃牌堆洗回牌库（整副牌）
+    random.seed(0)
+    player = _fresh_player()
+
+    def draw():
+        player.draw(1)
+        player.deck.append(player.hand.pop())
+
+    def reshuffle():
+        player.discard.extend(player.deck)
+        del player.deck[:]
+        player.shuffle_discard_into_deck()
+
+    return {
+        "Player.draw": _time_per_call(draw, repeat),
+        "shuffle_discard_into_deck": _time_per_call(reshuffle, repeat // 5),
+    }
+
+def bench_build_deck(repeat=5000):
+    random.seed(0)
+    prototypes = game.playable_prototypes()
+    return {
+        f"build_deck({game.DEFAULT_DECK_SIZE})": _time_per_call(
+            lambda: game.build_deck_from_prototypes(prototypes, game.DEFAULT_DECK_SIZE), repeat),
+        "build_deck(100)": _time_per_call(lambda: game.build_deck_from_prototypes(prototypes, 100), repeat // 5),
+    }
+
+def bench_effects(repeat=50000):
+    # 延迟效果（都未到期 / 有一个到期）和修改器（没有修改 / 有修改并截断到上限）
+    random.seed(0)
+    player = _fresh_player()
+    pending = [(1000 + i, game.chicken_machine_payoff) for i in range(3)]
+
+    def delayed_idle():
+        player._delayed_effects = pending[:]
+        game.apply_delayed_effects(player, 0)
+
+    def delayed_due():
+        player._delayed_effects = [(0, game.chicken_machine_payoff), *pending]
+        game.apply_delayed_effects(player, 0)
+
+    def modify():
+        player.add_modifier(game.STAT_SAN, 1)
+        player.apply_modifiers()
+
+    with game.headless_mode():
+        return {
+            "apply_delayed_effects 未到期": _time_per_call(delayed_idle, repeat),
+            "apply_delayed_effects 到期": _time_per_call(delayed_due, repeat),
+            "apply_modifiers 无修改": _time_per_call(player.apply_modifiers, repeat),
+            "apply_modifiers 有修改": _time_per_call(modify, repeat),
+        }
+
+def bench_clone(repeat=20000):
+    # 快照/恢复/复制与 copy.deepcopy 的对比
+    match = _midgame_match()
+    snap = match.snapshot()
+    results = {
+        "Match.snapshot": _time_per_call(match.snapshot, repeat),
+        "Match.restore": _time_per_call(lambda: match.restore(snap), repeat),
+        "Match.clone": _time_per_call(match.clone, repeat),
+        "copy.deepcopy": _time_per_call(lambda: copy.deepcopy(match), max(1, repeat // 20)),
+    }
+    # 快照后再走一步：此时才真正复制牌堆（写时复制）
+    def branch():
+        match.restore(snap)
+        with game.headless_mode():
+            if not match.done:
+                match.step(match.legal_actions()[0])
+    results["restore + step"] = _time_per_call(branch, repeat)
+    return results
+
+# ====== 宏基准 ======
+def bench_matches(repeat=40):
+    # 整局无头对局（每局耗时，打印时换算成每秒局数）；每轮用同一批种子，各轮工作量相同
+    import gameAI as ai
+    games = max(1, int(repeat * SCALE))
+
+    def play(policy):
+        seeds = iter(range(10 ** 9))
+        def one():
+            random.seed(next(seeds) % games)
+            with game.headless_mode():
+                match = game.Match(deck_size=game.DEFAULT_DECK_SIZE, max_turns=500)
+                while not match.done:
+                    match.step(policy(match))
+        return one
+
+    return {
+        "对局 random_policy": _time_per_call(play(game.random_policy), repeat),
+        "对局 greedy_policy": _time_per_call(play(ai.greedy_policy), repeat),
+    }
+
+BENCHMARKS = [bench_dice, bench_resolve_outcome, bench_piles, bench_build_deck, bench_effects, bench_clone]
+MACRO_BENCHMARKS = [bench_matches]
+
+# ====== 结果文件 ======
+def machine_info():
+    info = {
+        "time": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "rounds": ROUNDS,
+        "scale": SCALE,
+    }
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return info
+
+def run_benchmarks(benchmarks=None, only=None):
+    """运行基准，返回 {基准函数名: {名称: 微秒}}；only 只保留名字里包含该字符串的基准函数"""
+    results = {}
+    for bench in benchmarks or BENCHMARKS + MACRO_BENCHMARKS:
+        if only and only not in bench.__name__:
+            continue
+        results[bench.__name__] = bench()
+    return results
+
+def save_results(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"machine": machine_info(), "results": results}, f, ensure_ascii=False, indent=2)
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(results, baseline):
+    """与基准线比较，返回 [(基准, 名称, 基准线微秒, 本次微秒, 比值)]，只包含两边都有的项；比值 >1 表示变慢"""
+    rows = []
+    for bench, entries in results.items():
+        for name, micros in entries.items():
+            base = baseline.get(bench, {}).get(name)
+            if base:
+                rows.append((bench, name, base, micros, micros / base))
+    return rows
+
+def _print_results(results):
+    macro = {bench.__name__ for bench in MACRO_BENCHMARKS}
+    for bench, entries in results.items():
+        print(f"== {bench} ==")
+        for name, micros in entries.items():
+            if bench in macro:
+                print(f"{name:>28}: {micros / 1000:8.2f} ms  ({1e6 / micros:7.1f} 局/秒)")
+            else:
+                print(f"{name:>28}: {micros:8.2f} µs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="引擎性能基准")
+    parser.add_argument("--only", help="只运行名字里包含这个字符串的基准函数（如 dice、matches）")
+    parser.add_argument("--quick", action="store_true", help="repeat 缩小到十分之一，快速看个大概")
+    parser.add_argument("--json", help="把结果和机器信息写到这个 JSON 文件")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="与这个基准线文件比较（存在时）")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写成基准线")
+    parser.add_argument("--threshold", type=float, default=0.10, help="比基准线慢超过这个比例算退化（默认 0.10）")
+    args = parser.parse_args()
+    if args.quick:
+        SCALE = 0.1
+    results = run_benchmarks(only=args.only)
+    _print_results(results)
+    if args.json:
+        save_results(args.json, results)
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"基准线已保存到 {args.baseline}")
+    elif os.path.exists(args.baseline):
+        baseline = load_results(args.baseline)
+        if baseline["machine"].get("host") != platform.node():
+            print(f"注意：基准线来自另一台机器（{baseline['machine'].get('host')}），比较结果仅供参考")
+        print(f"== 与基准线比较（{baseline['machine'].get('commit', '?')}，阈值 {args.threshold:.0%}）==")
+        regressions = 0
+        for bench, name, base, micros, ratio in compare(results, baseline["results"]):
+            slower = ratio > 1 + args.threshold
+            regressions += slower
+            print(f"{name:>28}: {base:10.2f} → {micros:10.2f} µs  {ratio - 1:+7.1%}{'  ← 变慢' if slower else ''}")
+        sys.exit(1 if regressions else 0)
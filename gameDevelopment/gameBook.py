@@ -0,0 +1,158 @@
+
+import multiprocessing
+import os
+import random
+import struct
+import sys
+
+import numpy as np
+
+import gameV1_3_2 as game
+import gameAI as ai
+
+# ====== 开局库 ======
+# 双方的第一个回合都是从刚摸的 5 张牌开始，局面来来回回就是那么几种手牌组合，每局都从头搜索很浪费。
+# 开局库用大量无头自我对弈统计：前 book_turns 个回合的每个决定随机选一个动作，之后按 rollout 策略下完，
+# 记录每个 (局面, 动作) 的对局数和得分（胜 2、平 1、负 0）。
+#
+# 局面键是当前行动方视角的信息集键（Match.zobrist_key(observer=...)，只含己方手牌的多重集、双方属性等公开信息）
+# 再混入回合数（回合 0 是先手的第一回合，回合 1 是后手的第一回合），所以手牌顺序不同也是同一个键，也不会读到对手手牌。
+#
+# 文件按键排序，分两列存：先是连续的键数组（每个 8 字节），再是同样顺序的记录（动作 2 字节 + 对局数 4 字节 + 得分 4 字节）。
+# 两列都内存映射，在连续的键数组上二分查找（键和记录交错存的话每次查找 numpy 都要先把键拷一遍，慢上百倍）。
+# 文件头里存着卡牌定义的指纹（game.card_fingerprint），卡牌或稀有度改过之后 open_book 直接返回 None，开局库自动失效。
+
+MAGIC = b"CGOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH40sI")  # 标识, 版本, 牌堆大小, 收录的回合数, 卡牌指纹, 记录条数
+KEY = np.dtype("<u8")
+RECORD = np.dtype([("move", "<i2"), ("plays", "<u4"), ("points", "<u4")])
+TURN_MIX = 0x9E3779B97F4A7C15  # 回合数乘上这个奇数再加到局面键上
+
+def default_path(deck_size=game.DEFAULT_DECK_SIZE):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"opening_book_d{deck_size}.cgob")
+
+def book_key(match):
+    return (match.zobrist_key(observer=match.current_index) + match.turn * TURN_MIX) & game.ZOBRIST_MASK
+
+# ====== 生成 ======
+def _self_play(task):
+    # 一批自我对弈，返回 {(键, 动作): [对局数, 得分]}
+    seed, games, deck_size, book_turns, rollout_policy = task
+    random.seed(seed)
+    counts = {}
+    with game.headless_mode():
+        for _ in range(games):
+            match = game.Match(deck_size=deck_size, max_turns=500)
+            visited = []
+            while not match.done:
+                if match.turn < book_turns and match.phase == game.PHASE_PLAY:
+                    actions = ai.search_actions(match)
+                    action = random.choice(actions)
+                    if len(actions) > 1:
+                        visited.append((book_key(match), ai._move_of(match, action), match.current_index))
+                else:
+                    action = rollout_policy(match)
+                match.step(action)
+            for key, move, mover in visited:
+                entry = counts.get((key, move))
+                if entry is None:
+                    entry = counts[(key, move)] = [0, 0]
+                entry[0] += 1
+                entry[1] += 1 if match.winner is None else 2 if match.winner == mover else 0
+    return counts
+
+def build_book(path=None, games=200000, deck_size=game.DEFAULT_DECK_SIZE, book_turns=2,
+               rollout_policy=game.random_policy, processes=None, chunk=2000, seed=0):
+    """自我对弈生成开局库文件，返回文件路径；对局按 chunk 局一批分给 processes 个进程"""
+    path = path or default_path(deck_size)
+    tasks = [(seed * 1000003 + i, min(chunk, games - start), deck_size, book_turns, rollout_policy)
+             for i, start in enumerate(range(0, games, chunk))]
+    processes = processes or os.cpu_count() or 1
+    counts = {}
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = list(pool.imap_unordered(_self_play, tasks))
+    else:
+        results = map(_self_play, tasks)
+    for result in results:
+        for key, (plays, points) in result.items():
+            entry = counts.get(key)
+            if entry is None:
+                counts[key] = [plays, points]
+            else:
+                entry[0] += plays
+                entry[1] += points
+    items = sorted(counts.items())
+    keys = np.array([key for (key, _), _ in items], KEY)
+    records = np.array([(move, plays, points) for (_, move), (plays, points) in items], RECORD)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, deck_size, book_turns, game.card_fingerprint(deck_size=deck_size).encode(),
+                            len(items)))
+        f.write(keys.tobytes())
+        f.write(records.tobytes())
+    return path
+
+# ====== 查询 ======
+class OpeningBook:
+    """只读的开局库（内存映射）
+
+    choose(match) 在收录的回合里、且这个局面的候选动作都至少有 min_plays 局统计时返回平均得分最高的动作，
+    否则返回 None，由调用方照常搜索。电脑对手的 book 参数接受这个对象。
+    """
+
+    def __init__(self, path, min_plays=30):
+        with open(path, "rb") as f:
+            magic, version, deck_size, book_turns, fingerprint, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是开局库文件（或版本不兼容）")
+        self.path = path
+        self.deck_size = deck_size
+        self.book_turns = book_turns
+        self.fingerprint = fingerprint.decode()
+        self.min_plays = min_plays
+        if count:
+            self.keys = np.memmap(path, KEY, "r", offset=HEADER.size, shape=(count,))
+            self.records = np.memmap(path, RECORD, "r", offset=HEADER.size + count * KEY.itemsize, shape=(count,))
+        else:
+            self.keys, self.records = np.empty(0, KEY), np.empty(0, RECORD)
+
+    @property
+    def stale(self):
+        return self.fingerprint != game.card_fingerprint(deck_size=self.deck_size)
+
+    def moves(self, match):
+        """这个局面收录的 {动作（卡牌编号形式，见 gameAI._move_of）: (对局数, 平均得分 0-1)}"""
+        key = book_key(match)
+        low = int(self.keys.searchsorted(key, "left"))
+        high = int(self.keys.searchsorted(key, "right"))
+        return {move: (plays, points / (2.0 * plays)) for move, plays, points in self.records[low:high].tolist()}
+
+    def choose(self, match):
+        if match.turn >= self.book_turns or match.phase != game.PHASE_PLAY:
+            return None
+        actions = ai.search_actions(match)
+        if len(actions) < 2:
+            return None
+        stats = self.moves(match)
+        legal = [ai._move_of(match, action) for action in actions]
+        if any(stats.get(move, (0, 0.0))[0] < self.min_plays for move in legal):
+            return None
+        best = max(legal, key=lambda move: stats[move][1])
+        return ai._action_of(match, best)
+
+def open_book(path=None, deck_size=game.DEFAULT_DECK_SIZE, min_plays=30):
+    """打开开局库；文件不存在或卡牌定义已经改过（指纹不符）时返回 None"""
+    path = path or default_path(deck_size)
+    if not os.path.exists(path):
+        return None
+    book = OpeningBook(path, min_plays)
+    if book.deck_size != deck_size or book.stale:
+        return None
+    return book
+
+if __name__ == "__main__":
+    # python gameBook.py [对局数] [进程数]
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(build_book(games=total, processes=workers))
@@ -0,0 +1,136 @@
+
+import random
+import numpy as np
+
+import gameV1_3_2 as game
+
+# ====== 单局训练环境（Gym 风格） ======
+# 在无头对局引擎 Match 之上提供 reset(seed) / step(action) / observation() / legal_action_mask()。
+# 动作编码沿用 gameV1_3_2 的 ACTION_* 常量：出牌、结束回合、投降、弃牌环节、300龟选择都是同一个动作空间。
+
+# ====== 观测编码 ======
+# 观测是定长整数数组，按座位（玩家A/玩家B）分块而不是按“自己/对手”分块，
+# 这样换人时不用重排整块数据；当前行动方由全局块里的 OBS_CURRENT 给出，观测的是哪个座位由 OBS_SEAT 给出。
+# 对手的手牌是隐藏信息：observation(seat) 里另一个座位的手牌格全部为 0，只留手牌数（SEAT_HAND_COUNT）。
+# 每个座位块的布局：
+SEAT_HAND = 0                                      # 手牌卡牌编号 + 1（0 表示空位），MAX_HAND_SIZE 格
+SEAT_STATS = SEAT_HAND + game.MAX_HAND_SIZE        # 各属性数值，NUM_STATS 格
+SEAT_HAND_COUNT = SEAT_STATS + game.NUM_STATS      # 手牌数
+SEAT_DECK_COUNT = SEAT_HAND_COUNT + 1              # 牌库数
+SEAT_DISCARD_COUNT = SEAT_DECK_COUNT + 1           # 弃牌堆数
+SEAT_BASE_ACTIONS = SEAT_DISCARD_COUNT + 1         # 基础行动力
+SEAT_NEG_ACTIONS = SEAT_BASE_ACTIONS + 1           # 负行动力
+SEAT_SKIP = SEAT_NEG_ACTIONS + 1                   # 是否跳过下回合
+SEAT_QIU_LUO = SEAT_SKIP + 1                       # 是否带有裘罗效果
+SEAT_VOID_BOX = SEAT_QIU_LUO + 1                   # 虚环之匣递归次数
+SEAT_DELAYED = SEAT_VOID_BOX + 1                   # 挂起的延迟效果数量
+SEAT_SIZE = SEAT_DELAYED + 1
+# 全局块
+OBS_CURRENT = 2 * SEAT_SIZE                        # 当前行动方座位
+OBS_PHASE = OBS_CURRENT + 1                        # 当前阶段（PHASE_*）
+OBS_ACTIONS_REMAINING = OBS_PHASE + 1              # 本回合剩余行动次数
+OBS_TURN = OBS_ACTIONS_REMAINING + 1               # 回合数
+OBS_SEAT = OBS_TURN + 1                            # 这份观测属于哪个座位
+OBS_SIZE = OBS_SEAT + 1
+
+class CardGameEnv:
+    """单局对战环境
+
+    step(action) 返回 (observation, reward, done, info)，reward 以做出该动作的一方为视角：
+    获胜 +1，失败 -1，其余 0。对手也由调用方驱动（自我对弈），observation 里的 OBS_CURRENT 说明轮到谁。
+    reset 和 step 返回的是接下来要做决定的一方的观测（看不到对手的手牌）。
+    reset(seed) 只用这一局自己的随机数：建牌和洗牌用 Match 的种子，掷骰用环境的 rng（random.Random(seed)），
+    不重设全局随机数，同一进程里的其他环境和电脑对手不受影响。
+    """
+
+    def __init__(self, deck_size=game.DEFAULT_DECK_SIZE, max_turns=500):
+        self.deck_size = deck_size
+        self.max_turns = max_turns
+        self.match = None
+        self.rng = random.Random()
+        self._obs = [0] * OBS_SIZE  # 编码缓存用普通列表，切片写入比逐个写 numpy 数组快得多
+        self._pile_counts = [None, None]  # 每个座位上次编码时的 (手牌, 牌库, 弃牌堆) 张数
+
+    def reset(self, seed=None):
+        self.rng.seed(seed)
+        with game.headless_mode():
+            self.match = game.Match(deck_size=self.deck_size, max_turns=self.max_turns, seed=seed, dice=self.rng)
+        self._obs = [0] * OBS_SIZE
+        self._pile_counts = [None, None]
+        self._encode(full=True)
+        return self.observation()
+
+    def step(self, action):
+        match = self.match
+        actor = match.current_index
+        phase = match.phase
+        turn = match.turn
+        with game.headless_mode():
+            match.step(action)
+        # 弃牌只改动手牌和牌堆张数；出牌、300龟选择或者换回合才需要重写属性和状态标记
+        self._encode(full=phase != game.PHASE_DISCARD or match.turn != turn)
+        reward = 0
+        if match.done and match.winner is not None:
+            reward = 1 if match.winner == actor else -1
+        info = {"result": match.last_result, "winner": match.winner}
+        return self.observation(), reward, match.done, info
+
+    def observation(self, seat=None):
+        """seat 座位能看到的观测（默认是当前行动方）：对手的手牌只有张数"""
+        if seat is None:
+            seat = self.match.current_index
+        obs = np.array(self._obs, np.int16)
+        hidden = (1 - seat) * SEAT_SIZE + SEAT_HAND
+        obs[hidden:hidden + game.MAX_HAND_SIZE] = 0
+        obs[OBS_SEAT] = seat
+        return obs
+
+    def legal_action_mask(self):
+        mask = np.zeros(game.NUM_ACTIONS, bool)
+        mask[self.match.legal_actions()] = True
+        return mask
+
+    def _encode(self, full):
+        obs = self._obs
+        match = self.match
+        for seat, player in enumerate(match.players):
+            base = seat * SEAT_SIZE
+            counts = (len(player.hand), len(player.deck), len(player.discard))
+            if counts != self._pile_counts[seat]:
+                # 牌只会在手牌/牌库/弃牌堆之间移动，张数没变就说明手牌没变
+                self._pile_counts[seat] = counts
+                ids = [card_id + 1 for card_id in player.hand]
+                obs[base + SEAT_HAND:base + SEAT_HAND + game.MAX_HAND_SIZE] = ids + [0] * (game.MAX_HAND_SIZE - len(ids))
+                obs[base + SEAT_HAND_COUNT:base + SEAT_DISCARD_COUNT + 1] = counts
+            if full:
+                obs[base + SEAT_STATS:base + SEAT_STATS + game.NUM_STATS] = player.stat_values.tolist()
+                obs[base + SEAT_BASE_ACTIONS:base + SEAT_SIZE] = (
+                    player._base_actions,
+                    player._negative_action_points,
+                    int(getattr(player, "_skip_next_turn", False)),
+                    int(getattr(player, "_qiu_luo_effect", False)),
+                    getattr(player, "_void_box_recursion", 0),
+                    len(getattr(player, "_delayed_effects", ())),
+                )
+        obs[OBS_CURRENT:OBS_SEAT] = (match.current_index, match.phase, match.actions_remaining, match.turn)
+
+def random_episode(env, seed=None):
+    # 用随机合法动作跑完一局，返回 (获胜方座位, 步数)；动作也取自环境的 rng，给了种子时整局可以重现
+    env.reset(seed)
+    done = False
+    steps = 0
+    while not done:
+        legal = np.flatnonzero(env.legal_action_mask())
+        if env.match.phase == game.PHASE_PLAY:
+            legal = legal[legal < game.ACTION_END_TURN]  # 随机出牌，不主动结束回合或投降
+        _, _, done, info = env.step(env.rng.choice(legal))
+        steps += 1
+    return info["winner"], steps
+
+if __name__ == "__main__":
+    import time
+    env = CardGameEnv()
+    start = time.perf_counter()
+    steps = sum(random_episode(env, seed)[1] for seed in range(500))
+    elapsed = time.perf_counter() - start
+    print(f"{steps} 步 / {elapsed:.2f}s = {steps / elapsed:.0f} 步/秒")
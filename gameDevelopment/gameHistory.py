@@ -0,0 +1,366 @@
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import gameLog
+import gameV1_3_2 as game
+
+# ====== 对局历史库 ======
+# 把对局日志（见 gameLog）导入本地 SQLite，每局一行摘要，加上按卡牌和按事件的索引，用来回答这样的问题：
+#   “300龟 骰出 300 的对局”          rolls 表，主键 (卡牌, 点数, 对局)
+#   “输掉时带着虚环递归 2 层的对局”    seats 表，部分索引 (虚环递归, 胜负) WHERE 虚环递归 > 0
+#   “出过某张牌的对局”                card_plays 表，主键 (卡牌, 对局, 座位)
+# 按卡牌和按事件的表都是 WITHOUT ROWID，主键本身就是索引，查询只在一段连续的 B 树里读，
+# 一千万局也只要读命中的那几页，不扫全表；局数另外在 card_counts / roll_counts 里随导入累加，
+# “出过普通攻击的对局有多少”这种命中几百万局的计数也不用数索引。掷骰只记“这一局里某张牌骰出过某个点数”（去重），
+# 掷骰属于最近打出的那张牌，决定先手和延迟效果的掷骰不记。
+# 结束时的状态（虚环递归层数、负行动力、状态标记、各条属性）取自日志的 result 事件。
+#
+# 导入按批进行（默认每 5000 局一个事务，executemany），同时记下日志导入到了哪个位置，重复导入只会接着往后导。
+# 查询走只读连接池（ConnectionPool），服务器的多个请求线程可以同时查（见 gameMetrics 的 /history）。
+# 卡牌编号按当前的卡牌表解释；日志的卡牌指纹和现在不同时，导入会给出提示（logs 表里也存着指纹）。
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    fingerprint TEXT NOT NULL,
+    ingested INTEGER NOT NULL               -- 已经导入到日志文件的哪个位置
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    log_id INTEGER NOT NULL,
+    record_offset INTEGER NOT NULL,         -- 记录在日志文件里的位置（gameViewer / gameReplay 用）
+    started INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    deck_size INTEGER NOT NULL,
+    debug_mode INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    winner INTEGER                          -- 获胜座位，平局为 NULL
+);
+CREATE INDEX IF NOT EXISTS matches_turns ON matches (turns);
+CREATE TABLE IF NOT EXISTS seats (
+    match_id INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    won INTEGER,                            -- 1 赢，0 输，平局为 NULL
+    flags INTEGER NOT NULL,                 -- gameLog.RESULT_FLAGS 的位
+    void_recursion INTEGER NOT NULL,
+    negative_actions INTEGER NOT NULL,
+    {", ".join(f"{name} INTEGER NOT NULL" for name in game.STAT_NAMES)},
+    PRIMARY KEY (match_id, seat)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seats_void ON seats (void_recursion, won, match_id) WHERE void_recursion > 0;
+CREATE TABLE IF NOT EXISTS card_plays (
+    card_id INTEGER NOT NULL,
+    match_id INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    plays INTEGER NOT NULL,
+    PRIMARY KEY (card_id, match_id, seat)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rolls (
+    card_id INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    match_id INTEGER NOT NULL,
+    PRIMARY KEY (card_id, value, match_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS card_counts (
+    card_id INTEGER PRIMARY KEY,
+    matches INTEGER NOT NULL                -- 打出过这张牌的局数
+);
+CREATE TABLE IF NOT EXISTS roll_counts (
+    card_id INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    matches INTEGER NOT NULL,               -- 这张牌骰出过这个点数的局数
+    PRIMARY KEY (card_id, value)
+) WITHOUT ROWID;
+"""
+DEFAULT_BATCH = 5000
+_SEAT_FIELDS = 3 + game.NUM_STATS  # result 事件里每个座位的字段数
+
+def card_id(name):
+    """卡名 → 卡牌编号"""
+    for index, card in enumerate(game.CARD_REGISTRY):
+        if card.name == name:
+            return index
+    raise ValueError(f"没有叫 {name} 的卡牌")
+
+# 导入时逐字节扫事件：只解码用得到的字段，其余按变长整数的个数跳过（比逐个 read_event 快好几倍）
+_BLOBS = frozenset(kind for kind, spec in enumerate(gameLog.SPECS) if spec in ("*", "b"))  # 长度 + 内容
+_VARINTS = tuple(len(spec) for spec in gameLog.SPECS)
+_OUTSIDE = frozenset((gameLog.EV_TURN, gameLog.EV_ACTION, gameLog.EV_DELAYED))  # 之后的掷骰不属于任何一张牌
+
+def summarize(payload):
+    """一局日志记录的摘要：(MatchStart, result 事件的字段, {(座位, 卡牌): 打出次数}, {(卡牌, 点数)})"""
+    start, pos = gameLog.parse_start(payload)
+    data, end = payload, len(payload)
+    plays = {}
+    rolls = set()
+    card = result = None
+    while pos < end:
+        tag = data[pos]
+        kind = tag >> 1
+        pos += 1
+        if kind == gameLog.EV_ROLL:
+            while data[pos] & 0x80:  # 面数
+                pos += 1
+            value = data[pos + 1]
+            if value < 0x80:
+                pos += 2
+            else:
+                value, pos = gameLog._get(data, pos + 1)
+            if card is not None:
+                rolls.add((card, value))
+        elif kind == gameLog.EV_PLAY:
+            card = data[pos]
+            if card < 0x80:
+                pos += 1
+            else:
+                card, pos = gameLog._get(data, pos)
+            key = (tag & 1, card)
+            plays[key] = plays.get(key, 0) + 1
+        elif kind == gameLog.EV_RESULT:
+            result = gameLog.read_event(data, pos - 1)[0].values
+            break
+        elif kind in _BLOBS:
+            length, pos = gameLog._get(data, pos)
+            pos += length
+        else:
+            if kind in _OUTSIDE:
+                card = None
+            for _ in range(_VARINTS[kind]):
+                while data[pos] & 0x80:
+                    pos += 1
+                pos += 1
+    return start, result, plays, rolls
+
+# ====== 连接池 ======
+class ConnectionPool:
+    """只读连接池：每个线程用 connection() 借一个连接，用完还回来；最多同时开 size 个，借不到时等"""
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA cache_size = -16384")  # 16 MiB
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+# ====== 历史库 ======
+class MatchHistory:
+    """对局历史库：add_log() 导入日志，查询方法通过连接池读，可以在多个线程里同时查"""
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        with self._writer() as conn:
+            conn.executescript(SCHEMA)
+        self.pool = ConnectionPool(path, pool_size)
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def _writer(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")  # 导入时查询照常进行
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA cache_size = -65536")  # 64 MiB
+            yield conn
+        finally:
+            conn.close()
+
+    def add_log(self, log_path, batch=DEFAULT_BATCH):
+        """导入一个日志文件里还没导入过的对局，返回导入的局数；每 batch 局一个事务"""
+        reader = gameLog.LogReader(log_path)
+        log_path = os.path.abspath(log_path)
+        added = 0
+        with self._write_lock, self._writer() as conn:
+            row = conn.execute("SELECT id, ingested FROM logs WHERE path = ?", (log_path,)).fetchone()
+            if row is None:
+                with conn:
+                    log_id = conn.execute("INSERT INTO logs (path, fingerprint, ingested) VALUES (?, ?, 0)",
+                                          (log_path, reader.fingerprint)).lastrowid
+                ingested = 0
+            else:
+                log_id, ingested = row
+            match_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM matches").fetchone()[0]
+            matches, seats, card_plays, rolls = [], [], [], []
+            card_counts, roll_counts = {}, {}
+
+            def flush(end):
+                with conn:
+                    conn.executemany("INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", matches)
+                    conn.executemany(f"INSERT INTO seats VALUES ({', '.join('?' * (3 + _SEAT_FIELDS))})", seats)
+                    conn.executemany("INSERT INTO card_plays VALUES (?, ?, ?, ?)", card_plays)
+                    conn.executemany("INSERT INTO rolls VALUES (?, ?, ?)", rolls)
+                    conn.executemany("INSERT INTO card_counts VALUES (?, ?) ON CONFLICT (card_id) "
+                                     "DO UPDATE SET matches = matches + excluded.matches", card_counts.items())
+                    conn.executemany("INSERT INTO roll_counts VALUES (?, ?, ?) ON CONFLICT (card_id, value) "
+                                     "DO UPDATE SET matches = matches + excluded.matches",
+                                     [(card, value, count) for (card, value), count in roll_counts.items()])
+                    conn.execute("UPDATE logs SET ingested = ? WHERE id = ?", (end, log_id))
+                for rows in (matches, seats, card_plays, rolls, card_counts, roll_counts):
+                    rows.clear()
+
+            end = ingested
+            for offset, payload, end in reader.records(ingested):
+                start, result, plays, rolled = summarize(payload)
+                if result is None:
+                    continue  # 没有结果的记录（不应该出现，日志只写结束了的对局）
+                match_id += 1
+                winner = result[0] - 1 if result[0] else None
+                matches.append((match_id, log_id, offset, start.time, start.seed, start.deck_size,
+                                int(start.debug_mode), result[1], winner))
+                for seat in range(2):
+                    fields = result[2 + seat * _SEAT_FIELDS:2 + (seat + 1) * _SEAT_FIELDS]
+                    seats.append((match_id, seat, None if winner is None else int(winner == seat), *fields))
+                card_plays.extend((card, match_id, seat, count) for (seat, card), count in plays.items())
+                rolls.extend((card, value, match_id) for card, value in rolled)
+                for card in {card for _, card in plays}:
+                    card_counts[card] = card_counts.get(card, 0) + 1
+                for key in rolled:
+                    roll_counts[key] = roll_counts.get(key, 0) + 1
+                added += 1
+                if len(matches) >= batch:
+                    flush(end)
+            flush(end)
+        return added
+
+    # ====== 查询 ======
+    def query(self, sql, params=()):
+        """任意只读 SQL，返回全部结果行"""
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _count_and_ids(self, count_sql, table, where, params, limit):
+        # count_sql 给出局数（没有结果行时为 0），ids 按对局编号取前 limit 个
+        with self.pool.connection() as conn:
+            row = conn.execute(count_sql, params).fetchone()
+            ids = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT match_id FROM {table} WHERE {where} ORDER BY match_id LIMIT ?", (*params, limit))]
+        return row[0] if row else 0, ids
+
+    def matches_with_roll(self, card, value, limit=100):
+        """这张牌（卡名或编号）骰出过 value 的对局：(局数, 前 limit 局的编号)"""
+        card = card_id(card) if isinstance(card, str) else card
+        return self._count_and_ids("SELECT matches FROM roll_counts WHERE card_id = ? AND value = ?", "rolls",
+                                   "card_id = ? AND value = ?", (card, value), limit)
+
+    def matches_with_card(self, card, limit=100):
+        """打出过这张牌的对局：(局数, 前 limit 局的编号)"""
+        card = card_id(card) if isinstance(card, str) else card
+        return self._count_and_ids("SELECT matches FROM card_counts WHERE card_id = ?", "card_plays",
+                                   "card_id = ?", (card,), limit)
+
+    def matches_lost_with_void(self, depth, limit=100):
+        """输掉时身上带着 depth 层虚环递归的对局（depth > 0）：(局数, 前 limit 局的编号)"""
+        if depth <= 0:
+            raise ValueError("虚环递归层数要大于 0")
+        # 条件里写上 void_recursion > 0 才会用到部分索引；命中的行不多（只有带着虚环递归结束的座位），直接数
+        where = "void_recursion > 0 AND void_recursion = ? AND won = 0"
+        return self._count_and_ids(f"SELECT COUNT(*) FROM seats WHERE {where}", "seats", where, (depth,), limit)
+
+    def locate(self, match_id):
+        """对局在哪个日志文件的哪个位置：(路径, 位置)，可以交给 gameLog.LogReader.record_at / gameViewer"""
+        rows = self.query("SELECT logs.path, matches.record_offset FROM matches JOIN logs ON logs.id = matches.log_id "
+                          "WHERE matches.id = ?", (match_id,))
+        if not rows:
+            raise KeyError(match_id)
+        return rows[0]
+
+    def lookup(self, card=None, roll=None, void=None, limit=100):
+        """按参数选择查询（命令行和 HTTP 接口用，参数可以是字符串）：
+        card+roll 骰出过某个点数，只有 card 打出过这张牌，void 输掉时带着的虚环递归层数；返回字典"""
+        limit = int(limit)
+        if card is not None and roll is not None:
+            count, ids = self.matches_with_roll(card, int(roll), limit)
+        elif card is not None:
+            count, ids = self.matches_with_card(card, limit)
+        elif void is not None:
+            count, ids = self.matches_lost_with_void(int(void), limit)
+        else:
+            raise ValueError("需要 card、card+roll 或 void")
+        return {"count": count, "matches": ids}
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            result = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("matches", "seats", "card_plays", "rolls")}
+        result["bytes"] = os.path.getsize(self.path)
+        return result
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对局历史库：导入对局日志、按卡牌和事件查询")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="导入对局日志（只导入还没导入过的对局）")
+    ingest.add_argument("db")
+    ingest.add_argument("logs", nargs="+")
+    ingest.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="每个事务的局数")
+    find = commands.add_parser("query", help="查询对局")
+    find.add_argument("db")
+    find.add_argument("--card", help="卡名")
+    find.add_argument("--roll", type=int, help="和 --card 一起用：骰出过这个点数")
+    find.add_argument("--void", type=int, help="输掉时带着的虚环递归层数")
+    find.add_argument("--limit", type=int, default=20)
+    find.add_argument("--sql", help="直接执行一条只读 SQL")
+    stats = commands.add_parser("stats", help="各表的行数和文件大小")
+    stats.add_argument("db")
+    args = parser.parse_args()
+    with MatchHistory(args.db) as history:
+        if args.command == "ingest":
+            for log in args.logs:
+                if gameLog.LogReader(log).stale:
+                    print(f"注意：{log} 记录时的卡牌定义和现在不同，卡牌编号按现在的卡牌表解释")
+                begin = time.perf_counter()
+                count = history.add_log(log, args.batch)
+                elapsed = time.perf_counter() - begin
+                print(f"{log}：导入 {count} 局，{elapsed:.2f} 秒（{count / max(elapsed, 1e-9):.0f} 局/秒）")
+        elif args.command == "query":
+            begin = time.perf_counter()
+            if args.sql:
+                answer = history.query(args.sql)
+            else:
+                answer = history.lookup(args.card, args.roll, args.void, args.limit)
+            elapsed = time.perf_counter() - begin
+            print(json.dumps(answer, ensure_ascii=False))
+            print(f"用时 {elapsed * 1e3:.2f} ms")
+        else:
+            for key, value in history.stats().items():
+                print(f"{key:>12}: {value}")
@@ -0,0 +1,123 @@
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import gameV1_3_2 as game
+
+# ====== 交互延迟 ======
+# 玩家按下回车之后要多久才能看到结果和更新后的状态？LatencyRecorder 给每个提示（prompt_input，见 gameV1_3_2）记三个时刻：
+#   issued    发出提示（之前的输出已经 flush）
+#   received  收到回车
+#   flushed   这次输入引起的输出全部写出：下一个提示发出前（或会话结束时）先 flush 标准输出，flush 返回的时刻
+# received - issued 是玩家思考的时间，flushed - received 是响应时间：结算、打印结果和状态、电脑对手思考，
+# 交互路径上任何慢的渲染或阻塞操作都会算在这里。提示的种类见 game.PROMPT_KINDS（出牌、弃牌、停骰、300龟……）。
+# 它同时是一个普通的 Tracer，span 照常记录，可以导出 Chrome trace 看响应时间里具体是哪一段慢。
+
+PromptRecord = namedtuple("PromptRecord", "kind issued received flushed")  # 时刻都是 perf_counter_ns
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class LatencyRecorder(game.Tracer):
+    """记录一局（一个会话）里每个提示的发出、收到输入、输出写完三个时刻"""
+
+    def __init__(self, max_spans=100000):
+        super().__init__(max_spans)
+        self.prompts = []
+        self._pending = None  # 收到了输入、还在等输出写完的提示：[种类, 发出, 收到]
+
+    def begin(self, name):
+        if name == "prompt":
+            return self._flush()
+        return time.perf_counter_ns()
+
+    def end(self, name, start, detail=None):
+        super().end(name, start, detail)
+        if name == "prompt":
+            self._pending = [detail, start, time.perf_counter_ns()]
+
+    def _flush(self):
+        # flush 标准输出，返回 flush 完的时刻；上一个提示的响应到这里结束
+        sys.stdout.flush()
+        now = time.perf_counter_ns()
+        pending = self._pending
+        if pending is not None:
+            self.prompts.append(PromptRecord(pending[0], pending[1], pending[2], now))
+            self._pending = None
+        return now
+
+    def close(self):
+        """会话结束：最后一个提示的响应到这里结束"""
+        self._flush()
+
+    def by_kind(self):
+        """{种类: (思考时间列表, 响应时间列表)}，单位 ns，各自已排序"""
+        kinds = {}
+        for record in self.prompts:
+            think, respond = kinds.setdefault(record.kind, ([], []))
+            think.append(record.received - record.issued)
+            respond.append(record.flushed - record.received)
+        for think, respond in kinds.values():
+            think.sort()
+            respond.sort()
+        return kinds
+
+    def latency_report(self, slowest=5):
+        """每种提示的思考时间和响应时间（中位数、p95、最大，毫秒），以及响应最慢的几次"""
+        lines = [f"{'提示':<12}{'次数':>6}{'思考中位':>10}{'思考最长':>10}{'响应中位':>10}{'响应p95':>10}{'响应最长':>10}"]
+        for kind, (think, respond) in sorted(self.by_kind().items(), key=lambda item: -item[1][1][-1]):
+            lines.append(f"{kind:<12}{len(respond):>6}{_percentile(think, 0.5) / 1e6:>10.1f}{think[-1] / 1e6:>10.1f}"
+                         f"{_percentile(respond, 0.5) / 1e6:>10.2f}{_percentile(respond, 0.95) / 1e6:>10.2f}"
+                         f"{respond[-1] / 1e6:>10.2f}")
+        if self.prompts:
+            lines.append(f"响应最慢的 {min(slowest, len(self.prompts))} 次（第几个提示、种类、ms）：")
+            ranked = sorted(enumerate(self.prompts), key=lambda item: item[1].received - item[1].flushed)
+            for index, record in ranked[:slowest]:
+                lines.append(f"  #{index:<5}{record.kind:<12}{(record.flushed - record.received) / 1e6:>10.2f}")
+        else:
+            lines.append("（没有记录到提示）")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        result = super().to_dict()
+        result["prompts"] = [{"kind": record.kind, "issued_us": (record.issued - self.origin) / 1e3,
+                              "received_us": (record.received - self.origin) / 1e3,
+                              "flushed_us": (record.flushed - self.origin) / 1e3}
+                             for record in self.prompts]
+        return result
+
+@contextmanager
+def latency_session(recorder=None):
+    """在这段代码里记录交互延迟（同时打开追踪），返回 LatencyRecorder；退出时结束最后一个提示"""
+    recorder = recorder if recorder is not None else LatencyRecorder()
+    try:
+        with game.tracing(recorder):
+            yield recorder
+    finally:
+        recorder.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="玩一局并报告每个提示的交互延迟")
+    parser.add_argument("--vs-bot", action="store_true", help="人机对战（gameAI.play_vs_bot）而不是双人 game_demo")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    parser.add_argument("--json", help="把提示时刻和 span 写到这个 JSON 文件")
+    parser.add_argument("--trace", help="把 span 写成 Chrome trace")
+    args = parser.parse_args()
+    with latency_session() as session:
+        try:
+            if args.vs_bot:
+                import gameAI
+                gameAI.play_vs_bot(deck_size=args.deck_size)
+            else:
+                game.game_demo(deck_size=args.deck_size)
+        except (EOFError, KeyboardInterrupt):
+            pass
+    print()
+    print(session.latency_report())
+    if args.json:
+        session.save_json(args.json)
+    if args.trace:
+        session.save_chrome_trace(args.trace)
@@ -0,0 +1,534 @@
+
+import argparse
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+import gameV1_3_2 as game
+
+# ====== 对局日志 ======
+# 每局记成一条只追加的事件记录，紧凑的二进制编码，常开也不心疼。
+# 整数都用 LEB128 变长编码（varint，小于 128 的数只占 1 字节），有符号数先做 zigzag。
+#
+# 文件 = 文件头（标识、版本、卡牌指纹）+ 一条条记录；每条记录 = varint 长度 + 内容。
+# 内容先是对局开始的字段（MatchStart：时间、种子、牌堆大小、是否调试卡牌、回合上限+1、关键帧间隔），
+# 后面是事件，每个事件 1 字节标签（种类 << 1 | 座位）加上 SPECS 里规定的字段：
+#   turn      回合开始（回合数）                 action    这一步的决定（动作编码，300龟的选择记在 turtle 里）
+#   deck      建好并洗好的牌库（张数、卡牌编号…）   draw      摸到的牌
+#   reshuffle 弃牌堆洗回牌库（洗好的顺序）         play      打出的牌
+#   roll      掷骰（面数、点数）                  commit    修改器结算到属性上（第几条属性、结算后的值）
+#   delayed   触发的延迟效果（DELAYED_EFFECTS 里的编号）  discard 弃掉的牌
+#   turtle    300龟选择（TURTLE_300_CHOICES 里的编号）
+#   result    结果（胜方+1，平局为 0；回合数；然后每个座位的状态标记、虚环递归层数、负行动力、各条属性）
+#   keyframe  关键帧：完整的对局状态（长度 + encode_keyframe 的编码），记在它后面那个 action 之前
+# 一般一个回合二三十个字节。每隔 keyframe_turns 个回合，到第一个决定时记一个关键帧（一百来个字节），
+# 回放和查看器可以从最近的关键帧开始，不用每次从第 0 回合重放（见 gameReplay、gameViewer）。
+# 洗回牌库时记下洗好的顺序，关键帧就不用保存对局随机数的状态（梅森旋转的状态有 2.5 KB）。
+#
+# 对局在自己的缓冲里记事件（MatchRecorder），结束时整条记录一次写进 MatchLog（带缓冲的追加写，多线程共用一把锁），
+# 进程崩溃时只丢掉还没下完的对局。种子让建牌和洗牌可以重现，加上记下的决定和点数就能原样回放（见 gameReplay）。
+
+MAGIC = b"CGEL"
+VERSION = 2
+HEADER = struct.Struct("<4sH40s")  # 标识, 版本, 卡牌指纹（含调试卡牌）
+
+EVENT_NAMES = ("turn", "action", "deck", "draw", "reshuffle", "play", "roll", "commit", "delayed", "discard",
+               "turtle", "result", "keyframe")
+(EV_TURN, EV_ACTION, EV_DECK, EV_DRAW, EV_RESHUFFLE, EV_PLAY, EV_ROLL, EV_COMMIT, EV_DELAYED, EV_DISCARD,
+ EV_TURTLE, EV_RESULT, EV_KEYFRAME) = range(len(EVENT_NAMES))
+# 每种事件的字段：u 无符号，s 有符号，* 张数加编号列表，b 长度加一段字节
+_SEAT_RESULT = "uuu" + "s" * game.NUM_STATS
+SPECS = ("u", "u", "*", "u", "*", "u", "uu", "us", "u", "u", "u", "uu" + _SEAT_RESULT * 2, "b")
+KEYFRAME_TURNS = 16
+DELAYED_EFFECTS = (game.chicken_machine_payoff,)
+_DELAYED_INDEX = {effect: index for index, effect in enumerate(DELAYED_EFFECTS)}
+# result 里状态标记的位
+RESULT_FLAGS = ("_skip_next_turn", "_qiu_luo_effect", "_pending_turtle_300", "_next_roll_value")
+
+MatchStart = namedtuple("MatchStart", "time seed deck_size debug_mode max_turns keyframe_turns")
+Event = namedtuple("Event", "kind seat values offset")
+
+def fingerprint():
+    return game.card_fingerprint(game.playable_prototypes(debug_mode=True))
+
+# ====== 编码 ======
+def _put(buf, value):
+    # 无符号 varint
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def _put_signed(buf, value):
+    _put(buf, (value << 1) ^ (value >> 63))
+
+def _get(data, pos):
+    # 读一个无符号 varint，返回 (值, 新位置)
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+# ====== 关键帧 ======
+# Match.snapshot() 的内容逐项编码；Zobrist 哈希不存，恢复后用 _rehash() 重新计算。
+# 状态标记可能是 False/True/整数或者不存在：0 不存在，1 False，2 True，3 + zigzag(整数)。快照的结构改了这里要跟着改。
+_DOUBLE = struct.Struct("<d")
+
+def _put_text(buf, text):
+    if text is None:
+        buf.append(0)
+        return
+    data = str(text).encode()
+    _put(buf, len(data) + 1)
+    buf.extend(data)
+
+def _status_code(value):
+    if value is game._ABSENT:
+        return 0
+    if value is False or value is True:
+        return 1 + value
+    return 3 + ((value << 1) ^ (value >> 63))
+
+def encode_keyframe(match):
+    """对局完整状态的紧凑编码（第一个字段是回合数）"""
+    players, max_turns, turn, first, winner, phase, actions_remaining, last_result = match.snapshot()
+    buf = bytearray()
+    for value in (turn, 0 if max_turns is None else max_turns + 1, first, 0 if winner is None else winner + 1, phase):
+        _put(buf, value)
+    _put_signed(buf, actions_remaining)
+    _put_text(buf, last_result)
+    for (name, values, modifiers, caps, preview, depleted, base_actions, negative, deck, hand, discard, dice_speed,
+         status, delayed, _) in players:
+        _put_text(buf, name)
+        for stats in (values, modifiers, caps, preview):
+            for value in stats:
+                _put_signed(buf, value)
+        for value in (depleted, base_actions, negative):
+            _put_signed(buf, value)
+        for pile in (deck, hand, discard):
+            _put(buf, len(pile))
+            buf.extend(pile)
+        buf.extend(_DOUBLE.pack(dice_speed))
+        for value in status:
+            _put(buf, _status_code(value))
+        _put(buf, len(delayed))
+        for effect_turn, effect in delayed:
+            _put(buf, effect_turn)
+            _put(buf, _DELAYED_INDEX.get(effect, len(DELAYED_EFFECTS)))
+    return bytes(buf)
+
+def keyframe_turn(data):
+    """关键帧是第几回合的（不用解码整个关键帧）"""
+    return _get(data, 0)[0]
+
+def decode_keyframe(data):
+    """从 encode_keyframe 的编码恢复出一个 Match（不带日志记录器）"""
+    pos = 0
+
+    def take(signed=False):
+        nonlocal pos
+        value, pos = _get(data, pos)
+        return _unzigzag(value) if signed else value
+
+    def take_text():
+        nonlocal pos
+        length = take()
+        if not length:
+            return None
+        pos += length - 1
+        return bytes(data[pos - length + 1:pos]).decode()
+
+    def take_bytes(count):
+        nonlocal pos
+        pos += count
+        return data[pos - count:pos]
+
+    turn, max_turns, first, winner, phase = (take() for _ in range(5))
+    actions_remaining = take(True)
+    last_result = take_text()
+    players = []
+    for _ in range(2):
+        name = take_text()
+        stats = [array("i", [take(True) for _ in range(game.NUM_STATS)]) for _ in range(4)]
+        depleted, base_actions, negative = (take(True) for _ in range(3))
+        piles = [array("B", take_bytes(take())) for _ in range(3)]
+        dice_speed = _DOUBLE.unpack(take_bytes(_DOUBLE.size))[0]
+        status = []
+        for _ in game._STATUS_ATTRS:
+            code = take()
+            status.append(game._ABSENT if code == 0 else bool(code - 1) if code < 3 else _unzigzag(code - 3))
+        delayed = []
+        for _ in range(take()):
+            effect_turn, index = take(), take()
+            if index >= len(DELAYED_EFFECTS):
+                raise ValueError("关键帧里有不认识的延迟效果")
+            delayed.append((effect_turn, DELAYED_EFFECTS[index]))
+        players.append((name, *stats, depleted, base_actions, negative, *piles, dice_speed, tuple(status),
+                        tuple(delayed), (0, 0, 0, 0)))
+    match = game.Match.from_snapshot((tuple(players), max_turns - 1 if max_turns else None, turn, first,
+                                      winner - 1 if winner else None, phase, actions_remaining, last_result))
+    for player in match.players:
+        player._rehash()
+    return match
+
+class _SeatEvents:
+    """一个座位的事件入口，引擎通过 player._events 调用；小于 128 的值直接写一个字节，省掉 _put 的调用"""
+    __slots__ = ("buffer", "seat", "tags")
+
+    def __init__(self, buffer, seat):
+        self.buffer = buffer
+        self.seat = seat
+        self.tags = [kind << 1 | seat for kind in range(len(EVENT_NAMES))]
+
+    def draw(self, card_id):
+        buf = self.buffer
+        buf.append(self.tags[EV_DRAW])
+        if card_id < 0x80:
+            buf.append(card_id)
+        else:
+            _put(buf, card_id)
+
+    def reshuffle(self, deck):
+        buf = self.buffer
+        buf.append(self.tags[EV_RESHUFFLE])
+        _put(buf, len(deck))
+        buf.extend(deck)
+
+    def play(self, card_id):
+        buf = self.buffer
+        buf.append(self.tags[EV_PLAY])
+        if card_id < 0x80:
+            buf.append(card_id)
+        else:
+            _put(buf, card_id)
+
+    def discard(self, card_id):
+        buf = self.buffer
+        buf.append(self.tags[EV_DISCARD])
+        if card_id < 0x80:
+            buf.append(card_id)
+        else:
+            _put(buf, card_id)
+
+    def roll(self, sides, value):
+        buf = self.buffer
+        buf.append(self.tags[EV_ROLL])
+        if sides < 0x80:
+            buf.append(sides)
+            buf.append(value)
+        else:
+            _put(buf, sides)
+            _put(buf, value)
+        return value
+
+    def commit(self, stat, value):
+        buf = self.buffer
+        buf.append(self.tags[EV_COMMIT])
+        buf.append(stat)
+        if 0 <= value < 0x40:
+            buf.append(value << 1)
+        else:
+            _put_signed(buf, value)
+
+    def delayed(self, effect):
+        buf = self.buffer
+        buf.append(self.tags[EV_DELAYED])
+        _put(buf, _DELAYED_INDEX.get(effect, len(DELAYED_EFFECTS)))
+
+    def turtle(self, choice):
+        buf = self.buffer
+        buf.append(self.tags[EV_TURTLE])
+        _put(buf, choice)
+
+class MatchRecorder:
+    """一局的事件缓冲，作为 Match 的 events；对局结束时整条记录交给 log（MatchLog，可以为 None）
+
+    keyframe_turns 是关键帧的间隔（回合数），0 表示不记关键帧。
+    """
+
+    seat_events = _SeatEvents
+
+    def __init__(self, log=None, keyframe_turns=KEYFRAME_TURNS):
+        self.log = log
+        self.buffer = bytearray()
+        self.seats = (self.seat_events(self.buffer, 0), self.seat_events(self.buffer, 1))
+        self.finished = False
+        self.keyframe_turns = keyframe_turns
+        self.next_keyframe = keyframe_turns or sys.maxsize  # 到了这个回合的第一个决定就记关键帧
+
+    def seat(self, index):
+        return self.seats[index]
+
+    def start(self, match, deck_size, debug_mode):
+        self._start_fields(match, deck_size, debug_mode)
+        buf = self.buffer
+        for seat, player in enumerate(match.players):
+            buf.append(EV_DECK << 1 | seat)
+            _put(buf, len(player.deck))
+            buf.extend(player.deck)
+
+    def _start_fields(self, match, deck_size, debug_mode):
+        # MatchStart 的各个字段
+        for value in (int(time.time()), match.seed, deck_size, int(debug_mode),
+                      0 if match.max_turns is None else match.max_turns + 1, self.keyframe_turns):
+            _put(self.buffer, value)
+
+    def turn(self, turn, seat):
+        buf = self.buffer
+        buf.append(EV_TURN << 1 | seat)
+        _put(buf, turn)
+
+    def action(self, match, action):
+        if match.turn >= self.next_keyframe:
+            self.keyframe(match)
+        buf = self.buffer
+        buf.append(EV_ACTION << 1 | match.current_index)
+        buf.append(action)  # 动作编码都小于 128
+
+    def keyframe(self, match):
+        # 决定做出之前（step 还没有改动任何状态）的完整状态
+        self.next_keyframe = (match.turn // self.keyframe_turns + 1) * self.keyframe_turns
+        data = encode_keyframe(match)
+        buf = self.buffer
+        buf.append(EV_KEYFRAME << 1 | match.current_index)
+        _put(buf, len(data))
+        buf.extend(data)
+
+    def finish(self, match):
+        buf = self.buffer
+        buf.append(EV_RESULT << 1)
+        _put(buf, 0 if match.winner is None else match.winner + 1)
+        _put(buf, match.turn)
+        for player in match.players:
+            state = player.__dict__
+            _put(buf, sum(1 << bit for bit, key in enumerate(RESULT_FLAGS) if state.get(key)))
+            _put(buf, state.get("_void_box_recursion", 0))
+            _put(buf, player._negative_action_points)
+            for value in player._stat_preview:
+                _put_signed(buf, value)
+        self.finished = True
+        if self.log is not None:
+            self.log.append(buf)
+
+# ====== 写 ======
+class MatchLog:
+    """只追加的对局日志文件；recorder() 给每一局一个记录器，结束的对局整条追加，多个线程可以共用"""
+
+    def __init__(self, path, buffer_size=1 << 16, keyframe_turns=KEYFRAME_TURNS):
+        self.path = path
+        self.keyframe_turns = keyframe_turns
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as f:
+                _check_header(path, f.read(HEADER.size))
+        self._file = open(path, "ab", buffering=buffer_size)
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, fingerprint().encode()))
+        self._lock = threading.Lock()
+        self.matches = 0
+
+    def recorder(self):
+        return MatchRecorder(self, self.keyframe_turns)
+
+    def append(self, payload):
+        head = bytearray()
+        _put(head, len(payload))
+        with self._lock:
+            self._file.write(head)
+            self._file.write(payload)
+            self.matches += 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ====== 读 ======
+def _check_header(path, header):
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} 不是对局日志文件")
+    magic, version, stamp = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} 不是对局日志文件（或版本不兼容）")
+    return stamp.decode()
+
+class LogReader:
+    """读取对局日志：for offset, payload in reader 依次给出每条记录在文件里的位置和内容（整个文件一次读进内存）"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read()
+        self.fingerprint = _check_header(path, data[:HEADER.size])
+        self.data = memoryview(data)
+
+    @property
+    def stale(self):
+        # 卡牌定义改过了：回放出来的事件可能对不上
+        return self.fingerprint != fingerprint()
+
+    def __iter__(self):
+        for offset, payload, _ in self.records():
+            yield offset, payload
+
+    def records(self, start=HEADER.size):
+        """从文件里的 start 位置（某条记录的开头）往后，依次给出 (位置, 内容, 下一条记录的位置)"""
+        data, pos, end = self.data, max(start, HEADER.size), len(self.data)
+        while pos < end:
+            length, begin = _get(data, pos)
+            if begin + length > end:
+                return  # 写到一半的记录（进程被杀）
+            yield pos, bytes(data[begin:begin + length]), begin + length
+            pos = begin + length
+
+    def record_at(self, offset):
+        length, start = _get(self.data, offset)
+        return bytes(self.data[start:start + length])
+
+def parse_start(payload):
+    """返回 (MatchStart, 第一个事件的位置)"""
+    values = []
+    pos = 0
+    for _ in range(len(MatchStart._fields)):
+        value, pos = _get(payload, pos)
+        values.append(value)
+    values[3] = bool(values[3])
+    values[4] = values[4] - 1 if values[4] else None
+    return MatchStart(*values), pos
+
+def read_event(payload, pos):
+    """解码 pos 处的一个事件，返回 (Event, 下一个事件的位置)"""
+    tag = payload[pos]
+    kind, seat = tag >> 1, tag & 1
+    offset = pos
+    pos += 1
+    values = []
+    for field in SPECS[kind]:
+        value, pos = _get(payload, pos)
+        if field == "s":
+            value = _unzigzag(value)
+        elif field == "*":
+            values.extend(payload[pos:pos + value])
+            pos += value
+            continue
+        elif field == "b":
+            value = bytes(payload[pos:pos + value])
+            pos += len(value)
+        values.append(value)
+    return Event(kind, seat, tuple(values), offset), pos
+
+def iter_events(payload, pos=None):
+    if pos is None:
+        pos = parse_start(payload)[1]
+    end = len(payload)
+    while pos < end:
+        event, pos = read_event(payload, pos)
+        yield event
+
+def describe(event):
+    """一个事件的文字说明"""
+    kind, seat, values = event.kind, event.seat, event.values
+    name = EVENT_NAMES[kind]
+    if kind in (EV_DRAW, EV_PLAY, EV_DISCARD):
+        return f"P{seat} {name} {game.CARD_REGISTRY[values[0]].name}"
+    if kind == EV_DECK:
+        return f"P{seat} deck {[game.CARD_REGISTRY[card_id].name for card_id in values]}"
+    if kind == EV_ROLL:
+        return f"P{seat} roll d{values[0]} → {values[1]}"
+    if kind == EV_COMMIT:
+        return f"P{seat} {game.STAT_LABELS[values[0]]} = {values[1]}"
+    if kind == EV_DELAYED:
+        index = values[0]
+        return f"P{seat} delayed {DELAYED_EFFECTS[index].__name__ if index < len(DELAYED_EFFECTS) else '?'}"
+    if kind == EV_TURTLE:
+        return f"P{seat} turtle {game.TURTLE_300_CHOICES[values[0]]}"
+    if kind == EV_ACTION:
+        action = values[0]
+        label = {game.ACTION_END_TURN: "end turn", game.ACTION_SURRENDER: "surrender"}.get(action, f"hand[{action}]")
+        return f"P{seat} action {label}"
+    if kind == EV_TURN:
+        return f"--- turn {values[0]} (P{seat}) ---"
+    if kind == EV_RESHUFFLE:
+        return f"P{seat} reshuffle {[game.CARD_REGISTRY[card_id].name for card_id in values]}"
+    if kind == EV_KEYFRAME:
+        return f"keyframe turn {keyframe_turn(values[0])} ({len(values[0])} bytes)"
+    if kind == EV_RESULT:
+        winner = "draw" if values[0] == 0 else f"P{values[0] - 1} wins"
+        return f"result {winner} after {values[1]} turns"
+    return f"P{seat} {name}"
+
+# ====== 命令行 ======
+def record_matches(path, games, policy=game.random_policy, deck_size=game.DEFAULT_DECK_SIZE, max_turns=500):
+    """无头跑 games 局并记到 path，返回写入的局数"""
+    with MatchLog(path) as log:
+        for _ in range(games):
+            game.simulate_match(deck_size, policy, max_turns, events=log.recorder())
+        return log.matches
+
+def log_stats(path):
+    # 局数、总字节、平均每局/每回合字节
+    reader = LogReader(path)
+    matches = size = turns = events = 0
+    for _, payload in reader:
+        matches += 1
+        size += len(payload)
+        for event in iter_events(payload):
+            events += 1
+            if event.kind == EV_RESULT:
+                turns += max(1, event.values[1])
+    return {"matches": matches, "bytes": size, "events": events, "turns": turns,
+            "bytes_per_match": size / max(1, matches), "bytes_per_turn": size / max(1, turns)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对局日志：记录、统计、查看")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="无头跑一批对局并记到日志")
+    record.add_argument("path")
+    record.add_argument("games", type=int, nargs="?", default=1000)
+    record.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    record.add_argument("--seed", type=int, default=0)
+    stats = commands.add_parser("stats", help="日志的大小统计")
+    stats.add_argument("path")
+    dump = commands.add_parser("dump", help="逐个打印一局的事件")
+    dump.add_argument("path")
+    dump.add_argument("index", type=int, nargs="?", default=0, help="第几局（从 0 开始）")
+    args = parser.parse_args()
+    if args.command == "record":
+        random.seed(args.seed)
+        start = time.perf_counter()
+        count = record_matches(args.path, args.games, deck_size=args.deck_size)
+        print(f"记录了 {count} 局，{time.perf_counter() - start:.2f} 秒")
+    elif args.command == "stats":
+        for key, value in log_stats(args.path).items():
+            print(f"{key:>16}: {value:.1f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    else:
+        for index, (_, payload) in enumerate(LogReader(args.path)):
+            if index == args.index:
+                start, pos = parse_start(payload)
+                print(start)
+                for event in iter_events(payload, pos):
+                    print(describe(event))
+                break
+        else:
+            sys.exit(f"日志里没有第 {args.index} 局")
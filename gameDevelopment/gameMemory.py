@@ -0,0 +1,165 @@
+
+import argparse
+import contextlib
+import gc
+import io
+import random
+import sys
+import tracemalloc
+import types
+import weakref
+from array import array
+
+import gameV1_3_2 as game
+
+# ====== 内存剖析与泄漏检查 ======
+# 长时间运行的进程（服务器，或者 main_menu 一局接一局）要求每打完一局内存都回到原位。这里提供两样工具：
+#   match_memory_report  用 tracemalloc 逐局记录对局中的峰值和对局结束（gc 之后）仍然占着的内存，
+#                        给出每局净增的斜率，并按分配位置列出整段时间里净增最多的几处
+#   assert_no_leaks      每局前后清点 gc 跟踪的 Player、Match、Card 和闭包，这一局新建的任何一个活过了对局就报错；
+#                        同时检查对局结束时玩家身上有没有多出来的动态属性（状态标记应该都在 _STATUS_ATTRS 里）
+# 对局可以是无头的 Match（play_headless_match），也可以是 main_menu 用的 game_demo（play_demo_match，输入由脚本给出）。
+
+def play_headless_match(policy=game.random_policy, deck_size=game.DEFAULT_DECK_SIZE, max_turns=500):
+    """无头打完一局，返回结束的 Match"""
+    with game.headless_mode():
+        match = game.Match(deck_size=deck_size, max_turns=max_turns)
+        while not match.done:
+            match.step(policy(match))
+    return match
+
+def play_demo_match(deck_size=game.DEFAULT_DECK_SIZE, answers=5000):
+    """用脚本输入跑一局 game_demo（每个提示都回答 0：出第一张牌、弃第一张牌），输出丢弃；返回 None"""
+    stdin = sys.stdin
+    sys.stdin = io.StringIO("0\n" * answers)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.game_demo(deck_size=deck_size)
+    except EOFError:
+        pass
+    finally:
+        sys.stdin = stdin
+
+# ====== 每局内存报告 ======
+class MemoryReport:
+    """match_memory_report 的结果：每局的峰值增量、对局结束后相对起点的占用（字节），以及净增最多的分配位置"""
+
+    def __init__(self, peaks, retained, top_sites):
+        self.peaks = peaks
+        self.retained = retained
+        self.top_sites = top_sites
+
+    @property
+    def growth_per_match(self):
+        # 对局结束后占用随局数的最小二乘斜率（字节/局）
+        n = len(self.retained)
+        if n < 2:
+            return 0.0
+        mean_x = (n - 1) / 2
+        mean_y = sum(self.retained) / n
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(self.retained))
+        variance = sum((x - mean_x) ** 2 for x in range(n))
+        return covariance / variance
+
+    def format(self):
+        n = len(self.peaks)
+        lines = [f"对局数 {n}，每局峰值 平均 {sum(self.peaks) / n / 1024:.1f} KiB，最大 {max(self.peaks) / 1024:.1f} KiB",
+                 f"对局结束后的占用（相对起点）：第一局 {self.retained[0]} B，最后一局 {self.retained[-1]} B，"
+                 f"斜率 {self.growth_per_match:+.1f} B/局",
+                 "净增最多的分配位置："]
+        lines.extend(f"  {stat}" for stat in self.top_sites)
+        return "\n".join(lines)
+
+def match_memory_report(games=200, play=play_headless_match, warmup=5, top=10):
+    """逐局跑 play() 并用 tracemalloc 记录内存；warmup 局先跑掉，避免把缓存、驻留字符串的首次分配算成增长"""
+    tracemalloc.start()
+    try:
+        for _ in range(warmup):
+            play()
+        gc.collect()
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        start = tracemalloc.take_snapshot().filter_traces(ignore)
+        # 结果数组预先分配好，记录本身不会算进每局的净增
+        peaks = array("q", bytes(8 * games))
+        retained = array("q", bytes(8 * games))
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(games):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            play()
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks[i] = peak - before
+            retained[i] = current - baseline
+        end = tracemalloc.take_snapshot().filter_traces(ignore)
+    finally:
+        tracemalloc.stop()
+    return MemoryReport(peaks, retained, end.compare_to(start, "lineno")[:top])
+
+# ====== 泄漏检查 ======
+def _watched(obj):
+    # 需要在对局结束后消失的对象：玩家、对局、卡牌实例、闭包
+    if isinstance(obj, (game.Player, game.Match, game.Card)):
+        return True
+    return type(obj) is types.FunctionType and obj.__closure__ is not None
+
+def _describe(obj):
+    if type(obj) is types.FunctionType:
+        return f"闭包 {obj.__qualname__}（{obj.__code__.co_filename}:{obj.__code__.co_firstlineno}）"
+    referrers = [type(ref).__name__ for ref in gc.get_referrers(obj)][:5]
+    return f"{type(obj).__name__} {getattr(obj, 'name', '')}（被 {', '.join(referrers)} 引用）"
+
+def _player_attrs():
+    # 玩家允许带的属性：新建玩家的全部属性、状态标记、延迟效果列表、带种子的对局给的随机数和搜索副本的骰子
+    return set(vars(game.Player("_", []))) | set(game._STATUS_ATTRS) | {"_delayed_effects", "_rng", "_dice"}
+
+def _extra_attrs(result, allowed):
+    # 单独成函数，循环变量不会在调用方留下对玩家的引用
+    extra = set()
+    if isinstance(result, game.Match):
+        for player in result.players:
+            extra |= set(vars(player)) - allowed
+    return extra
+
+def _new_watched(existing):
+    # 不用推导式：推导式本身是一个引用了 existing 的闭包，会被当成泄漏
+    found = []
+    for obj in gc.get_objects():
+        if _watched(obj) and obj not in existing:
+            found.append(obj)
+    return found
+
+def assert_no_leaks(play=play_headless_match, games=20, warmup=2):
+    """跑 games 局，每局检查这一局新建的 Player/Match/Card/闭包 在对局结束后是否都已释放，玩家有没有多出来的属性
+
+    发现问题时抛出 AssertionError（列出活下来的对象和它们的引用者）；返回检查过的局数。
+    """
+    allowed = _player_attrs()
+    for _ in range(warmup):
+        play()
+    for _ in range(games):
+        gc.collect()
+        existing = weakref.WeakSet(filter(_watched, gc.get_objects()))
+        extra = _extra_attrs(play(), allowed)
+        gc.collect()
+        survivors = _new_watched(existing)
+        problems = [_describe(obj) for obj in survivors[:10]]
+        if extra:
+            problems.append(f"玩家身上多出来的属性：{', '.join(sorted(extra))}")
+        if problems:
+            raise AssertionError(f"对局结束后有 {len(survivors)} 个对象没有释放：\n" + "\n".join(problems))
+    return games
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="每局内存报告与泄漏检查")
+    parser.add_argument("games", type=int, nargs="?", default=200, help="内存报告的对局数（默认 200）")
+    parser.add_argument("--demo", action="store_true", help="检查 game_demo（main_menu 里的对局）而不是无头对局")
+    parser.add_argument("--max-growth", type=float, default=64.0, help="每局净增斜率的上限（字节），超过则以非零状态退出")
+    args = parser.parse_args()
+    random.seed(0)
+    runner = play_demo_match if args.demo else play_headless_match
+    checked = assert_no_leaks(runner)
+    print(f"泄漏检查通过（{checked} 局）")
+    report = match_memory_report(args.games, runner)
+    print(report.format())
+    sys.exit(0 if report.growth_per_match <= args.max_growth else 1)
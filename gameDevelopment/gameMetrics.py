@@ -0,0 +1,284 @@
+
+import argparse
+import json
+import random
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import gameV1_3_2 as game
+
+# ====== 运行指标 ======
+# Metrics 是一个 Tracer：用 game.tracing(metrics) 装上之后，引擎原有的埋点（见 gameV1_3_2 的“追踪”一节）
+# 直接变成运行指标，不需要另外加钩子：
+#   对局开始/结束/放弃、回合数和掷骰数（及每秒速率）、掷骰结算耗时和等待输入耗时的直方图、
+#   正在闪现的骰子数、排队的延迟效果数、电脑对手用掉的 CPU 时间。
+# 每个线程写自己的分片（threading.local），游戏循环里不加锁；只有新线程第一次写入时登记分片要拿一次锁。
+# 读的时候把各分片加起来，线程结束后它的分片并进 _retired，不会随着 Ponderer 不断开新线程越积越多。
+#
+# 进程内用 metrics.stats()（字典）读取；start_server() 在本地端口上提供
+#   /metrics  Prometheus 文本格式（0.0.4）
+#   /stats    同样内容的 JSON
+#   /history  查询对局历史库（给了 history 时，见 gameHistory）：?card=300龟&roll=300、?card=虚环之匣、?void=2，可加 &limit=
+# 两个速率（回合/秒、掷骰/秒）是相对上一次读取算的，多个采集方同时读时各自看到的窗口会变短，以 Prometheus 的 rate() 为准。
+PREFIX = "cardgame"
+DEFAULT_PORT = 9464
+# 直方图的上界（秒）：无头结算在几十微秒，玩家在终端里停骰、出牌要几秒
+BUCKETS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0)
+HISTOGRAMS = {  # span 名称 → 指标名
+    "resolve": "roll_resolution_seconds",
+    "prompt": "prompt_latency_seconds",
+}
+
+class _Shard:
+    # 一个线程的计数器和直方图，只有这个线程写
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}  # 名称 → [各桶次数..., 超出最后一个上界的次数, 总耗时 ns]
+
+    def merge(self, other):
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, buckets in other.histograms.items():
+            mine = self.histograms.get(name)
+            if mine is None:
+                self.histograms[name] = list(buckets)
+            else:
+                for i, value in enumerate(buckets):
+                    mine[i] += value
+
+class Metrics(game.Tracer):
+    """按线程分片累计的运行指标（不保存 span 明细）"""
+
+    def __init__(self, buckets=BUCKETS):
+        super().__init__(max_spans=0)
+        self.buckets = tuple(buckets)
+        self._bounds_ns = [int(bound * 1e9) for bound in self.buckets]
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._lock = threading.Lock()
+        self._last_rate = (time.perf_counter(), 0, 0)
+        self.started = time.time()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    # ====== 埋点入口 ======
+    def end(self, name, start, detail=None):
+        duration = time.perf_counter_ns() - start
+        shard = self._shard()
+        counters = shard.counters
+        counters[name] = counters.get(name, 0) + 1
+        if name in HISTOGRAMS:
+            histogram = shard.histograms.get(name)
+            if histogram is None:
+                histogram = shard.histograms[name] = [0] * (len(self._bounds_ns) + 2)
+            histogram[bisect_left(self._bounds_ns, duration)] += 1
+            histogram[-1] += duration
+
+    def count(self, name, amount=1):
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + amount
+
+    # ====== 读取 ======
+    def totals(self):
+        """各线程分片之和（一个新的 _Shard）；顺带把已经结束的线程的分片并进 _retired"""
+        total = _Shard(None)
+        with self._lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    self._retired.merge(shard)
+            self._shards = alive
+            total.merge(self._retired)
+            shards = list(alive)
+        for shard in shards:
+            # 别的线程可能正在写：dict() 在 GIL 下一次复制完，读到的是某个时刻的一致值
+            other = _Shard(None)
+            other.counters = dict(shard.counters)
+            other.histograms = {name: list(buckets) for name, buckets in dict(shard.histograms).items()}
+            total.merge(other)
+        return total
+
+    def stats(self):
+        """当前指标的字典；速率是相对上一次 stats() 的"""
+        total = self.totals()
+        counters = total.counters
+        turns, rolls = counters.get("turn", 0), counters.get("roll", 0)
+        now = time.perf_counter()
+        with self._lock:
+            last_time, last_turns, last_rolls = self._last_rate
+            self._last_rate = (now, turns, rolls)
+        elapsed = max(now - last_time, 1e-9)
+        started = counters.get("match_started", 0)
+        finished = counters.get("match_finished", 0)
+        abandoned = counters.get("match_abandoned", 0)
+        histograms = {}
+        for span, metric in HISTOGRAMS.items():
+            buckets = total.histograms.get(span) or [0] * (len(self.buckets) + 2)
+            cumulative, running = [], 0
+            for bound, value in zip(self.buckets, buckets):
+                running += value
+                cumulative.append((bound, running))
+            histograms[metric] = {"buckets": cumulative, "count": running + buckets[-2], "sum": buckets[-1] / 1e9}
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "matches_started": started,
+            "matches_finished": finished,
+            "matches_abandoned": abandoned,
+            "matches_active": started - finished - abandoned,
+            "turns": turns,
+            "rolls": rolls,
+            "turns_per_second": (turns - last_turns) / elapsed,
+            "rolls_per_second": (rolls - last_rolls) / elapsed,
+            "flicker_sessions": counters.get("flicker", 0),
+            "delayed_effects_pending": self.gauges.get("delayed_effects", 0),
+            "bot_cpu_seconds": counters.get("bot_cpu_ns", 0) / 1e9,
+            "histograms": histograms,
+        }
+
+    def prometheus(self):
+        """Prometheus 文本格式"""
+        stats = self.stats()
+        lines = []
+
+        def metric(name, kind, help_text, value):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.append(f"{PREFIX}_{name} {value}")
+
+        metric("matches_started_total", "counter", "Matches started", stats["matches_started"])
+        metric("matches_finished_total", "counter", "Matches played to the end", stats["matches_finished"])
+        metric("matches_abandoned_total", "counter", "Matches dropped before they ended", stats["matches_abandoned"])
+        metric("matches_active", "gauge", "Matches in progress", stats["matches_active"])
+        metric("turns_total", "counter", "Turns played, including bot search simulations", stats["turns"])
+        metric("rolls_total", "counter", "Dice rolls, including bot search simulations", stats["rolls"])
+        metric("turns_per_second", "gauge", "Turns per second since the previous read", stats["turns_per_second"])
+        metric("rolls_per_second", "gauge", "Rolls per second since the previous read", stats["rolls_per_second"])
+        metric("flicker_sessions", "gauge", "Dice flicker threads running", stats["flicker_sessions"])
+        metric("delayed_effects_pending", "gauge", "Delayed effects queued at the latest turn start",
+               stats["delayed_effects_pending"])
+        metric("bot_cpu_seconds_total", "counter", "Thread CPU time used by bots", stats["bot_cpu_seconds"])
+        for name, histogram in stats["histograms"].items():
+            lines.append(f"# HELP {PREFIX}_{name} " + ("Time from roll to resolved effect" if name.startswith("roll")
+                                                      else "Time spent waiting for player input"))
+            lines.append(f"# TYPE {PREFIX}_{name} histogram")
+            for bound, value in histogram["buckets"]:
+                lines.append(f'{PREFIX}_{name}_bucket{{le="{bound:g}"}} {value}')
+            lines.append(f'{PREFIX}_{name}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{PREFIX}_{name}_sum {histogram['sum']}")
+            lines.append(f"{PREFIX}_{name}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        stats = self.stats()
+        lines = [f"{name:<26}{value:.3f}" if isinstance(value, float) else f"{name:<26}{value}"
+                 for name, value in stats.items() if name != "histograms"]
+        for name, histogram in stats["histograms"].items():
+            mean = histogram["sum"] / histogram["count"] * 1e3 if histogram["count"] else 0.0
+            lines.append(f"{name:<26}{histogram['count']} 次，平均 {mean:.3f} ms")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return self.stats()
+
+# ====== HTTP 端点 ======
+class _Handler(BaseHTTPRequestHandler):
+    metrics = None
+    history = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/metrics":
+            body, kind = self.metrics.prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif url.path == "/stats":
+            body, kind = json.dumps(self.metrics.stats(), ensure_ascii=False).encode(), "application/json"
+        elif url.path == "/history" and self.history is not None:
+            # 每个请求线程从历史库的连接池里借一个连接
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                answer = self.history.lookup(**params)
+            except (TypeError, ValueError) as exc:
+                # 说明是中文，状态行只能放 latin-1，所以放进 JSON 正文（send_error 会在编码状态行时出错断开）
+                body = json.dumps({"error": str(exc)}, ensure_ascii=False).encode()
+                self._send(400, body, "application/json; charset=utf-8")
+                return
+            body, kind = json.dumps(answer, ensure_ascii=False).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self._send(200, body, kind)
+
+    def _send(self, status, body, kind):
+        self.send_response(status)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 不往终端里打访问日志，会弄乱对局输出
+
+def start_server(metrics, host="127.0.0.1", port=DEFAULT_PORT, history=None):
+    """在后台线程里提供 /metrics 和 /stats（给了 history 时还有 /history），返回服务器（用完调用 shutdown()）；
+    port=0 时随机选一个空闲端口"""
+    handler = type("MetricsHandler", (_Handler,), {"metrics": metrics, "history": history})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一边跑无头对局一边在本地端口提供运行指标")
+    parser.add_argument("games", type=int, nargs="?", default=0, help="对局数（默认 0：一直跑到 Ctrl-C）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--policy", choices=("random", "greedy"), default="random", help="双方使用的策略")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    parser.add_argument("--log", help="同时把每局记到这个对局日志文件（见 gameLog）")
+    parser.add_argument("--history", help="在 /history 上提供这个对局历史库的查询（见 gameHistory）")
+    args = parser.parse_args()
+    if args.policy == "greedy":
+        import gameAI
+        chosen = gameAI.greedy_policy
+    else:
+        chosen = game.random_policy
+    metrics = Metrics()
+    history = None
+    if args.history:
+        import gameHistory
+        history = gameHistory.MatchHistory(args.history)
+    server = start_server(metrics, args.host, args.port, history)
+    print(f"指标：http://{args.host}:{server.server_address[1]}/metrics")
+    log = None
+    if args.log:
+        import gameLog
+        log = gameLog.MatchLog(args.log)
+    random.seed(0)
+    played = 0
+    try:
+        with game.tracing(metrics):
+            while not args.games or played < args.games:
+                game.simulate_match(args.deck_size, chosen, events=log.recorder() if log else None)
+                played += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        if log:
+            log.close()
+    print(metrics.report())
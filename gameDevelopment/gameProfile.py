@@ -0,0 +1,180 @@
+
+import argparse
+import inspect
+import random
+import time
+import tracemalloc
+
+import gameV1_3_2 as game
+
+# ====== 按卡牌的性能剖析 ======
+# 跑一批无头对局（模拟战役），借引擎的追踪埋点（见 gameV1_3_2 的 Tracer）把开销记到每张卡名下：
+#   耗时（墙钟和线程 CPU）、掷骰次数（其中虚环递归判定单独计），
+#   打开 track_memory 时再用 tracemalloc 记录结算过程中的内存峰值和卡牌代码分配的内存块（会慢好几倍，耗时只作参考）。
+# CPython 没有“分配次数”计数器：tracemalloc 只在每次结算期间打开，结算结束时还在的、分配位置在卡牌代码
+# （CARD_CODE，卡牌和引擎所在的文件）里的内存块算作这张卡分配的；剖析器自己的记账（包括基类 Tracer 的汇总）
+# 不算在内，结算中途分配又释放掉的块也不在里面。
+#
+# 同时按 span 的嵌套关系累计每条调用路径的自身耗时，输出火焰图工具（flamegraph.pl、inferno、speedscope）
+# 通用的折叠栈格式：每行 "match;turn;play;Card.play;曼妥思之神 微秒数"。
+
+CARD_CODE = (game.__file__,)
+
+def _tracer_lines():
+    # Tracer（剖析器的基类）在引擎文件里占的行，这里的分配是剖析器的记账
+    lines, first = inspect.getsourcelines(game.Tracer)
+    return range(first, first + len(lines))
+
+class CardStats:
+    __slots__ = ("plays", "wall_ns", "cpu_ns", "rolls", "recursion_rolls", "blocks", "peak_bytes")
+
+    def __init__(self):
+        self.plays = self.wall_ns = self.cpu_ns = self.rolls = self.recursion_rolls = self.blocks = 0
+        self.peak_bytes = 0
+
+class CardProfiler(game.Tracer):
+    """按卡名汇总开销、按调用路径累计自身耗时的 Tracer
+
+    span 栈是全局的，只适合单线程的模拟；没有正常结束的 span 在外层 span 结束时一并弹出。
+    """
+
+    def __init__(self, track_memory=False):
+        super().__init__(max_spans=0)
+        self.track_memory = track_memory
+        self.cards = {}         # 卡名 → CardStats
+        self.outside_rolls = 0  # 不在任何一张卡的结算里的掷骰（决定先手等）
+        self.folded = {}        # 调用路径 → 自身耗时 ns
+        self.elapsed_ns = 0
+        self._stack = []        # [名称, 开始 ns, 子 span 耗时 ns]
+        self._card = None       # 正在结算的卡：[掷骰, 递归判定, CPU 起点]
+        self._tracer_lines = _tracer_lines()
+
+    def begin(self, name):
+        frame = [name, 0, 0]
+        self._stack.append(frame)
+        if name == "Card.play":
+            card = self._card = [0, 0, 0]
+            if self.track_memory:
+                # 剖析器自己的分配都在这之前，只追踪结算本身
+                tracemalloc.start()
+            card[2] = time.thread_time_ns()
+        start = frame[1] = time.perf_counter_ns()
+        return start
+
+    def end(self, name, start, detail=None):
+        card = self._card
+        if name == "Card.play" and card is not None:
+            cpu = time.thread_time_ns() - card[2]
+        now = time.perf_counter_ns()
+        if name == "Card.play" and card is not None:
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                blocks = 0
+                for trace in tracemalloc.take_snapshot().traces:
+                    where = trace.traceback[0]
+                    if where.filename in CARD_CODE and where.lineno not in self._tracer_lines:
+                        blocks += 1
+                tracemalloc.stop()
+            stats = self.cards.get(detail)
+            if stats is None:
+                stats = self.cards[detail] = CardStats()
+            stats.plays += 1
+            stats.wall_ns += now - start
+            stats.cpu_ns += cpu
+            stats.rolls += card[0]
+            stats.recursion_rolls += card[1]
+            if self.track_memory:
+                stats.blocks += blocks
+                stats.peak_bytes = max(stats.peak_bytes, peak)
+            self._card = None
+        super().end(name, start, detail)
+        stack = self._stack
+        while stack and stack[-1][0] != name:
+            stack.pop()
+        if not stack:
+            return
+        _, begun, children = stack.pop()
+        duration = now - begun
+        if stack:
+            stack[-1][2] += duration
+        path = ";".join([frame[0] for frame in stack] + [name])
+        if name == "Card.play":
+            path = f"{path};{detail}"
+        self.folded[path] = self.folded.get(path, 0) + duration - children
+
+    def count(self, name, amount=1):
+        super().count(name, amount)
+        card = self._card
+        if name == "roll":
+            if card is None:
+                self.outside_rolls += amount
+            else:
+                card[0] += amount
+        elif name == "recursion_roll" and card is not None:
+            card[1] += amount
+
+    def card_report(self):
+        """按总耗时从高到低排列的每张卡的统计"""
+        total = self.elapsed_ns or 1
+        lines = [f"{'卡牌':<10}{'次数':>8}{'总耗时(ms)':>12}{'占比':>8}{'平均(µs)':>10}{'CPU(ms)':>10}"
+                 f"{'掷骰/次':>9}{'递归/次':>9}" + (f"{'内存块/次':>10}{'峰值(KiB)':>11}" if self.track_memory else "")]
+        for name, stats in sorted(self.cards.items(), key=lambda item: -item[1].wall_ns):
+            plays = stats.plays
+            line = (f"{name:<10}{plays:>8}{stats.wall_ns / 1e6:>12.2f}{stats.wall_ns / total:>8.1%}"
+                    f"{stats.wall_ns / plays / 1e3:>10.2f}{stats.cpu_ns / 1e6:>10.2f}{stats.rolls / plays:>9.2f}"
+                    f"{stats.recursion_rolls / plays:>9.2f}")
+            if self.track_memory:
+                line += f"{stats.blocks / plays:>10.2f}{stats.peak_bytes / 1024:>11.1f}"
+            lines.append(line)
+        card_ns = sum(stats.wall_ns for stats in self.cards.values())
+        lines.append(f"卡牌结算合计 {card_ns / 1e6:.2f} ms，占模拟总时间 {card_ns / total:.1%}（{self.elapsed_ns / 1e6:.2f} ms）；"
+                     f"卡牌之外的掷骰 {self.outside_rolls} 次")
+        return "\n".join(lines)
+
+    def save_folded(self, path):
+        # 折叠栈：按路径排序，耗时单位是微秒
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, nanos in sorted(self.folded.items()):
+                if nanos >= 1000:
+                    f.write(f"{stack} {nanos // 1000}\n")
+
+def profile_campaign(games=1000, policy=game.random_policy, deck_size=game.DEFAULT_DECK_SIZE, seed=0, max_turns=500,
+                     track_memory=False):
+    """跑 games 局无头对局并返回 CardProfiler；每局是一个 match span"""
+    profiler = CardProfiler(track_memory)
+    random.seed(seed)
+    try:
+        with game.headless_mode(), game.tracing(profiler):
+            start = time.perf_counter_ns()
+            for _ in range(games):
+                match_start = profiler.begin("match")
+                match = game.Match(deck_size=deck_size, max_turns=max_turns)
+                while not match.done:
+                    match.step(policy(match))
+                profiler.end("match", match_start)
+            profiler.elapsed_ns = time.perf_counter_ns() - start
+    finally:
+        if track_memory:
+            tracemalloc.stop()  # 结算中途出错时关掉
+    return profiler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按卡牌统计模拟开销")
+    parser.add_argument("games", type=int, nargs="?", default=2000, help="对局数（默认 2000）")
+    parser.add_argument("--policy", choices=("random", "greedy"), default="random", help="双方使用的策略")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    parser.add_argument("--memory", action="store_true", help="用 tracemalloc 记录每张卡结算时分配的内存块和内存峰值")
+    parser.add_argument("--folded", help="把折叠栈写到这个文件（可直接交给 flamegraph.pl / speedscope）")
+    args = parser.parse_args()
+    if args.policy == "greedy":
+        import gameAI
+        chosen = gameAI.greedy_policy
+    else:
+        chosen = game.random_policy
+    result = profile_campaign(args.games, chosen, args.deck_size, track_memory=args.memory)
+    print(result.card_report())
+    print()
+    print(result.report())
+    if args.folded:
+        result.save_folded(args.folded)
+        print(f"折叠栈已写入 {args.folded}")
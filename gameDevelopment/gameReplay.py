@@ -0,0 +1,253 @@
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+import gameLog
+import gameV1_3_2 as game
+
+# ====== 对局回放 ======
+# 用对局日志（见 gameLog）里的种子、决定和点数，让真正的引擎把一局原样再跑一遍，并逐字节核对重新产生的事件：
+#   种子  Match(seed=...) 重建同样的牌库和洗牌顺序
+#   决定  每到需要做决定的地方，从日志的当前位置读出 action（300龟是 turtle）事件交给 step()
+#   点数  引擎每掷一次骰子，ReplayRecorder 换成日志在同一位置记下的点数；洗回牌库的顺序也一样
+# 其余事件（摸牌、出牌、属性结算、延迟效果、弃牌、结果、关键帧）都由引擎自己产生，和日志比较，第一处不一致就停下报告。
+# 关键帧也逐字节比较，所以每隔一段还会核对一次完整的对局状态。Replay 可以从某个关键帧开始（见 gameViewer）。
+# 回放在无头模式下进行：不闪现骰子、不等输入、不打印，一局只要几百微秒。
+#
+# 改了卡牌代码之后拿旧日志回放一遍就是回归检查：效果变了的局会在第一个不同的事件上报出来
+# （卡牌指纹变了时会先提示，这时报出来的不一致可能正是这次改动本来就要的）。
+
+Mismatch = namedtuple("Mismatch", "index offset turn expected actual")  # 第几局、记录里的字节位置、回合、日志里的事件、回放的事件
+
+class _ReplaySeat(gameLog._SeatEvents):
+    """掷骰和洗牌时换成日志里这个位置记下的点数和顺序；buffer 对应日志里从 origin 开始的内容"""
+    __slots__ = ("expected", "origin")
+
+    def roll(self, sides, value):
+        expected, pos = self.expected, self.origin + len(self.buffer)
+        # 日志在这里也是这个座位掷同样面数的骰子才换；否则照常记下，交给逐字节比较报告
+        if pos + 2 < len(expected) and expected[pos] == self.tags[gameLog.EV_ROLL]:
+            if sides < 0x80:
+                # 面数小于 128 时面数和点数各占一个字节
+                if expected[pos + 1] == sides:
+                    value = expected[pos + 2]
+            else:
+                event = gameLog.read_event(expected, pos)[0]
+                if event.values[0] == sides:
+                    value = event.values[1]
+        return super().roll(sides, value)
+
+    def reshuffle(self, deck):
+        expected, pos = self.expected, self.origin + len(self.buffer)
+        if pos < len(expected) and expected[pos] == self.tags[gameLog.EV_RESHUFFLE]:
+            order = gameLog.read_event(expected, pos)[0].values
+            if sorted(order) == sorted(deck):
+                deck[:] = array(deck.typecode, order)
+        super().reshuffle(deck)
+
+class ReplayRecorder(gameLog.MatchRecorder):
+    """回放用的记录器：照常记事件（不写进日志），掷骰点数和洗牌顺序取自 expected（日志里的这一局）
+
+    origin 是 buffer 开头对应日志里的位置：从关键帧开始回放时只记关键帧之后的事件。
+    """
+
+    seat_events = _ReplaySeat
+
+    def __init__(self, expected, origin=0):
+        self.expected = expected
+        self.origin = origin
+        super().__init__(keyframe_turns=gameLog.parse_start(expected)[0].keyframe_turns)
+        for seat in self.seats:
+            seat.expected = expected
+            seat.origin = origin
+
+    def _start_fields(self, match, deck_size, debug_mode):
+        # 开始字段照抄日志（里面有记录时的时间）
+        self.buffer.extend(self.expected[:gameLog.parse_start(self.expected)[1]])
+
+def _event_at(data, offset, pos=None):
+    # 包含 offset 这个字节的事件的说明（pos 是 data 里第一个事件的位置）；offset 超出 data 时返回 None
+    if pos is None:
+        pos = gameLog.parse_start(data)[1]
+    if offset < pos:
+        return "（对局开始的字段）"
+    try:
+        while pos < len(data):
+            event, end = gameLog.read_event(data, pos)
+            if offset < end:
+                return gameLog.describe(event)
+            pos = end
+    except LookupError:
+        return "（无法解码）"
+    return None
+
+def _mismatch(index, origin, payload, buffer, match, error=None):
+    # payload 是日志从 origin 开始的部分，和回放记下的 buffer 逐字节比较
+    offset = 0
+    for offset, (expected, actual) in enumerate(zip(payload, buffer)):
+        if expected != actual:
+            break
+    else:
+        offset = min(len(payload), len(buffer))
+    first = None if origin == 0 else 0  # 从关键帧开始时 buffer 里没有开始字段
+    actual = error or _event_at(buffer, offset, first)
+    if actual is None:
+        actual = "（回放已经结束）" if match.done else "（回放停在这里等一个决定）"
+    return Mismatch(index, origin + offset, match.turn, _event_at(payload, offset, first) or "（日志已经结束）", actual)
+
+class Replay:
+    """日志里一局的回放：step() 每次执行日志里的下一个决定
+
+    keyframe 是日志里某个关键帧事件的位置，给出时从这个关键帧恢复出对局，之前的事件一概不用重放。
+    ok 为 False 表示已经和日志对不上（或者引擎出错），mismatch() 给出第一处不一致。
+    和 Match 一样，step() 要在无头模式下调用（run() 自己会打开）。
+    """
+
+    def __init__(self, payload, keyframe=None):
+        self.payload = payload
+        self.start = gameLog.parse_start(payload)[0]
+        self.error = None
+        self.ok = True
+        if keyframe is None:
+            self.recorder = ReplayRecorder(payload)
+            with game.headless_mode():
+                self.match = game.Match(deck_size=self.start.deck_size, debug_mode=self.start.debug_mode,
+                                        max_turns=self.start.max_turns, seed=self.start.seed, events=self.recorder)
+        else:
+            event, origin = gameLog.read_event(payload, keyframe)
+            if event.kind != gameLog.EV_KEYFRAME:
+                raise ValueError(f"位置 {keyframe} 不是关键帧")
+            match = gameLog.decode_keyframe(event.values[0])
+            match.seed = self.start.seed
+            recorder = self.recorder = ReplayRecorder(payload, origin)
+            recorder.next_keyframe = (match.turn // recorder.keyframe_turns + 1) * recorder.keyframe_turns
+            match.events = recorder
+            for seat, player in enumerate(match.players):
+                player._events = recorder.seat(seat)
+            self.match = match
+        self.origin = self.recorder.origin
+        self.checked = 0
+
+    @property
+    def position(self):
+        # 回放到了日志里的哪个位置
+        return self.origin + len(self.recorder.buffer)
+
+    def step(self):
+        """执行日志里的下一个决定；对局结束、日志没有下一个决定或者对不上时返回 False"""
+        match, payload, buf = self.match, self.payload, self.recorder.buffer
+        if match.done or not self.ok:
+            return False
+        # 上一次决定以来新产生的事件要和日志一致，然后日志在这里应该正好是当前这一方的决定
+        # action 和 turtle 事件都是两个字节：标签、动作编码（或选择的编号）
+        origin, checked = self.origin, self.checked
+        pos = origin + len(buf)
+        if pos >= len(payload) - 1 or buf[checked:] != payload[origin + checked:pos]:
+            self.ok = False
+            return False
+        self.checked = pos - origin
+        tag, seat = payload[pos], match.current_index
+        if tag >> 1 == gameLog.EV_KEYFRAME:
+            # 决定前面的关键帧：step() 里会重新记一个，跳过去看后面的决定
+            length, pos = gameLog._get(payload, pos + 1)
+            pos += length
+            if pos >= len(payload) - 1:
+                self.ok = False
+                return False
+            tag = payload[pos]
+        if match.phase == game.PHASE_TURTLE_300:
+            if tag != gameLog.EV_TURTLE << 1 | seat:
+                self.ok = False
+                return False
+            action = game.ACTION_TURTLE_BASE + payload[pos + 1]
+        elif tag == gameLog.EV_ACTION << 1 | seat:
+            action = payload[pos + 1]
+        else:
+            self.ok = False
+            return False
+        try:
+            match.step(action)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            self.ok = False
+            return False
+        return True
+
+    def run(self):
+        """一直回放到对局结束（或者对不上），返回是否和日志完全一致"""
+        with game.headless_mode():
+            while self.step():
+                pass
+        self.ok = self.ok and self.match.done and self.recorder.buffer == self.payload[self.origin:]
+        return self.ok
+
+    def mismatch(self, index=0):
+        """第一处不一致（Mismatch）；完全一致时返回 None"""
+        if self.ok and self.match.done and self.recorder.buffer == self.payload[self.origin:]:
+            return None
+        payload, buffer = self.payload[self.origin:], self.recorder.buffer
+        return _mismatch(index, self.origin, payload, buffer, self.match, self.error)
+
+def replay_match(payload, index=0):
+    """回放日志里的一局（一条记录的内容）；和日志完全一致时返回 None，否则返回第一处不一致（Mismatch）"""
+    try:
+        replay = Replay(payload)
+    except Exception as exc:
+        return Mismatch(index, 0, 0, "（对局开始）", f"{type(exc).__name__}: {exc}")
+    if replay.run():
+        return None
+    return replay.mismatch(index)
+
+def _replay_chunk(task):
+    # (第一局的序号, [记录内容...]) → (局数, [Mismatch...])
+    first, payloads = task
+    mismatches = []
+    for index, payload in enumerate(payloads, first):
+        mismatch = replay_match(payload, index)
+        if mismatch is not None:
+            mismatches.append(mismatch)
+    return len(payloads), mismatches
+
+def replay_log(path, processes=1, chunk=1000, limit=None):
+    """回放日志里的每一局（最多 limit 局），返回 (局数, 按局排序的 [Mismatch...])；processes > 1 时分给多个进程"""
+    payloads = []
+    for _, payload in gameLog.LogReader(path):
+        if limit is not None and len(payloads) >= limit:
+            break
+        payloads.append(payload)
+    tasks = [(start, payloads[start:start + chunk]) for start in range(0, len(payloads), chunk)]
+    processes = processes or os.cpu_count() or 1
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = list(pool.imap_unordered(_replay_chunk, tasks))
+    else:
+        results = map(_replay_chunk, tasks)
+    replayed = 0
+    mismatches = []
+    for count, found in results:
+        replayed += count
+        mismatches.extend(found)
+    mismatches.sort()
+    return replayed, mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放对局日志并核对每个事件（回归检查），有不一致时以非零状态退出")
+    parser.add_argument("path")
+    parser.add_argument("--processes", type=int, default=1, help="进程数（0 表示每个 CPU 一个）")
+    parser.add_argument("--limit", type=int, help="最多回放多少局")
+    parser.add_argument("--show", type=int, default=10, help="列出前几处不一致")
+    args = parser.parse_args()
+    if gameLog.LogReader(args.path).stale:
+        print("注意：日志记录时的卡牌定义和现在不同，不一致的局可能正是卡牌改动造成的")
+    begin = time.perf_counter()
+    total, found = replay_log(args.path, args.processes, limit=args.limit)
+    elapsed = time.perf_counter() - begin
+    print(f"回放 {total} 局，{elapsed:.2f} 秒（{total / max(elapsed, 1e-9):.0f} 局/秒），不一致 {len(found)} 局")
+    for item in found[:args.show]:
+        print(f"  第 {item.index} 局 第 {item.turn} 回合（字节 {item.offset}）：日志 {item.expected}，回放 {item.actual}")
+    sys.exit(1 if found else 0)
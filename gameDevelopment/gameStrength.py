@@ -0,0 +1,110 @@
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import namedtuple
+
+import gameV1_3_2 as game
+import gameAI as ai
+
+# ====== 棋力测试 ======
+# 两个电脑对手按固定种子对打若干局，报告得分率和置信区间：
+#   每个种子打一对局，双方交换座位，牌库和开局的随机状态相同，发牌和先手的运气在一对局里大半抵消
+#   搜索类对手按固定迭代次数（MCTS 系列）或固定深度（期望极小极大）搜索，不看时间预算，
+#   所以结果只由种子决定，换一台机器、换进程数都得到同样的数字；默认 500 次迭代，约等于普通机器上 200ms 的预算
+#   得分：胜 1、平 0.5、负 0，区间是 Wilson 得分区间（默认 95%），把每局当作一次独立试验；
+#   配对的两局共用发牌，结果通常负相关，所以这个区间偏保守
+BOTS = ("mcts", "ismcts", "expectiminimax", "greedy", "random")
+
+Strength = namedtuple("Strength", "bot opponent games wins draws losses score low high")  # score/low/high 是得分率
+
+def make_bot(name, iterations=500):
+    """按名字创建对手（策略函数或电脑对手对象），在工作进程里也能按同样的参数重建"""
+    if name == "mcts":
+        return ai.MCTSBot(time_budget=math.inf, max_iterations=iterations, min_think=0.0)
+    if name == "ismcts":
+        return ai.ISMCTSBot(time_budget=math.inf, max_iterations=iterations, min_think=0.0)
+    if name == "expectiminimax":
+        return ai.ExpectiminimaxBot()
+    if name == "greedy":
+        return ai.greedy_policy
+    if name == "random":
+        return game.random_policy
+    raise ValueError(f"未知的对手：{name}（可选 {'/'.join(BOTS)}）")
+
+def wilson_interval(score, games, z=1.96):
+    """得分 score（胜 1 平 0.5）在 games 局里的 Wilson 区间 (下限, 上限)"""
+    if games == 0:
+        return 0.0, 1.0
+    p = score / games
+    denominator = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denominator
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def _play_pairs(task):
+    # 一批种子，每个种子交换座位各打一局，返回 bot 一方的 [胜, 平, 负]
+    bot, opponent, seeds, iterations, deck_size, max_turns = task
+    players = (make_bot(bot, iterations), make_bot(opponent, iterations))
+    tally = [0, 0, 0]
+    for seed in seeds:
+        for seat in (0, 1):
+            policies = (players[0], players[1]) if seat == 0 else (players[1], players[0])
+            for policy in policies:
+                if hasattr(policy, "reset"):
+                    policy.reset()
+            random.seed(seed)
+            with game.headless_mode():
+                match = game.Match(deck_size=deck_size, max_turns=max_turns, seed=seed)
+                while not match.done:
+                    match.step(policies[match.current_index](match))
+            if match.winner is None:
+                tally[1] += 1
+            else:
+                tally[0 if match.winner == seat else 2] += 1
+    return tally
+
+def measure_strength(bot="mcts", opponent="greedy", pairs=200, iterations=500, deck_size=game.DEFAULT_DECK_SIZE,
+                     max_turns=500, seed=0, processes=None, chunk=5, z=1.96):
+    """bot 对 opponent 打 pairs 对（2×pairs 局），返回 Strength；种子为 seed, seed+1, ...，按 chunk 对一批分给 processes 个进程"""
+    seeds = range(seed, seed + pairs)
+    tasks = [(bot, opponent, seeds[start:start + chunk], iterations, deck_size, max_turns)
+             for start in range(0, pairs, chunk)]
+    processes = processes or os.cpu_count() or 1
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_play_pairs, tasks)
+    else:
+        results = map(_play_pairs, tasks)
+    wins = draws = losses = 0
+    for won, drawn, lost in results:
+        wins += won
+        draws += drawn
+        losses += lost
+    games = wins + draws + losses
+    score = wins + 0.5 * draws
+    low, high = wilson_interval(score, games, z)
+    return Strength(bot, opponent, games, wins, draws, losses, score / games, low, high)
+
+def strength_line(result):
+    return (f"{result.bot} 对 {result.opponent}：{result.games} 局 胜 {result.wins} 平 {result.draws} 负 {result.losses}，"
+            f"得分率 {result.score:.1%}（置信区间 {result.low:.1%} – {result.high:.1%}）")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="固定种子的棋力测试：报告得分率和 Wilson 置信区间")
+    parser.add_argument("--bot", choices=BOTS, default="mcts")
+    parser.add_argument("--opponents", nargs="+", choices=BOTS, default=["greedy", "expectiminimax"])
+    parser.add_argument("--pairs", type=int, default=200, help="每个对手打多少对（每对交换座位各一局，默认 200）")
+    parser.add_argument("--iterations", type=int, default=500, help="MCTS 系列每步的迭代次数")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, help="并行进程数（默认 CPU 核数）")
+    args = parser.parse_args()
+    for name in args.opponents:
+        start = time.perf_counter()
+        outcome = measure_strength(args.bot, name, args.pairs, args.iterations, args.deck_size, seed=args.seed,
+                                   processes=args.processes)
+        print(f"{strength_line(outcome)}  用时 {time.perf_counter() - start:.0f}s")
@@ -0,0 +1,374 @@
+
+import contextlib
+import hashlib
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from fractions import Fraction
+
+import numpy as np
+
+import gameV1_3_2 as game
+
+# ====== 残局库 ======
+# 属性有上限（DEFAULT_STAT_CAP），所以“双方属性 + 本回合剩余行动次数 + 对方是否跳过下回合”是一个有限的局面空间，
+# 可以用逆向分析一次性算出每个局面的精确胜率，之后查表是 O(1) 的，AI 和胜率显示都不需要再搜索。
+#
+# 残局库求解的是对局的“属性竞赛”模型：
+#   每次行动，行动方从牌库构成（deck_composition）里独立抽出 choices 张牌，选一张打出或者直接结束回合；
+#   卡牌效果按引擎实际结算枚举（包括曼妥思之神的第二次掷骰），骰到300视为直接获胜，周末偷懒让对方跳过下回合；
+#   每回合的行动次数按回合开始时的 HP 计算（max(2, HP//2)）。
+# 不进入模型的状态：具体手牌和牌库顺序、鸡机的延迟 +5 SAN、虚环之匣递归、裘罗、负行动力。
+# 所以表里的胜率对这个模型是精确的（迭代到 tolerance 以内），对真实对局是一个不需要搜索的估计。
+#
+# 表的大小由属性上限 stat_cap 决定：cap^6 × 行动次数 × 2 项，cap=10 时约一千万项，每项存成 2 字节。
+# 更小的 stat_cap 相当于把属性上限调低的变体，用来快速生成和核对；查询时属性超出上限的局面不在表里。
+
+MAGIC = b"CGTB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHH20s")  # 标识, 版本, 属性上限, 最大行动次数, 每次可选张数, 模型指纹
+SCALE = 65535  # 胜率按 0..65535 存成 uint16
+
+def default_path(stat_cap=game.DEFAULT_STAT_CAP, choices=1, deck_size=game.DEFAULT_DECK_SIZE):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"tablebase_c{stat_cap}_h{choices}_d{deck_size}.cgtb")
+
+def max_actions(stat_cap):
+    return max(2, stat_cap // 2)
+
+# ====== 卡牌结算枚举 ======
+# 卡牌的每次掷骰都经过使用者的事件钩子（player._events.roll，对局日志和回放用的同一个入口），
+# 在哑玩家身上挂一个按脚本出点数的钩子：第一次掷骰用 _next_roll_value 预设（与 gameAI._probe_roll 同一机制），
+# 之后每次掷骰时预设下一个点数，脚本里的点数都不经过全局骰子。脚本用完时中断结算，按这次掷骰的点数范围展开下一层，
+# 这样卡牌内部有几次掷骰都能精确枚举出每种结果的概率。中断只发生在这张牌自己的结算里，不影响其他线程。
+class _MoreDice(BaseException):
+    # 用 BaseException，卡牌里 except Exception 的兜底分支不会拦下它
+    def __init__(self, low, high):
+        super().__init__(low, high)
+        self.low = low
+        self.high = high
+
+class _DiceScript:
+    # 哑玩家的事件钩子：掷骰换成脚本里的点数，其余事件不用
+    def __init__(self, card, user, rolls):
+        self.card = card
+        self.user = user
+        self.rolls = rolls
+        self.used = 0
+
+    def roll(self, sides, value):
+        if self.used == len(self.rolls):
+            # 与卡牌面数相同的是判定（含虚环递归），从卡牌的最小点数开始；其余的（曼妥思之神第二次判定）从 1 开始
+            raise _MoreDice(self.card.min_value if sides == self.card.dice_sides else 1, sides)
+        value = self.rolls[self.used]
+        self.used += 1
+        if self.used < len(self.rolls):
+            self.user._next_roll_value = self.rolls[self.used]
+        return value
+
+    def reshuffle(self, deck):
+        pass
+
+    def draw(self, card_id):
+        pass
+
+    def play(self, card_id):
+        pass
+
+    def discard(self, card_id):
+        pass
+
+    def commit(self, stat, value):
+        pass
+
+    def turtle(self, choice):
+        pass
+
+    def delayed(self, effect):
+        pass
+
+def _play_scripted(card, rolls):
+    # 在两个属性居中的哑玩家之间按给定点数打出一张牌，返回 (使用者修改器, 目标修改器, 对方跳过回合, 骰到300)
+    user = game.Player("user", [])
+    target = game.Player("target", [])
+    for player in (user, target):
+        for i in range(game.NUM_STATS):
+            player._set_stat(i, game.DEFAULT_STAT_CAP // 2)
+    user._current_turn = 0
+    user._events = _DiceScript(card, user, rolls)
+    if rolls:
+        user._next_roll_value = rolls[0]
+    card.play(user, target)
+    return (tuple(user.stat_modifiers), tuple(target.stat_modifiers),
+            bool(getattr(target, "_skip_next_turn", False)), bool(getattr(user, "_pending_turtle_300", False)))
+
+def card_outcomes(card):
+    """一张牌所有结算结果的精确分布：{(使用者修改器, 目标修改器, 对方跳过回合, 骰到300): 概率}"""
+    results = {}
+    pending = [((), Fraction(1))]
+    with game.headless_mode():
+        while pending:
+            rolls, p = pending.pop()
+            try:
+                outcome = _play_scripted(card, rolls)
+            except _MoreDice as more:
+                share = p / (more.high - more.low + 1)
+                pending.extend((rolls + (roll,), share) for roll in range(more.low, more.high + 1))
+                continue
+            if outcome[3]:
+                outcome = ((0,) * game.NUM_STATS, (0,) * game.NUM_STATS, False, True)  # 骰到300直接获胜，其余效果无关
+            results[outcome] = results.get(outcome, 0) + p
+    return results
+
+_models = {}  # 牌库张数 → card_model 的结果，卡牌定义在进程内不变，算一次就够
+
+def card_model(deck_size=game.DEFAULT_DECK_SIZE):
+    """残局库模型里的牌：[(抽到的概率, 结果分布)]，结果分布完全相同的牌合并
+
+    结果按牌库张数缓存，返回的是共享的列表，不要修改。
+    """
+    model = _models.get(deck_size)
+    if model is None:
+        prototypes = game.playable_prototypes()
+        copies = game.deck_composition(prototypes, deck_size)
+        total = sum(copies)
+        merged = {}
+        for card, count in zip(prototypes, copies):
+            if count:
+                outcomes = tuple(sorted(card_outcomes(card).items()))
+                merged[outcomes] = merged.get(outcomes, 0) + Fraction(count, total)
+        model = _models[deck_size] = [(weight, outcomes) for outcomes, weight in merged.items()]
+    return model
+
+def model_fingerprint(model, stat_cap, choices):
+    # 卡牌定义、牌库构成或参数变了，指纹就会变，旧的表文件不再可用
+    return hashlib.sha1(repr((stat_cap, choices, model)).encode()).digest()
+
+# ====== 逆向分析 ======
+# 胜率表 V[a-1, k, 己方HP, SAN, 记忆, 对方HP, SAN, 记忆]：行动方还剩 a 次行动、对方是否跳过下回合（k）时行动方的胜率，
+# 属性 v 存在下标 v-1。每一轮先由各局面的回合开始胜率算出“结束回合”的胜率 E，再按 a=1,2,... 的顺序更新，
+# 每层只依赖 E 或者上一层（刚算好的），一轮相当于往前推一个回合；重复到最大变化小于 tolerance。
+# 出牌后的局面从“补边”的上一层里按属性变化直接切片取：属性掉到 0 以下的位置填死亡的胜率（己方死亡优先），
+# 超过上限的位置复制上限那一格。每层按己方 HP 切成几段，由多个进程写同一个内存映射文件。
+_work = {}
+
+def _stat_pads(model):
+    # 每条属性轴需要在下方/上方补几格：[己方三条..., 对方三条...] 的 (下, 上)
+    n = game.NUM_STATS
+    low, high = [0] * (2 * n), [0] * (2 * n)
+    for _, outcomes in model:
+        for (user_delta, target_delta, _, _), _ in outcomes:
+            for i, delta in enumerate(user_delta + target_delta):
+                low[i] = max(low[i], -delta)
+                high[i] = max(high[i], delta)
+    return low, high
+
+def _open_work(directory, stat_cap, model, choices):
+    n = game.NUM_STATS
+    actions = max_actions(stat_cap)
+    shape = (2,) + (stat_cap,) * (2 * n)
+    low, high = _stat_pads(model)
+    padded = (2,) + tuple(stat_cap + lo + hi for lo, hi in zip(low, high))
+    _work.update(
+        stat_cap=stat_cap, choices=choices, low=low,
+        weights=np.array([float(weight) for weight, _ in model]),
+        model=[[(float(p), outcome) for outcome, p in outcomes] for _, outcomes in model],
+        values=np.memmap(os.path.join(directory, "values.f32"), np.float32, "r+", shape=(actions,) + shape),
+        end_turn=np.memmap(os.path.join(directory, "end_turn.f32"), np.float32, "r+", shape=shape),
+        padded=np.memmap(os.path.join(directory, "padded.f32"), np.float32, "r+", shape=padded),
+    )
+
+def _solve_slice(task):
+    # 更新第 a 层里己方 HP 下标在 [lo, hi) 的部分，返回最大变化
+    a, lo, hi = task
+    w = _work
+    stat_cap, low, padded = w["stat_cap"], w["low"], w["padded"]
+    weights, choices = w["weights"], w["choices"]
+    level = w["values"][a - 1]
+    change = 0.0
+    for k in range(2):
+        end_turn = np.asarray(w["end_turn"][k, lo:hi])
+        card_values = []
+        for outcomes in w["model"]:
+            total = np.zeros_like(end_turn)
+            for p, (user_delta, target_delta, skip, win) in outcomes:
+                if win:
+                    total += p
+                    continue
+                index = [1 if skip else k]
+                for axis, delta in enumerate(user_delta + target_delta):
+                    start = low[axis] + delta + (lo if axis == 0 else 0)
+                    index.append(slice(start, start + (hi - lo if axis == 0 else stat_cap)))
+                total += p * padded[tuple(index)]
+            card_values.append(np.maximum(total, end_turn))  # 抽到的牌不如结束回合时就结束回合
+        card_values = np.stack(card_values)
+        if choices == 1:
+            new = np.tensordot(weights, card_values, 1)
+        else:
+            # choices 张牌里取最好的一张：按估值排序后 E[max] = Σ v_(j) (F_j^h - F_{j-1}^h)
+            order = np.argsort(card_values, axis=0)
+            cumulative = np.cumsum(weights[order], axis=0)
+            share = cumulative ** choices - (cumulative - weights[order]) ** choices
+            new = (np.take_along_axis(card_values, order, axis=0) * share).sum(axis=0)
+        old = level[k, lo:hi]
+        change = max(change, float(np.abs(new - old).max()))
+        level[k, lo:hi] = new
+    return change
+
+def _turn_start(values, stat_cap):
+    # 回合开始时的胜率：行动次数由己方 HP 决定
+    start = np.empty(values.shape[1:], np.float32)
+    for hp in range(1, stat_cap + 1):
+        start[:, hp - 1] = values[max(2, hp // 2) - 1, :, hp - 1]
+    return start
+
+def _pad_level(source, padded, low, high):
+    # 对方属性先补（死亡 = 行动方获胜），己方属性后补（死亡 = 失败，双方同时死亡时覆盖成失败）
+    n = game.NUM_STATS
+    array = np.asarray(source)
+    for axis in range(2 * n - 1, -1, -1):
+        dead = 1.0 if axis >= n else 0.0
+        widths = [(0, 0)] * array.ndim
+        widths[axis + 1] = (low[axis], 0)
+        array = np.pad(array, widths, constant_values=dead)
+        widths[axis + 1] = (0, high[axis])
+        array = np.pad(array, widths, mode="edge")
+    padded[...] = array
+
+def generate(path=None, stat_cap=game.DEFAULT_STAT_CAP, choices=1, deck_size=game.DEFAULT_DECK_SIZE,
+             processes=None, tolerance=1e-6, max_sweeps=2000, verbose=False):
+    """逆向分析生成残局库文件，返回文件路径
+
+    processes 为并行进程数（默认 CPU 核数）。中间结果放在 path + ".work" 目录里，完成后删除。
+    """
+    path = path or default_path(stat_cap, choices, deck_size)
+    n = game.NUM_STATS
+    actions = max_actions(stat_cap)
+    model = card_model(deck_size)
+    low, high = _stat_pads(model)
+    shape = (2,) + (stat_cap,) * (2 * n)
+    padded_shape = (2,) + tuple(stat_cap + lo + hi for lo, hi in zip(low, high))
+    directory = path + ".work"
+    os.makedirs(directory, exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+    # 每层切成若干段：并行时每个进程几段，单进程时也分段以限制内存占用
+    step = max(1, stat_cap // max(2, 2 * processes))
+    pool = values = end_turn = padded = table = None
+    try:
+        np.memmap(os.path.join(directory, "values.f32"), np.float32, "w+", shape=(actions,) + shape)[...] = 0.5
+        np.memmap(os.path.join(directory, "end_turn.f32"), np.float32, "w+", shape=shape).flush()
+        np.memmap(os.path.join(directory, "padded.f32"), np.float32, "w+", shape=padded_shape).flush()
+        _open_work(directory, stat_cap, model, choices)
+        if processes > 1:
+            pool = multiprocessing.Pool(processes, _open_work, (directory, stat_cap, model, choices))
+        values, end_turn, padded = _work["values"], _work["end_turn"], _work["padded"]
+        for sweep in range(max_sweeps):
+            start = _turn_start(values, stat_cap)
+            # 结束回合：对方跳过下回合时自己接着开始新回合，否则对方开始回合（镜像局面，胜率取反）
+            end_turn[0] = 1.0 - start[0].transpose(*range(n, 2 * n), *range(n))
+            end_turn[1] = start[0]
+            change = 0.0
+            for a in range(1, actions + 1):
+                _pad_level(end_turn if a == 1 else values[a - 2], padded, low, high)
+                padded.flush()
+                tasks = [(a, lo, min(lo + step, stat_cap)) for lo in range(0, stat_cap, step)]
+                changes = pool.map(_solve_slice, tasks) if pool else map(_solve_slice, tasks)
+                change = max(change, *changes)
+                values.flush()
+            if verbose:
+                print(f"第 {sweep + 1} 轮：最大变化 {change:.2e}")
+            if change < tolerance:
+                break
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, stat_cap, actions, choices, model_fingerprint(model, stat_cap, choices)))
+        table = np.memmap(path, "<u2", "r+", offset=HEADER.size, shape=values.shape)
+        table[...] = np.rint(np.clip(values, 0.0, 1.0) * SCALE)
+        table.flush()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        # 先放掉工作文件的所有映射再删（Windows 上还映射着的文件删不掉）；
+        # 出错时有的文件可能还没建出来，删不到不算错，不能盖住原来的异常
+        _work.clear()
+        values = end_turn = padded = table = None
+        for name in ("values.f32", "end_turn.f32", "padded.f32"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, name))
+        with contextlib.suppress(OSError):
+            os.rmdir(directory)
+    return path
+
+# ====== 查表 ======
+class Tablebase:
+    """只读的残局库（内存映射，不把整张表读进内存）
+
+    probability(match) 返回当前行动方的胜率，evaluate(match, seat) 与 gameAI.evaluate 的参数一致，
+    可以直接作为搜索的叶子估值；局面不在表里（属性超过上限、带负行动力）时两者都返回 None。
+    打开时会用当前卡牌定义的模型（card_model，每个进程只算一次）核对指纹，与文件不一致说明卡牌改过了，需要重新生成。
+    """
+
+    def __init__(self, path=None, deck_size=game.DEFAULT_DECK_SIZE):
+        path = path or default_path(deck_size=deck_size)
+        with open(path, "rb") as f:
+            magic, version, stat_cap, actions, choices, fingerprint = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是残局库文件（或版本不兼容）")
+        if fingerprint != model_fingerprint(card_model(deck_size), stat_cap, choices):
+            raise ValueError(f"{path} 与当前卡牌定义不一致，请重新生成")
+        self.path = path
+        self.stat_cap = stat_cap
+        self.actions = actions
+        self.choices = choices
+        # 单个查询用 memoryview 直接按下标取值，比 numpy 标量索引快一个数量级；
+        # memoryview 按本机字节序解释，表是小端 uint16，大端机器上改用按 "<u2" 读的 numpy 数组
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if sys.byteorder == "little":
+            self.table = memoryview(self._mmap)[HEADER.size:].cast("H")
+        else:
+            self.table = np.frombuffer(self._mmap, "<u2", offset=HEADER.size)
+        # 扁平下标的步长：[a-1, k, 己方三条属性, 对方三条属性]
+        self._stat_strides = [stat_cap ** (2 * game.NUM_STATS - 1 - i) for i in range(2 * game.NUM_STATS)]
+        self._level = 2 * stat_cap ** (2 * game.NUM_STATS)
+
+    def _lookup(self, actions, skip, mover, enemy):
+        cap = self.stat_cap
+        index = (min(actions, self.actions) - 1) * self._level + skip * (self._level // 2)
+        for stride, value in zip(self._stat_strides, (*mover.stat_values, *enemy.stat_values)):
+            if not 1 <= value <= cap:
+                return None
+            index += stride * (value - 1)
+        return self.table[index] / SCALE
+
+    def probability(self, match):
+        """当前行动方的胜率"""
+        if match.done:
+            if match.winner is None:
+                return 0.5
+            return 1.0 if match.winner == match.current_index else 0.0
+        current, enemy = match.current, match.enemy
+        if current._negative_action_points or enemy._negative_action_points:
+            return None
+        if match.phase == game.PHASE_TURTLE_300:
+            return 1.0
+        if match.phase == game.PHASE_PLAY:
+            return self._lookup(match.actions_remaining, int(bool(enemy._skip_next_turn)), current, enemy)
+        # 弃牌环节：这一回合已经结束，看下一回合谁开始
+        if enemy._skip_next_turn:
+            return self._lookup(max(2, current.hp // 2), 0, current, enemy)
+        value = self._lookup(max(2, enemy.hp // 2), 0, enemy, current)
+        return None if value is None else 1.0 - value
+
+    def evaluate(self, match, seat):
+        value = self.probability(match)
+        if value is None or seat == match.current_index:
+            return value
+        return 1.0 - value
+
+if __name__ == "__main__":
+    # python gameTablebase.py [属性上限] [进程数]
+    cap = int(sys.argv[1]) if len(sys.argv) > 1 else game.DEFAULT_STAT_CAP
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(generate(stat_cap=cap, processes=workers, verbose=True))
@@ -1,16 +1,213 @@
 
+import hashlib
+import json
+import os
 import random
 import threading
 import time
 import sys
 import math
+import weakref
+from functools import wraps
+from array import array
+from contextlib import contextmanager
 
 # ====== 配置 ======
 INTERACTIVE_DICE = True  # 是否启用终端闪现交互式骰子
 DEFAULT_DICE_SPEED = 0.12  # 默认闪现间隔（秒），数值越小变化越快
 DEFAULT_DECK_SIZE = 12  # 每副牌的目标牌数（可调整）
+HEADLESS = False  # 无头模式：不闪现、不等待输入、不打印，供批量模拟/训练使用（对所有线程生效）
+
+# ====== 属性生命线 ======
+# 三条属性生命线：HP、理智(SAN)、记忆，任何一项归零即败北
+# 新增属性只需要在这里追加名称和显示名，Player 会自动为其分配数值、修改器和上限
+STAT_NAMES = ("hp", "san", "memory")
+STAT_LABELS = ("HP", "SAN", "记忆")
+STAT_HP, STAT_SAN, STAT_MEMORY = range(len(STAT_NAMES))
+NUM_STATS = len(STAT_NAMES)
+DEFAULT_STAT_CAP = 10  # 每条属性的默认上限
+TURTLE_300_CHOICES = (*STAT_NAMES, "actions")  # 300龟可选择减少的对方数值
 
 # ====== 基础系统 ======
+# headless_mode 只对调用它的线程生效：电脑在后台线程里搜索时，玩家所在的主线程照常闪现骰子和打印
+_thread_state = threading.local()
+
+def is_headless():
+    return HEADLESS or getattr(_thread_state, "headless", False)
+
+def show(*args, **kwargs):
+    # 引擎内部的输出统一走这里，无头模式下直接丢弃
+    if not (HEADLESS or getattr(_thread_state, "headless", False)):
+        print(*args, **kwargs)
+
+@contextmanager
+def headless_mode():
+    # 在当前线程临时开启无头模式，退出时恢复原设置
+    previous = getattr(_thread_state, "headless", False)
+    _thread_state.headless = True
+    try:
+        yield
+    finally:
+        _thread_state.headless = previous
+
+# ====== 追踪 ======
+# 轻量埋点：span 记录一段代码的耗时，计数器记录次数，仪表记录最近一次观测到的值。
+# 默认关闭，埋点处只多一次 `_tracer is not None` 判断；用 tracing() 打开后记到 Tracer 里，
+# 可以导出成 JSON（明细、按名称汇总、计数器）或 Chrome trace（chrome://tracing、Perfetto 直接打开）。
+# 埋点写成 start = tracer.begin(名称) ... tracer.end(名称, start)，不用 with，关闭时连上下文管理器的开销都没有。
+# span 名称：turn（整个回合，包含做决定的时间）、delayed_effects、skip_turn、play（出一张牌连同结算）、
+# Card.play（详情是卡名）、resolve（掷骰卡从掷骰到结算完）、draw（回合结束摸牌）、discard（弃牌）、prompt（等待玩家输入）。
+# 计数器：roll、recursion_roll（虚环递归判定）、reshuffle、flicker（正在闪现的骰子，开始 +1 结束 -1）、
+# match_started / match_finished / match_abandoned（对局开始、结束、没结束就被丢掉；搜索用的副本不计）、
+# bot_cpu_ns（电脑对手做决定和后台思考用掉的线程 CPU）。仪表：delayed_effects（最近一个回合开始时双方排队的延迟效果数）。
+# 追踪对所有线程生效，电脑对手搜索里的模拟回合和掷骰也会记进来。
+_tracer = None
+
+class Tracer:
+    """span 与计数器的记录器，所有线程共用（span 记下线程号）
+
+    超过 max_spans 条之后不再保存明细，只继续按名称汇总。
+    汇总和计数器是读-改-写，电脑对手在后台线程里思考时两边会同时写，所以更新时拿 _lock。
+    """
+
+    def __init__(self, max_spans=1000000):
+        self.max_spans = max_spans
+        self.spans = []    # (名称, 详情, 开始 ns, 时长 ns, 线程号)
+        self.summary = {}  # 名称 → [次数, 总时长 ns, 最长 ns]
+        self.counters = {}
+        self.gauges = {}
+        self.dropped = 0
+        self.origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def begin(self, name):
+        return time.perf_counter_ns()
+
+    def end(self, name, start, detail=None):
+        duration = time.perf_counter_ns() - start
+        with self._lock:
+            entry = self.summary.get(name)
+            if entry is None:
+                self.summary[name] = [1, duration, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+                if duration > entry[2]:
+                    entry[2] = duration
+            if len(self.spans) < self.max_spans:
+                self.spans.append((name, detail, start, duration, threading.get_ident()))
+            else:
+                self.dropped += 1
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def report(self):
+        """按总耗时从高到低排列的汇总文本"""
+        with self._lock:
+            summary = {name: list(entry) for name, entry in self.summary.items()}
+            counters = dict(self.counters)
+        lines = [f"{'span':<16}{'次数':>10}{'总计(ms)':>12}{'平均(µs)':>12}{'最长(µs)':>12}"]
+        for name, (count, total, longest) in sorted(summary.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<16}{count:>10}{total / 1e6:>12.2f}{total / count / 1e3:>12.2f}{longest / 1e3:>12.2f}")
+        lines.extend(f"{name:<16}{value:>10}" for name, value in sorted({**counters, **self.gauges}.items()))
+        return "\n".join(lines)
+
+    def to_dict(self):
+        with self._lock:
+            summary = {name: list(entry) for name, entry in self.summary.items()}
+            counters = dict(self.counters)
+            spans = list(self.spans)
+        return {
+            "summary": {name: {"count": count, "total_ms": total / 1e6, "mean_us": total / count / 1e3,
+                               "max_us": longest / 1e3}
+                        for name, (count, total, longest) in summary.items()},
+            "counters": counters,
+            "gauges": dict(self.gauges),
+            "spans": [{"name": name, "detail": detail, "start_us": (start - self.origin) / 1e3,
+                       "duration_us": duration / 1e3, "thread": thread}
+                      for name, detail, start, duration, thread in spans],
+            "dropped": self.dropped,
+        }
+
+    def chrome_trace(self):
+        # Trace Event Format：span 是完整事件（ph=X），计数器在最后记一个计数事件（ph=C）
+        pid = os.getpid()
+        events = []
+        last = 0.0
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        for name, detail, start, duration, thread in spans:
+            event = {"name": name if detail is None else f"{name} {detail}", "cat": name, "ph": "X",
+                     "ts": (start - self.origin) / 1e3, "dur": duration / 1e3, "pid": pid, "tid": thread}
+            events.append(event)
+            last = max(last, event["ts"] + event["dur"])
+        if counters or self.gauges:
+            events.append({"name": "counters", "ph": "C", "ts": last, "pid": pid,
+                           "args": {**counters, **self.gauges}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    def save_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+@contextmanager
+def tracing(tracer=None):
+    """在这段代码里打开追踪（对所有线程生效），返回使用的 Tracer；退出时恢复原来的设置"""
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+    try:
+        yield _tracer
+    finally:
+        _tracer = previous
+
+def trace_count(name, amount=1):
+    # 给不在热点上的埋点用（对局开始结束、闪现等），热点处直接判断 _tracer
+    if _tracer is not None:
+        _tracer.count(name, amount)
+
+PROMPT_KINDS = ("card", "discard", "dice", "turtle_300", "debug", "start", "end")  # 出牌、弃牌、停骰、300龟、调试卡、开局、终局
+
+def prompt_input(text="", kind="input"):
+    # 等待玩家输入；打开追踪时从发出提示到收到回车记成一个 prompt span，详情是提示的种类（PROMPT_KINDS）
+    tracer = _tracer
+    if tracer is None:
+        return input(text)
+    start = tracer.begin("prompt")
+    try:
+        return input(text)
+    finally:
+        tracer.end("prompt", start, kind)
+
+def metered_game(play):
+    # 给 game_demo 这类一次打完一局的函数记对局数：正常返回算结束，异常（Ctrl-C、输入结束）退出算放弃
+    @wraps(play)
+    def wrapper(*args, **kwargs):
+        trace_count("match_started")
+        try:
+            result = play(*args, **kwargs)
+        except BaseException:
+            trace_count("match_abandoned")
+            raise
+        trace_count("match_finished")
+        return result
+    return wrapper
+
+def _match_released(meter):
+    # Match 被回收时还没结束：记作放弃
+    if not meter[0]:
+        trace_count("match_abandoned")
+
 class Dice:
     @staticmethod
     def roll(sides, times=1, min_value=1):
@@ -18,9 +215,21 @@ class Dice:
             raise ValueError("骰子参数错误：必须 sides>=1, times>=1, min_value>=1")
         if min_value > sides:
             raise ValueError("骰子参数错误：min_value 不能大于 sides")
+        if _tracer is not None:
+            _tracer.count("roll", times)
         return [random.randint(min_value, sides) for _ in range(times)]
 
 def interactive_roll(sides: int, player, hint: str = None, min_value=1):
+    roll = _interactive_roll(sides, player, hint, min_value)
+    events = player._events
+    if events is not None:
+        # 对局日志记下点数；回放时换成日志里的点数（玩家停下闪现的点数无法重新生成）
+        roll = events.roll(sides, roll)
+    return roll
+
+def _interactive_roll(sides, player, hint, min_value):
+    if _tracer is not None:
+        _tracer.count("roll")
     # 检查玩家是否有预设的骰子值
     if hasattr(player, '_next_roll_value'):
         preset_value = getattr(player, '_next_roll_value')
@@ -28,20 +237,20 @@ def interactive_roll(sides: int, player, hint: str = None, min_value=1):
         if min_value <= preset_value <= sides:
             # 使用预设值并清除属性
             delattr(player, '_next_roll_value')
-            print(f"骰子 [{min_value}-{sides}] 闪现: {preset_value}    ")
-            print(f"\n最终判定 → {preset_value} (预设值)")
+            show(f"骰子 [{min_value}-{sides}] 闪现: {preset_value}    ")
+            show(f"\n最终判定 → {preset_value} (预设值)")
             return preset_value
         else:
             # 预设值无效，清除属性并继续正常流程
             delattr(player, '_next_roll_value')
-            print(f"预设值 {preset_value} 超出范围 [{min_value}-{sides}]，将使用随机值")
+            show(f"预设值 {preset_value} 超出范围 [{min_value}-{sides}]，将使用随机值")
 
     # 如果不是交互式终端（Colab/iPad Notebook 会返回 False），就直接返回随机数（健壮处理）
-    if not INTERACTIVE_DICE or not sys.stdin or not sys.stdin.isatty():
-        return random.randint(min_value, sides)
+    if is_headless() or not INTERACTIVE_DICE or not sys.stdin or not sys.stdin.isatty():
+        return player._dice.randint(min_value, sides)
 
     stop_event = threading.Event()
-    result = [random.randint(min_value, sides)]
+    result = [player._dice.randint(min_value, sides)]
 
     def flicker():
         speed = max(0.01, getattr(player, "dice_speed", DEFAULT_DICE_SPEED))
@@ -53,7 +262,7 @@ def interactive_roll(sides: int, player, hint: str = None, min_value=1):
 
         while not stop_event.is_set():
             speed = max(0.01, getattr(player, "dice_speed", DEFAULT_DICE_SPEED))
-            n = random.randint(min_value, sides)
+            n = player._dice.randint(min_value, sides)
             result[0] = n
 
             if has_qiu_luo:
@@ -67,15 +276,17 @@ def interactive_roll(sides: int, player, hint: str = None, min_value=1):
             time.sleep(speed)
         sys.stdout.write("\r")
         sys.stdout.flush()
+        trace_count("flicker", -1)
 
     thread = threading.Thread(target=flicker, daemon=True)
+    trace_count("flicker")
     thread.start()
 
     prompt = "(按回车停止闪现)"
     if hint:
         prompt = f"{hint} {prompt}"
     try:
-        input(prompt)
+        prompt_input(prompt, "dice")
     except KeyboardInterrupt:
         pass
     stop_event.set()
@@ -106,17 +317,27 @@ class Card:
         self.min_value = min_value  # 保存min_value参数
         # 添加子区间属性，用于存储卡牌的骰子子区间信息
         self.subranges = subranges or {}
+        self.card_id = None  # 卡牌编号，由 intern_card 分配；牌堆里只保存编号
 
     def play(self, user, target):
+        tracer = _tracer
+        if tracer is not None:
+            start = tracer.begin("Card.play")
 
         # 获取原始结果
         result = None
         if self.dice_sides:
+            if tracer is not None:
+                resolve_start = tracer.begin("resolve")
             result = self._resolve_outcome(user, target, self.outcomes, self.dice_sides, self.min_value)
+            if tracer is not None:
+                tracer.end("resolve", resolve_start, self.name)
         elif self.stable_effect:
             result = self.stable_effect(user, target)
         else:
-            return f"{self.name} 没有定义效果"
+            result = f"{self.name} 没有定义效果"
+        if tracer is not None:
+            tracer.end("Card.play", start, self.name)
         return result
 
     def _resolve_outcome(self, user, target, outcomes, dice_sides, min_value=1):
@@ -124,7 +345,7 @@ class Card:
         try:
             roll = interactive_roll(dice_sides, user, hint=f"正在掷 {self.name}（范围 {min_value}-{dice_sides}）", min_value=min_value)
         except Exception:
-            roll = random.randint(min_value, dice_sides)
+            roll = user._dice.randint(min_value, dice_sides)
 
         # 检查是否有虚环之匣的递归效果
         recursion_count = getattr(user, "_void_box_recursion", 0)
@@ -134,7 +355,7 @@ class Card:
             for rng, effect in outcomes.items():
                 if rng[0] <= roll <= rng[1]:
                     # 在有效范围内，需要递归判定
-                    print(f"{user.name} 受到虚环之匣影响，需要再投 {recursion_count} 次骰子确认效果")
+                    show(f"{user.name} 受到虚环之匣影响，需要再投 {recursion_count} 次骰子确认效果")
 
                     # 记录原始结果
                     original_roll = roll
@@ -147,27 +368,29 @@ class Card:
                         for range_tuple in self.subranges:
                             if range_tuple[0] <= original_roll <= range_tuple[1]:
                                 subrange = range_tuple
-                                print(f"检测到子区间: {subrange[0]}-{subrange[1]}")
+                                show(f"检测到子区间: {subrange[0]}-{subrange[1]}")
                                 break
 
                     if subrange is None:
                         # 如果没有预定义的子区间，使用整个效果范围
                         subrange = rng
-                        print(f"未检测到子区间，使用整个效果范围: {subrange[0]}-{subrange[1]}")
+                        show(f"未检测到子区间，使用整个效果范围: {subrange[0]}-{subrange[1]}")
 
                     # 检查原始骰子是否在子区间内
                     valid_rolls = 1 if subrange[0] <= original_roll <= subrange[1] else 0
                     if valid_rolls:
-                        print(f"原始骰子 {original_roll} 在子区间 {subrange[0]}-{subrange[1]}内")
+                        show(f"原始骰子 {original_roll} 在子区间 {subrange[0]}-{subrange[1]}内")
                     else:
-                        print(f"原始骰子 {original_roll} 不在子区间 {subrange[0]}-{subrange[1]}内")
+                        show(f"原始骰子 {original_roll} 不在子区间 {subrange[0]}-{subrange[1]}内")
 
                     # 进行递归判定
                     for i in range(recursion_count):
+                        if _tracer is not None:
+                            _tracer.count("recursion_roll")
                         try:
                             recursive_roll = interactive_roll(dice_sides, user, hint=f"虚环之匣递归判定 {i+1}/{recursion_count}（范围 {min_value}-{dice_sides}）", min_value=min_value)
                         except Exception:
-                            recursive_roll = random.randint(min_value, dice_sides)
+                            recursive_roll = user._dice.randint(min_value, dice_sides)
 
                         # 检查递归骰子是否在同一个子区间内
                         # 需要重新检查递归骰子是否在原始骰子的子区间内
@@ -182,14 +405,14 @@ class Card:
 
                         if recursive_subrange == subrange:
                             valid_rolls += 1
-                            print(f"第 {i+1} 次递归判定: {recursive_roll} (在同一个子区间 {subrange[0]}-{subrange[1]}内)")
+                            show(f"第 {i+1} 次递归判定: {recursive_roll} (在同一个子区间 {subrange[0]}-{subrange[1]}内)")
                         else:
                             # 如果后续骰子与前面骰子的子区间不同，直接判定无效
-                            print(f"第 {i+1} 次递归判定: {recursive_roll} (与原始骰子的子区间 {subrange[0]}-{subrange[1]}不同)")
+                            show(f"第 {i+1} 次递归判定: {recursive_roll} (与原始骰子的子区间 {subrange[0]}-{subrange[1]}不同)")
                             if recursive_subrange:
-                                print(f"递归骰子在子区间 {recursive_subrange[0]}-{recursive_subrange[1]}内，与原始骰子子区间不同")
+                                show(f"递归骰子在子区间 {recursive_subrange[0]}-{recursive_subrange[1]}内，与原始骰子子区间不同")
                             else:
-                                print(f"递归骰子不在任何子区间内")
+                                show(f"递归骰子不在任何子区间内")
                             # 清除递归效果
                             delattr(user, "_void_box_recursion")
                             return f"{self.name} 骰到 {original_roll} → 递归判定中骰子子区间不同，效果无效"
@@ -200,7 +423,7 @@ class Card:
                     # 如果超过一半的递归判定在子区间内，才触发效果
                     # 注意：原始骰子已经算作一次有效判定，所以总判定次数是 recursion_count + 1
                     if valid_rolls > (recursion_count + 1) / 2:  # 超过一半的总判定次数（包括原始骰子）在子区间内
-                        print(f"递归判定通过（{valid_rolls}/{recursion_count+1}），效果生效")
+                        show(f"递归判定通过（{valid_rolls}/{recursion_count+1}），效果生效")
                         if callable(effect):
                             return effect(user, target, original_roll)
                         elif isinstance(effect, dict):
@@ -226,8 +449,8 @@ class Card:
         return f"{self.name} 骰到 {roll} → 没有匹配的结果（健壮处理）"
 
     def clone(self):
-        # 浅拷贝一个新的 Card 实例（保证牌堆中每张卡牌实例独立）
-        return Card(
+        # 浅拷贝一个新的 Card 实例（与原型共用同一个卡牌编号）
+        card = Card(
             name=self.name,
             description=self.description,
             dice_sides=self.dice_sides,
@@ -237,25 +460,183 @@ class Card:
             min_value=self.min_value,
             subranges=self.subranges
         )
+        card.card_id = self.card_id
+        return card
+
+# ====== 卡牌编号 ======
+# 同名卡牌的所有副本数据完全相同，所以牌堆/手牌/弃牌堆只保存一个字节的卡牌编号（array('B')），
+# 需要显示或结算时再通过 card_of 取回共享的原型 Card。
+CARD_REGISTRY = []  # 卡牌编号 → 原型 Card
+
+def intern_card(card):
+    # 为原型分配卡牌编号（已分配的直接返回）
+    if card.card_id is None:
+        if len(CARD_REGISTRY) >= 256:
+            raise ValueError("卡牌种类过多：卡牌编号必须能放进一个字节")
+        card.card_id = len(CARD_REGISTRY)
+        CARD_REGISTRY.append(card)
+    return card.card_id
+
+def card_of(card_id):
+    return CARD_REGISTRY[card_id]
+
+def card_ids(cards):
+    # 把 Card 列表或编号序列统一转换成编号数组
+    return array('B', (card if isinstance(card, int) else intern_card(card) for card in cards))
+
+# ====== Zobrist 哈希 ======
+# 局面键 = 各项特征对应的固定 64 位随机数的组合，出牌、摸牌、弃牌、属性结算时增量更新（见 Player 的 _z_* 字段）。
+#   - 属性和修改器：按 (第几条, 取值) 异或
+#   - 手牌/牌库/弃牌堆：多重集哈希，按卡牌编号把随机数相加（mod 2^64），与顺序无关，同一张牌重复也不会抵消
+#   - 负行动力、状态标记、延迟效果等少量标量在取键时现算（条数固定，仍是 O(1)）；
+#     延迟效果也按多重集相加，两个同一回合到期的效果不会互相抵消
+# 随机数来自固定种子的独立生成器，不影响全局随机数，不同进程里同一局面得到同一个键。
+ZOBRIST_SPAN = 1024  # 属性、修改器等整数取值按 1024 取模后查表（实际取值远小于这个范围）
+ZOBRIST_MASK = (1 << 64) - 1
+_zobrist_random = random.Random(20250907)
+
+def _zobrist_row(n):
+    return [_zobrist_random.getrandbits(64) for _ in range(n)]
+
+Z_STAT = [_zobrist_row(ZOBRIST_SPAN) for _ in range(NUM_STATS)]
+Z_MODIFIER = [_zobrist_row(ZOBRIST_SPAN) for _ in range(NUM_STATS)]
+Z_HAND = _zobrist_row(256)
+Z_DECK = _zobrist_row(256)
+Z_DISCARD = _zobrist_row(256)
+Z_HAND_SIZE = _zobrist_row(64)       # 信息集键里对手的手牌只按张数计入
+Z_DECK_SIZE = _zobrist_row(64)
+Z_NEG_ACTIONS = _zobrist_row(ZOBRIST_SPAN)
+Z_BASE_ACTIONS = _zobrist_row(64)
+Z_FLAGS = _zobrist_row(4)            # 跳过回合、裘罗、300龟待选；第 4 个不再使用（预设点数见 Z_NEXT_ROLL），留着让后面各表不变
+Z_VOID = _zobrist_row(8)
+Z_DELAYED = _zobrist_row(64)         # 延迟效果距触发还有几个回合
+Z_PHASE = _zobrist_row(4)
+Z_ACTIONS_LEFT = _zobrist_row(ZOBRIST_SPAN)
+Z_WINNER = _zobrist_row(2)           # 0 = 当前行动方获胜，1 = 对方获胜
+Z_NEXT_ROLL = _zobrist_row(ZOBRIST_SPAN)  # 预设点数（调试卡牌）的值；新的表追加在最后，前面各表的随机数不变
+
+def _zobrist_rotate(h):
+    # 非行动方的哈希循环左移 32 位再合并，这样双方状态互换会得到不同的键
+    return ((h << 32) | (h >> 32)) & ZOBRIST_MASK
+
+# 效果标记类的动态属性（只在生效期间存在，或由 game_demo 按需补上），快照时一并保存
+_STATUS_ATTRS = ("_skip_next_turn", "_current_turn", "_qiu_luo_effect", "_void_box_recursion",
+                 "_next_roll_value", "_pending_turtle_300")
+_ABSENT = object()
+
+def _stat_property(index):
+    # 把 player.hp / player.san 等旧写法映射到属性向量上
+    def getter(self):
+        return self.stat_values[index]
+
+    def setter(self, value):
+        self._set_stat(index, value)
+
+    return property(getter, setter)
+
+def _modifier_property(index):
+    # 把 player._hp_modifier 等旧写法映射到修改器向量上，卡牌函数无需改动
+    def getter(self):
+        return self.stat_modifiers[index]
+
+    def setter(self, value):
+        self.add_modifier(index, value - self.stat_modifiers[index])
+
+    return property(getter, setter)
 
 class Player:
-    def __init__(self, name, deck):
+    # 对局日志（见 gameLog）和洗牌用的随机数：带种子或日志的 Match 会换成自己的，快照恢复出来的玩家用这里的默认值
+    # _dice 是掷骰用的随机数，默认也是全局的；搜索可以给副本换成自己的 random.Random，不动全局随机状态
+    _events = None
+    _rng = random
+    _dice = random
+
+    def __init__(self, name, deck, rng=None):
         self.name = name
-        self.hp = 10  # 生命值，上限为10
-        self.san = 10  # 理智值，上限为10
-        # HP和SAN的中间变量系统
-        # 这些变量用于临时存储伤害或恢复效果，在调用apply_modifiers()方法时才会实际应用到hp和san上
+        # 属性向量：数值、修改器、上限各用一个紧凑数组保存，下标见 STAT_NAMES
+        # 修改器用于临时存储伤害或恢复效果，在调用apply_modifiers()方法时才会实际应用到数值上
         # 这样设计可以确保所有效果在同一时间点应用，避免顺序问题
-        self._hp_modifier = 0  # HP修改器，正值表示恢复，负值表示伤害
-        self._san_modifier = 0  # SAN修改器，正值表示恢复，负值表示伤害
+        self.stat_values = array('i', [DEFAULT_STAT_CAP] * NUM_STATS)
+        self.stat_modifiers = array('i', [0] * NUM_STATS)  # 正值表示恢复，负值表示伤害
+        self.stat_caps = array('i', [DEFAULT_STAT_CAP] * NUM_STATS)
+        # 预览值 = 数值 + 修改器，随每次写入同步更新
+        self._stat_preview = array('i', self.stat_values)
+        # 预览值 <=0 的属性条数，死亡判定只需要看它是否大于0（O(1)，与属性条数无关）
+        self._depleted_stats = 0
         # 初始化时直接存储基础行动力，不使用属性设置
         self._base_actions = max(2, self.hp // 2)
         self._negative_action_points = 0  # 用于负行动力累积
-        self.deck = deck[:]  # deck 已经是实例列表
-        random.shuffle(self.deck)
-        self.hand = []
-        self.discard = []
+        self.deck = card_ids(deck)  # 牌堆、手牌、弃牌堆都是卡牌编号数组
+        if rng is not None:
+            self._rng = rng
+        self._events = None
+        self._rng.shuffle(self.deck)
+        self.hand = array('B')
+        self.discard = array('B')
+        self._piles_shared = False  # 牌堆数组是否与快照共用（写时复制）
         self.dice_speed = DEFAULT_DICE_SPEED
+        self._rehash()
+
+    # 旧的按属性访问方式，全部落在属性向量上
+    hp = _stat_property(STAT_HP)
+    san = _stat_property(STAT_SAN)
+    memory = _stat_property(STAT_MEMORY)
+    _hp_modifier = _modifier_property(STAT_HP)
+    _san_modifier = _modifier_property(STAT_SAN)
+    _memory_modifier = _modifier_property(STAT_MEMORY)
+
+    def _rehash(self):
+        # 从头计算增量哈希字段；直接替换了牌堆或属性数组之后需要调用
+        z = 0
+        for i in range(NUM_STATS):
+            z ^= Z_STAT[i][self.stat_values[i] % ZOBRIST_SPAN] ^ Z_MODIFIER[i][self.stat_modifiers[i] % ZOBRIST_SPAN]
+        self._z_stats = z
+        self._z_hand = sum([Z_HAND[card_id] for card_id in self.hand])
+        self._z_deck = sum([Z_DECK[card_id] for card_id in self.deck])
+        self._z_discard = sum([Z_DISCARD[card_id] for card_id in self.discard])
+
+    def zobrist(self, turn, hidden=False):
+        """玩家状态的哈希；hidden=True 时手牌和牌库只按张数计入（对手看不到的部分）"""
+        if hidden:
+            z = Z_HAND_SIZE[len(self.hand) % 64] ^ Z_DECK_SIZE[len(self.deck) % 64]
+        else:
+            z = (self._z_hand & ZOBRIST_MASK) ^ (self._z_deck & ZOBRIST_MASK)
+        z ^= self._z_stats ^ (self._z_discard & ZOBRIST_MASK)
+        z ^= Z_NEG_ACTIONS[self._negative_action_points % ZOBRIST_SPAN] ^ Z_BASE_ACTIONS[self._base_actions % 64]
+        state = self.__dict__
+        if state.get("_skip_next_turn"):
+            z ^= Z_FLAGS[0]
+        if state.get("_qiu_luo_effect"):
+            z ^= Z_FLAGS[1]
+        if state.get("_pending_turtle_300"):
+            z ^= Z_FLAGS[2]
+        if "_next_roll_value" in state:
+            z ^= Z_NEXT_ROLL[state["_next_roll_value"] % ZOBRIST_SPAN]
+        z ^= Z_VOID[state.get("_void_box_recursion", 0) % 8]
+        delayed = 0
+        for when, _ in state.get("_delayed_effects", ()):
+            delayed += Z_DELAYED[(when - turn) % 64]
+        return z ^ (delayed & ZOBRIST_MASK)
+
+    def _update_preview(self, index, new):
+        old = self._stat_preview[index]
+        self._stat_preview[index] = new
+        if (old <= 0) != (new <= 0):
+            self._depleted_stats += 1 if new <= 0 else -1
+
+    def _set_stat(self, index, value):
+        table = Z_STAT[index]
+        self._z_stats ^= table[self.stat_values[index] % ZOBRIST_SPAN] ^ table[value % ZOBRIST_SPAN]
+        self.stat_values[index] = value
+        self._update_preview(index, value + self.stat_modifiers[index])
+
+    def add_modifier(self, index, delta):
+        """向第 index 条属性的修改器累加 delta（所有修改器写入都经过这里，以保持预览值和哈希同步）"""
+        old = self.stat_modifiers[index]
+        self.stat_modifiers[index] = old + delta
+        table = Z_MODIFIER[index]
+        self._z_stats ^= table[old % ZOBRIST_SPAN] ^ table[(old + delta) % ZOBRIST_SPAN]
+        self._update_preview(index, self._stat_preview[index] + delta)
 
     @property
     def actions(self):
@@ -266,71 +647,156 @@ class Player:
         # 用于显示的行动力，如果是负数则显示为0
         return max(0, self.actions())
 
+    def _own_piles(self):
+        # 写时复制：快照与玩家共用牌堆数组，第一次改动前才复制一份
+        if self._piles_shared:
+            self.deck = self.deck[:]
+            self.hand = self.hand[:]
+            self.discard = self.discard[:]
+            self._piles_shared = False
+
     def draw(self, n=1):
+        self._own_piles()
+        events = self._events
         for _ in range(n):
             if not self.deck:
                 self.shuffle_discard_into_deck()
             if self.deck:
-                self.hand.append(self.deck.pop(0))
+                card_id = self.deck.pop(0)
+                self.hand.append(card_id)
+                self._z_deck -= Z_DECK[card_id]
+                self._z_hand += Z_HAND[card_id]
+                if events is not None:
+                    events.draw(card_id)
 
     def shuffle_discard_into_deck(self):
         if not self.discard:
             return
+        if _tracer is not None:
+            _tracer.count("reshuffle")
+        self._own_piles()
         self.deck = self.discard[:]
-        self.discard.clear()
-        random.shuffle(self.deck)
+        del self.discard[:]
+        self._rng.shuffle(self.deck)
+        if self._events is not None:
+            # 记下洗好的顺序；回放时换成日志里的顺序
+            self._events.reshuffle(self.deck)
+        self._z_deck = sum([Z_DECK[card_id] for card_id in self.deck])
+        self._z_discard = 0
 
     def play_card(self, index, target):
         if 0 <= index < len(self.hand):
-            card = self.hand.pop(index)
-            self.discard.append(card)
-            return card.play(self, target)
+            self._own_piles()
+            card_id = self.hand.pop(index)
+            self.discard.append(card_id)
+            self._z_hand -= Z_HAND[card_id]
+            self._z_discard += Z_DISCARD[card_id]
+            if self._events is not None:
+                self._events.play(card_id)
+            return CARD_REGISTRY[card_id].play(self, target)
         return "无效操作"
 
+    def discard_card(self, index):
+        # 把一张手牌放进弃牌堆，返回其卡牌编号
+        self._own_piles()
+        card_id = self.hand.pop(index)
+        self.discard.append(card_id)
+        self._z_hand -= Z_HAND[card_id]
+        self._z_discard += Z_DISCARD[card_id]
+        if self._events is not None:
+            self._events.discard(card_id)
+        return card_id
+
+    def hand_names(self):
+        return [CARD_REGISTRY[card_id].name for card_id in self.hand]
+
+    def hand_listing(self):
+        return [f"{i}:{name}" for i, name in enumerate(self.hand_names())]
+
     def is_dead(self):
-        # 考虑中间变量的实际HP和SAN值
-        actual_hp = self.hp + self._hp_modifier
-        actual_san = self.san + self._san_modifier
-        return actual_hp <= 0 or actual_san <= 0
+        # 考虑修改器后的实际数值，任何一条属性归零即死亡
+        return self._depleted_stats > 0
 
     def apply_modifiers(self):
-        """应用HP和SAN的修改器，更新实际值
+        """应用所有属性的修改器，更新实际值
 
-        此方法将中间变量(_hp_modifier和_san_modifier)的值应用到实际的hp和san属性上，
-        并显示变化前后的数值对比。应用后会重置中间变量，并确保数值不超过上限。
+        此方法将修改器向量的值应用到数值向量上，并显示变化前后的数值对比。
+        应用后会重置修改器，并确保数值不超过各自的上限。
         """
-        # 记录变化前的数值
-        old_hp = self.hp
-        old_san = self.san
+        modifiers = self.stat_modifiers
+        if not any(modifiers):
+            # 大多数出牌只改动一方的属性，另一方没有修改器时什么都不用做
+            return
+        values = self.stat_values
+        caps = self.stat_caps
+        events = self._events
+        changes = []
+        z = self._z_stats
+        for i in range(NUM_STATS):
+            modifier = modifiers[i]
+            if not modifier:
+                continue
+            old = values[i]
+            new = min(caps[i], old + modifier)
+            values[i] = new
+            modifiers[i] = 0
+            z ^= Z_STAT[i][old % ZOBRIST_SPAN] ^ Z_STAT[i][new % ZOBRIST_SPAN]
+            z ^= Z_MODIFIER[i][modifier % ZOBRIST_SPAN] ^ Z_MODIFIER[i][0]
+            # 上限只会截断正数，不会改变属性是否归零，所以直接写预览值即可
+            self._stat_preview[i] = new
+            if events is not None:
+                events.commit(i, new)
+            if new != old:
+                changes.append(f"{STAT_LABELS[i]} {old}→{new} ({new - old:+d})")
+        self._z_stats = z
 
-        # 应用修改器
-        self.hp += self._hp_modifier
-        self.san += self._san_modifier
+        # 如果有变化，显示变化信息
+        if changes:
+            show(f"{self.name} 属性变化: " + " ".join(changes))
 
-        # 确保HP和SAN不超过上限
-        self.hp = min(10, self.hp)
-        self.san = min(10, self.san)
+    def stat_summary(self):
+        # 考虑修改器后的实际数值
+        return " ".join(f"{label}:{value}" for label, value in zip(STAT_LABELS, self._stat_preview))
 
-        # 如果有变化，显示变化信息
-        if old_hp != self.hp or old_san != self.san:
-            hp_change = self.hp - old_hp
-            san_change = self.san - old_san
-            change_info = f"{self.name} 属性变化: "
-            if hp_change != 0:
-                change_info += f"HP {old_hp}→{self.hp} ({hp_change:+d}) "
-            if san_change != 0:
-                change_info += f"SAN {old_san}→{self.san} ({san_change:+d})"
-            print(change_info)
-
-        # 重置修改器
-        self._hp_modifier = 0
-        self._san_modifier = 0
+    def snapshot(self):
+        """返回玩家完整状态的快照（之后不会再被修改，可以反复 restore）
+
+        牌堆数组直接与快照共用，双方谁先改动谁复制（见 _own_piles），所以快照只需要几微秒。
+        """
+        self._piles_shared = True
+        state = self.__dict__
+        return (self.name, self.stat_values[:], self.stat_modifiers[:], self.stat_caps[:], self._stat_preview[:],
+                self._depleted_stats, self._base_actions, self._negative_action_points,
+                self.deck, self.hand, self.discard, self.dice_speed,
+                tuple([state.get(key, _ABSENT) for key in _STATUS_ATTRS]),
+                tuple(state.get("_delayed_effects", ())),
+                (self._z_stats, self._z_hand, self._z_deck, self._z_discard))
+
+    def restore(self, snap):
+        (self.name, values, modifiers, caps, preview, self._depleted_stats, self._base_actions,
+         self._negative_action_points, self.deck, self.hand, self.discard, self.dice_speed, status, delayed,
+         (self._z_stats, self._z_hand, self._z_deck, self._z_discard)) = snap
+        self.stat_values = values[:]
+        self.stat_modifiers = modifiers[:]
+        self.stat_caps = caps[:]
+        self._stat_preview = preview[:]
+        self._piles_shared = True
+        state = self.__dict__
+        for key, value in zip(_STATUS_ATTRS, status):
+            if value is _ABSENT:
+                state.pop(key, None)
+            else:
+                state[key] = value
+        self._delayed_effects = list(delayed)
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        player = cls.__new__(cls)
+        player.restore(snap)
+        return player
 
     def status(self):
-        # 考虑中间变量的实际HP和SAN值
-        actual_hp = self.hp + self._hp_modifier
-        actual_san = self.san + self._san_modifier
-        return f"{self.name} 状态 → HP:{actual_hp} SAN:{actual_san} 行动力:{self.actions} 手牌:{[c.name for c in self.hand]} (闪现速:{self.dice_speed:.3f}s)"
+        return f"{self.name} 状态 → {self.stat_summary()} 行动力:{self.actions} 手牌:{self.hand_names()} (闪现速:{self.dice_speed:.3f}s)"
 
 
 
@@ -381,7 +847,7 @@ def mentos_god(user, target, roll):
 
     # 检查是否超过SAN上限
     current_san = user.san + user._san_modifier  # 考虑中间变量
-    actual_amount = min(amount, 10 - current_san)
+    actual_amount = min(amount, user.stat_caps[STAT_SAN] - current_san)
     if actual_amount > 0:
         user._san_modifier += actual_amount  # 使用中间变量
         results.append(f"第一次判定 → 恢复 {actual_amount} SAN")
@@ -392,7 +858,7 @@ def mentos_god(user, target, roll):
     try:
         roll2 = interactive_roll(7, user, hint=f"曼妥思之神 第二次判定（回血）")
     except Exception:
-        roll2 = random.randint(1, 7)
+        roll2 = user._dice.randint(1, 7)
 
     if 1 <= roll2 <= 2:
         amount = 0  # 不恢复HP
@@ -405,7 +871,7 @@ def mentos_god(user, target, roll):
 
     # 检查是否超过HP上限
     current_hp = user.hp + user._hp_modifier  # 考虑中间变量
-    actual_amount = min(amount, 10 - current_hp)
+    actual_amount = min(amount, user.stat_caps[STAT_HP] - current_hp)
     if actual_amount > 0:
         user._hp_modifier += actual_amount  # 使用中间变量
         results.append(f"第二次判定 → 恢复 {actual_amount} HP")
@@ -416,26 +882,36 @@ def mentos_god(user, target, roll):
 
 def turtle_300(user, target, roll):
     if roll == 300:
-        # 玩家选择对方一个数值-300
+        if is_headless():
+            # 无头模式下不能等待输入，先挂起，由对局引擎在下一个动作里完成选择
+            user._pending_turtle_300 = True
+            return f"{user.name} 骰到300！等待选择减少 {target.name} 的数值"
+        # 玩家选择对方一个数值-300（任意一条属性生命线或行动力）
+        options = TURTLE_300_CHOICES
         choice = None
-        while choice not in ["hp", "san", "actions"]:
-            choice = input(f"{user.name} 骰到300！选择减少 {target.name} 的数值 (hp/san/actions): ").strip().lower()
-        if choice == "hp":
-            target._hp_modifier -= 300  # 使用中间变量
-        elif choice == "san":
-            target._san_modifier -= 300  # 使用中间变量
-        elif choice == "actions":
-            # 直接设置负行动力为300，而不是累加
-            target._negative_action_points = 300
-        return f"{user.name} 强制 {target.name} {choice}-300！"
+        while choice not in options:
+            choice = prompt_input(f"{user.name} 骰到300！选择减少 {target.name} 的数值 ({'/'.join(options)}): ", "turtle_300").strip().lower()
+        return apply_turtle_300(user, target, choice)
     else:
         return f"{user.name} 300龟（{roll}）→ 什么都没发生"
 
+def apply_turtle_300(user, target, choice):
+    if user._events is not None:
+        user._events.turtle(TURTLE_300_CHOICES.index(choice))
+    if choice == "actions":
+        # 直接设置负行动力为300，而不是累加
+        target._negative_action_points = 300
+    else:
+        target.add_modifier(STAT_NAMES.index(choice), -300)  # 使用中间变量
+    return f"{user.name} 强制 {target.name} {choice}-300！"
+
 def debug_card(user, target):
     # 调试卡牌：让玩家选择下一张打出的牌的点数
+    if is_headless():
+        return f"{user.name} 调试卡牌在无头模式下无效"
     try:
         print(f"{user.name} 使用了调试卡牌！")
-        value = int(input("请输入下一张牌的点数（必须是整数）："))
+        value = int(prompt_input("请输入下一张牌的点数（必须是整数）：", "debug"))
         # 设置一个全局变量或用户属性来存储这个值
         user._next_roll_value = value
         return f"{user.name} 设置了下一张牌的点数为 {value}"
@@ -464,21 +940,22 @@ def chicken_machine(user, target):
     # 设置延迟效果：在四回合后开始时+5san
     # 我们需要在玩家对象上存储这个延迟效果
     # 使用一个列表来存储所有延迟效果，每个效果是一个元组(生效回合数, 效果函数)
+    # 效果函数是模块级函数，触发时传入玩家本人，不捕获任何对象，这样对局状态可以直接快照/复制
     if not hasattr(user, '_delayed_effects'):
         user._delayed_effects = []
     
     # 延迟效果将在4个回合后生效（当前回合是0，下一回合是1，下下回合是2，下下下回合是3，第四回合是4）
-    # 我们存储(生效的回合数, 效果函数)
-    def add_san_effect():
-        user._san_modifier += 5
-        return f"{user.name} 的鸡机效果触发 → +5 SAN"
-    
     # 获取当前回合数
     current_turn = getattr(user, '_current_turn', 0)
-    user._delayed_effects.append((current_turn + 4, add_san_effect))
+    user._delayed_effects.append((current_turn + 4, chicken_machine_payoff))
     
     return f"{user.name} 使用 鸡机 → -2 SAN，四回合后 +5 SAN"
 
+def chicken_machine_payoff(player):
+    # 鸡机的延迟效果：+5san
+    player._san_modifier += 5
+    return f"{player.name} 的鸡机效果触发 → +5 SAN"
+
 def glasses_frog_effect(user, target, roll):
     if 1 <= roll <= 5:
         # 看片效果：加2san
@@ -514,6 +991,25 @@ def void_box_effect(user, target, roll):
     target._void_box_recursion = n
     return f"{user.name} 使用 虚环之匣（{roll}）→ {target.name} 的下一次判定需要递归 {n} 次"
 
+# ====== 记忆类卡牌效果 ======
+def fox_binding(user, target, roll):
+    # 缚狐夺魂：按点数夺走对方记忆
+    if 1 <= roll <= 2:
+        amount = 1
+    elif 3 <= roll <= 5:
+        amount = 2
+    else:  # roll == 6
+        amount = 3
+    target._memory_modifier -= amount  # 使用中间变量
+    return f"{user.name} 缚狐夺魂（{roll}）→ {target.name} -{amount} 记忆"
+
+def lethe_water(user, target):
+    # 忘川之水：双方各失去1点记忆，自身回复1点HP（不超过上限）
+    user._memory_modifier -= 1
+    target._memory_modifier -= 1
+    user._hp_modifier += 1
+    return f"{user.name} 使用 忘川之水 → 双方 -1 记忆，自身 +1 HP"
+
 # ====== 牌库原型模板（每种卡只定义一次，下面会根据 rarity 生成具体副本） ======
 deck_prototypes = [
     Card("普通攻击", "造成 1 HP", stable_effect=normal_attack, rarity=20),
@@ -536,17 +1032,23 @@ deck_prototypes = [
          subranges=[(1, 5), (6, 10)]),
     Card("裘罗", "使对方下一次骰子显示乱码", stable_effect=qiu_luo_effect, rarity=80),
     Card("虚环之匣", "使对方下次判定需要递归1-3次", dice_sides=5, outcomes={(1,5): void_box_effect}, rarity=80,
-         subranges=[(1, 1), (2, 4), (5, 5)])
+         subranges=[(1, 1), (2, 4), (5, 5)]),
+    Card("缚狐夺魂", "1-2:对方-1记忆, 3-5:对方-2记忆, 6:对方-3记忆", dice_sides=6, outcomes={(1,6): fox_binding}, rarity=60,
+         subranges=[(1, 2), (3, 5), (6, 6)]),
+    Card("忘川之水", "双方-1记忆，自身+1HP", stable_effect=lethe_water, rarity=70)
 ]
+for _card in deck_prototypes:
+    intern_card(_card)
 
 
 
 # ====== 构建牌堆函数（根据 rarity 计算每种卡的副本数） ======
-def build_deck_from_prototypes(prototypes, deck_size=DEFAULT_DECK_SIZE):
+def deck_composition(prototypes, deck_size=DEFAULT_DECK_SIZE, rng=random):
     """
-    根据信赖度生成一副牌（返回 Card 实例列表）
+    根据信赖度计算每种卡的副本数（与 prototypes 一一对应）
     权重用 (100 - rarity)，稀有度越高权重越小。
     我们按期望值分配副本数，然后按小数部分分配剩余格子。
+    除了极端的牌堆大小，结果只由 deck_size 决定，对手牌堆里有哪些牌是公开信息。
     """
     weights = [max(1, 100 - p.rarity) for p in prototypes]  # 避免为 0
     total_weight = sum(weights)
@@ -569,7 +1071,7 @@ def build_deck_from_prototypes(prototypes, deck_size=DEFAULT_DECK_SIZE):
 
     # 如果仍有剩余（理论上不会），就随机分配
     while remaining > 0:
-        i = random.randrange(len(prototypes))
+        i = rng.randrange(len(prototypes))
         copies[i] += 1
         remaining -= 1
 
@@ -580,20 +1082,47 @@ def build_deck_from_prototypes(prototypes, deck_size=DEFAULT_DECK_SIZE):
         # 再裁剪或补齐到 deck_size
         while sum(copies) > deck_size:
             # 随机减少一个有副本的项
-            j = random.choice([k for k, v in enumerate(copies) if v > 0])
+            j = rng.choice([k for k, v in enumerate(copies) if v > 0])
             copies[j] -= 1
         while sum(copies) < deck_size:
-            j = random.randrange(len(copies))
+            j = rng.randrange(len(copies))
             copies[j] += 1
+    return copies
+
+def build_deck_from_prototypes(prototypes, deck_size=DEFAULT_DECK_SIZE, rng=random):
+    """根据信赖度生成一副牌（返回卡牌编号数组，见 card_of），副本数见 deck_composition；rng 是洗牌用的随机数"""
+    copies = deck_composition(prototypes, deck_size, rng)
 
-    # 生成 deck（clone 新实例）
-    deck = []
+    # 生成 deck（只保存卡牌编号，不再为每张副本创建实例）
+    deck = array('B')
     for i, cnt in enumerate(copies):
-        for _ in range(int(cnt)):
-            deck.append(prototypes[i].clone())
-    random.shuffle(deck)
+        deck.extend([intern_card(prototypes[i])] * int(cnt))
+    rng.shuffle(deck)
     return deck
 
+def _effect_signature(effect):
+    # 效果函数按字节码、常量和引用的名字比较（嵌套的代码对象递归展开，避免 repr 里的内存地址）
+    if isinstance(effect, dict):
+        return tuple((key, _effect_signature(value)) for key, value in sorted(effect.items()))
+    code = getattr(effect, "__code__", effect)
+    if not hasattr(code, "co_code"):
+        return repr(code)
+    consts = tuple(_effect_signature(const) if hasattr(const, "co_code") else const for const in code.co_consts)
+    return code.co_code, consts, code.co_names
+
+def card_fingerprint(prototypes=None, deck_size=DEFAULT_DECK_SIZE):
+    """卡牌定义和牌库构成的指纹（十六进制字符串）
+
+    名称、描述、稀有度、骰子、子区间、效果函数的代码以及按 deck_size 分配的副本数，改动任何一项指纹都会变。
+    按卡牌统计出来的缓存文件（开局库等）用它判断是否已经过期。
+    """
+    prototypes = playable_prototypes() if prototypes is None else prototypes
+    digest = hashlib.sha1()
+    for card, count in zip(prototypes, deck_composition(prototypes, deck_size)):
+        digest.update(repr((card.name, card.description, card.rarity, card.dice_sides, card.min_value, card.subranges,
+                            _effect_signature(card.stable_effect), _effect_signature(card.outcomes), count)).encode())
+    return digest.hexdigest()
+
 # ====== 辅助函数 ======
 def apply_delayed_effects(player, current_turn):
     """应用所有到期的延迟效果"""
@@ -615,9 +1144,12 @@ def apply_delayed_effects(player, current_turn):
     
     # 应用所有触发的效果
     results = []
+    events = player._events
     for effect in triggered_effects:
+        if events is not None:
+            events.delayed(effect)
         try:
-            result = effect()
+            result = effect(player)
             if result:
                 results.append(result)
         except Exception as e:
@@ -625,9 +1157,9 @@ def apply_delayed_effects(player, current_turn):
     
     # 如果有触发的效果，打印出来
     if results:
-        print("\n===== 延迟效果触发 =====")
+        show("\n===== 延迟效果触发 =====")
         for result in results:
-            print(result)
+            show(result)
         # 立即应用修改器
         player.apply_modifiers()
 
@@ -643,21 +1175,383 @@ def effect_status(player):
         
     return ", ".join(effects) if effects else "无"
 
+def hand_limit(player):
+    # 玩家最多可以保留的牌数（行动力上限，最小为2）
+    return max(2, player._base_actions)
+
+def playable_prototypes(debug_mode=False):
+    # 根据debug_mode参数决定是否包含调试卡牌
+    if debug_mode:
+        return list(deck_prototypes)
+    return [card for card in deck_prototypes if card.name != "调试卡牌"]
+
+# ====== 无头对局引擎 ======
+# 动作编码（供模拟、AI 与训练环境共用）：
+#   0..MAX_HAND_SIZE-1           手牌编号（出牌阶段表示出牌，弃牌阶段表示弃牌）
+#   ACTION_END_TURN              结束回合
+#   ACTION_SURRENDER             投降
+#   ACTION_TURTLE_BASE + k       300龟选择 TURTLE_300_CHOICES[k]
+MAX_HAND_SIZE = 8  # 手牌上限（规则上最多 6 张，留出余量）
+ACTION_END_TURN = MAX_HAND_SIZE
+ACTION_SURRENDER = MAX_HAND_SIZE + 1
+ACTION_TURTLE_BASE = MAX_HAND_SIZE + 2
+NUM_ACTIONS = ACTION_TURTLE_BASE + len(TURTLE_300_CHOICES)
+
+PHASE_PLAY, PHASE_DISCARD, PHASE_TURTLE_300, PHASE_OVER = range(4)
+
+class Match:
+    """无头对局：按照 game_demo 的规则推进回合，只在需要玩家做决定时停下来
+
+    当前需要做的决定由 phase 表示，需要做决定的一方是 current。
+    step(action) 执行一个动作，并自动推进（延迟效果、跳过回合、抽牌）到下一个决定点。
+    需要在无头模式下使用（见 headless_mode），否则骰子和300龟会等待终端输入。
+
+    给出 seed 时建牌和洗牌用这一局自己的随机数（random.Random(seed)），不受其他对局和策略消耗随机数的影响：
+    同一个种子、同样的决定和点数一定得到同一局。events 是对局日志的记录器（见 gameLog），没给种子时随机选一个。
+    dice 是双方掷骰用的随机数（random.Random），默认用全局随机数；快照恢复出来的副本不带它。
+    """
+
+    seed = None
+    events = None  # 快照恢复出来的副本（搜索用）不记日志
+
+    def __init__(self, deck_size=DEFAULT_DECK_SIZE, debug_mode=False, names=("玩家A", "玩家B"), max_turns=None,
+                 seed=None, events=None, dice=None):
+        prototypes = playable_prototypes(debug_mode)
+        if seed is None and events is not None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        # 没有种子时用全局随机数，玩家沿用类上的默认值（不把 random 模块存进实例，对局才能 deepcopy/pickle）
+        rng = None if seed is None else random.Random(seed)
+        self.players = [Player(name, build_deck_from_prototypes(prototypes, deck_size, rng or random), rng)
+                        for name in names]
+        if dice is not None:
+            for pl in self.players:
+                pl._dice = dice
+        self.max_turns = max_turns
+        if events is not None:
+            self.events = events
+            events.start(self, deck_size, debug_mode)
+            for seat, pl in enumerate(self.players):
+                pl._events = events.seat(seat)
+        for pl in self.players:
+            pl.draw(5)
+            # 初始化状态标记（确保属性存在）
+            pl._skip_next_turn = False
+            pl._delayed_effects = []
+            pl._current_turn = 0
+        self.turn = 0
+        self.winner = None  # 获胜方下标，平局（达到回合上限）为 None
+        self.actions_remaining = 0
+        self.last_result = None
+        self._meter = None
+        if _tracer is not None:
+            # _meter = [是否已结束]，对象被回收时还没结束就记一次放弃；快照恢复出来的副本（搜索用）不计数
+            self._meter = [False]
+            weakref.finalize(self, _match_released, self._meter).atexit = False
+            _tracer.count("match_started")
+        self.first = self._roll_first_player()
+        self._start_turn()
+        self._advance()
+
+    def snapshot(self):
+        """对局完整状态的快照，用于搜索分支和假设推演（不包含全局随机数状态）"""
+        return (tuple([player.snapshot() for player in self.players]), self.max_turns, self.turn, self.first,
+                self.winner, self.phase, self.actions_remaining, self.last_result)
+
+    def restore(self, snap):
+        player_snaps, self.max_turns, self.turn, self.first, self.winner, self.phase, \
+            self.actions_remaining, self.last_result = snap
+        self._trace_turn = None
+        self._meter = None
+        if self.events is not None:
+            # 回到快照就离开了日志记下的那条时间线，不再记录
+            self.events = None
+            for player in self.players:
+                player._events = None
+        if len(getattr(self, "players", ())) == len(player_snaps):
+            for player, player_snap in zip(self.players, player_snaps):
+                player.restore(player_snap)
+        else:
+            self.players = [Player.from_snapshot(player_snap) for player_snap in player_snaps]
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        match = cls.__new__(cls)
+        match.restore(snap)
+        return match
+
+    def clone(self):
+        return Match.from_snapshot(self.snapshot())
+
+    def zobrist_key(self, observer=None):
+        """局面的 64 位 Zobrist 键
+
+        双方按“当前行动方、对方”的顺序合并，所以两名玩家状态互换（镜像局面）得到同一个键，
+        按这个键缓存的结果需要以当前行动方为视角保存。手牌、牌库按多重集计入，顺序不同也是同一个键。
+        给出 observer（座位）时返回该座位的信息集键：另一方的手牌和牌库只按张数计入。
+        回合数本身不计入，延迟效果按距触发的回合数计入。
+        """
+        mover = self.current_index
+        players = self.players
+        current, enemy = players[mover], players[1 - mover]
+        key = Z_PHASE[self.phase] ^ Z_ACTIONS_LEFT[self.actions_remaining % ZOBRIST_SPAN]
+        key ^= current.zobrist(self.turn, hidden=observer is not None and observer != mover)
+        key ^= _zobrist_rotate(enemy.zobrist(self.turn, hidden=observer is not None and observer == mover))
+        if self.winner is not None:
+            key ^= Z_WINNER[0 if self.winner == mover else 1]
+        return key
+
+    def _roll_first_player(self):
+        # 通过掷骰子决定先手，平局再掷一次，第二次平局时玩家A优先
+        p1, p2 = self.players
+        roll1 = interactive_roll(6, p1)
+        roll2 = interactive_roll(6, p2)
+        if roll1 == roll2:
+            roll1 = interactive_roll(6, p1)
+            roll2 = interactive_roll(6, p2)
+            return 0 if roll1 >= roll2 else 1
+        return 0 if roll1 > roll2 else 1
+
+    @property
+    def current_index(self):
+        return (self.first + self.turn) % 2
+
+    @property
+    def current(self):
+        return self.players[self.current_index]
+
+    @property
+    def enemy(self):
+        return self.players[1 - self.current_index]
+
+    @property
+    def done(self):
+        return self.phase == PHASE_OVER
+
+    def _start_turn(self):
+        # 回合开始的自动结算；需要跳过的回合直接进入摸牌+弃牌
+        if self.max_turns is not None and self.turn >= self.max_turns:
+            self.phase = PHASE_OVER
+            self._match_over()
+            return
+        if self.events is not None:
+            self.events.turn(self.turn, self.current_index)
+        current, enemy = self.current, self.enemy
+        self.phase = PHASE_DISCARD
+        if _tracer is not None:
+            self._trace_turn = _tracer.begin("turn")
+
+        # 每回合行动力减去负数储存值
+        if current._negative_action_points > 0:
+            recovery = max(2, current.hp // 2)
+            current._negative_action_points = max(0, current._negative_action_points - recovery)
+            if current.actions <= 0:
+                current.draw(1)
+                return
+
+        current._current_turn = self.turn
+        enemy._current_turn = self.turn
+        tracer = _tracer
+        if tracer is not None:
+            start = tracer.begin("delayed_effects")
+        apply_delayed_effects(current, self.turn)
+        apply_delayed_effects(enemy, self.turn)
+        if tracer is not None:
+            tracer.end("delayed_effects", start)
+            tracer.gauge("delayed_effects", len(current._delayed_effects) + len(enemy._delayed_effects))
+
+        if current._skip_next_turn:
+            if tracer is not None:
+                start = tracer.begin("skip_turn")
+            current._skip_next_turn = False
+            current.draw(1)
+            if tracer is not None:
+                tracer.end("skip_turn", start)
+            return
+
+        current._base_actions = max(2, current.hp // 2)
+        self.actions_remaining = current.actions
+        self.phase = PHASE_PLAY
+
+    def _advance(self):
+        # 自动推进，直到需要玩家做决定或对局结束
+        while self.phase != PHASE_OVER:
+            current = self.current
+            if self.phase == PHASE_PLAY:
+                if self.actions_remaining > 0:
+                    if current.hand:
+                        return
+                    # 没有手牌，自动抽一张并结束回合
+                    current.draw(1)
+                # 回合结束抽牌（每回合抽一张），然后进入弃牌环节
+                tracer = _tracer
+                if tracer is not None:
+                    start = tracer.begin("draw")
+                current.draw(1)
+                if tracer is not None:
+                    tracer.end("draw", start)
+                self.phase = PHASE_DISCARD
+            elif self.phase == PHASE_DISCARD:
+                if len(current.hand) > hand_limit(current):
+                    return
+                if _tracer is not None:
+                    self._end_turn_span()
+                self.turn += 1
+                self._start_turn()
+            else:
+                return
+
+    def legal_actions(self):
+        if self.phase == PHASE_PLAY:
+            return [*range(len(self.current.hand)), ACTION_END_TURN, ACTION_SURRENDER]
+        if self.phase == PHASE_DISCARD:
+            return list(range(len(self.current.hand)))
+        if self.phase == PHASE_TURTLE_300:
+            return [ACTION_TURTLE_BASE + k for k in range(len(TURTLE_300_CHOICES))]
+        return []
+
+    def step(self, action):
+        current, enemy = self.current, self.enemy
+        if self.phase == PHASE_PLAY:
+            if action == ACTION_END_TURN:
+                if self.events is not None:
+                    self.events.action(self, action)
+                self.actions_remaining = 0
+            elif action == ACTION_SURRENDER:
+                if self.events is not None:
+                    self.events.action(self, action)
+                self.winner = 1 - self.current_index
+                self.phase = PHASE_OVER
+                self._end_turn_span()
+            elif 0 <= action < len(current.hand):
+                if self.events is not None:
+                    self.events.action(self, action)
+                tracer = _tracer
+                if tracer is not None:
+                    start = tracer.begin("play")
+                self.last_result = current.play_card(action, enemy)
+                if getattr(current, "_pending_turtle_300", False):
+                    self.phase = PHASE_TURTLE_300
+                else:
+                    self._finish_play()
+                if tracer is not None:
+                    tracer.end("play", start)
+                if self.phase == PHASE_TURTLE_300:
+                    return
+            else:
+                raise ValueError(f"非法动作：{action}")
+        elif self.phase == PHASE_DISCARD:
+            if not 0 <= action < len(current.hand):
+                raise ValueError(f"非法动作：{action}")
+            if self.events is not None:
+                self.events.action(self, action)
+            tracer = _tracer
+            if tracer is not None:
+                start = tracer.begin("discard")
+            current.discard_card(action)
+            if tracer is not None:
+                tracer.end("discard", start)
+        elif self.phase == PHASE_TURTLE_300:
+            k = action - ACTION_TURTLE_BASE
+            if not 0 <= k < len(TURTLE_300_CHOICES):
+                raise ValueError(f"非法动作：{action}")
+            del current._pending_turtle_300
+            self.last_result = apply_turtle_300(current, enemy, TURTLE_300_CHOICES[k])
+            self.phase = PHASE_PLAY
+            self._finish_play()
+        else:
+            raise ValueError("对局已经结束")
+        self._advance()
+
+    def _finish_play(self):
+        # 立即应用伤害修改器，然后检查胜负
+        current, enemy = self.current, self.enemy
+        current.apply_modifiers()
+        enemy.apply_modifiers()
+        self.actions_remaining -= 1
+        if current.is_dead():
+            self.winner = 1 - self.current_index
+            self.phase = PHASE_OVER
+            self._end_turn_span()
+        elif enemy.is_dead():
+            self.winner = self.current_index
+            self.phase = PHASE_OVER
+            self._end_turn_span()
+
+    def _end_turn_span(self):
+        # 回合结束（换手或分出胜负）时结束 turn span，保证各 span 严格嵌套
+        if getattr(self, "_trace_turn", None) is not None:
+            if _tracer is not None:
+                _tracer.end("turn", self._trace_turn, self.turn)
+            self._trace_turn = None
+        if self.phase == PHASE_OVER:
+            self._match_over()
+
+    def _match_over(self):
+        # 对局结束：记结束数，日志写上结果并交出去
+        meter = getattr(self, "_meter", None)
+        if meter is not None and not meter[0]:
+            meter[0] = True
+            trace_count("match_finished")
+        if self.events is not None:
+            events, self.events = self.events, None
+            events.finish(self)
+
+def random_policy(match):
+    # 随机策略：出牌阶段总是随机出一张手牌（不主动结束回合或投降），其余阶段随机选择
+    if match.phase == PHASE_PLAY:
+        return random.randrange(len(match.current.hand))
+    return random.choice(match.legal_actions())
+
+def simulate_match(deck_size=DEFAULT_DECK_SIZE, policy=random_policy, max_turns=500, events=None):
+    """无头跑完一局，返回 (获胜方下标或 None, 回合数)；events 是对局日志的记录器（见 gameLog）"""
+    with headless_mode():
+        match = Match(deck_size=deck_size, max_turns=max_turns, events=events)
+        while not match.done:
+            match.step(policy(match))
+    return match.winner, match.turn
+
 
 
 # ====== 游戏主逻辑 ======
+def discard_phase(current):
+    # 弃牌环节：计算玩家最多可以保留的牌数（行动力上限，最小为2）
+    max_cards = hand_limit(current)
+
+    # 如果手牌数量超过最大保留数量，进入弃牌环节
+    if len(current.hand) > max_cards:
+        tracer = _tracer
+        if tracer is not None:
+            start = tracer.begin("discard")
+        print(f"\n===== 弃牌环节 =====")
+        print(f"{current.name} 手牌数量({len(current.hand)})超过最大保留数量({max_cards})，需要弃牌")
+
+        # 不断弃牌直到手牌数量不超过最大保留数量
+        while len(current.hand) > max_cards:
+            print(f"\n{current.name} 手牌: {current.hand_listing()}")
+            print(f"需要弃掉 {len(current.hand) - max_cards} 张牌")
+
+            try:
+                choice = prompt_input(f"选择要弃掉的卡牌编号(0-{len(current.hand)-1}): ", "discard").strip()
+                idx = int(choice)
+
+                if 0 <= idx < len(current.hand):
+                    # 弃牌
+                    discarded = current.discard_card(idx)
+                    print(f"{current.name} 弃掉了 {card_of(discarded).name}")
+                else:
+                    print("编号无效，请重新选择。")
+            except ValueError:
+                print("请输入数字编号。")
+        if tracer is not None:
+            tracer.end("discard", start)
+
+@metered_game
 def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
     # 根据debug_mode参数决定是否包含调试卡牌
-    if debug_mode:
-        # 包含调试卡牌
-        p1 = Player("玩家A", build_deck_from_prototypes(deck_prototypes, deck_size=deck_size))
-        p2 = Player("玩家B", build_deck_from_prototypes(deck_prototypes, deck_size=deck_size))
-    else:
-        # 不包含调试卡牌
-        # 创建一个不包含调试卡牌的牌堆原型列表
-        filtered_prototypes = [card for card in deck_prototypes if card.name != "调试卡牌"]
-        p1 = Player("玩家A", build_deck_from_prototypes(filtered_prototypes, deck_size=deck_size))
-        p2 = Player("玩家B", build_deck_from_prototypes(filtered_prototypes, deck_size=deck_size))
+    prototypes = playable_prototypes(debug_mode)
+    p1 = Player("玩家A", build_deck_from_prototypes(prototypes, deck_size=deck_size))
+    p2 = Player("玩家B", build_deck_from_prototypes(prototypes, deck_size=deck_size))
 
     p1.draw(5)
     p2.draw(5)
@@ -697,7 +1591,7 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
             first_player = p2
             print(f"{p2.name} 点数更高，获得先手！")
 
-    input("按回车键开始游戏...")
+    prompt_input("按回车键开始游戏...", "start")
 
     turn = 0
     # 根据掷骰结果设置先手玩家
@@ -705,6 +1599,10 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
     first_player = first_player  # 已经通过掷骰子确定了先手玩家
 
     while True:
+        # 整个回合一个 span（包含玩家思考的时间），每个 turn += 1 之前结束
+        tracer = _tracer
+        if tracer is not None:
+            turn_start = tracer.begin("turn")
         # 根据先手玩家和turn值确定当前玩家
         if first_player == p1:
             current = p1 if turn % 2 == 0 else p2
@@ -732,34 +1630,11 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
                 print(f"{current.name} 恢复了 {recovery} 点负行动力，剩余 {current._negative_action_points} 点")
                 current.draw(1)
 
-                # 弃牌环节 - 行动力不足时
-                # 计算玩家最多可以保留的牌数（行动力上限，最小为2）
-                max_cards = max(2, current._base_actions)
-
-                # 如果手牌数量超过最大保留数量，进入弃牌环节
-                if len(current.hand) > max_cards:
-                    print(f"\n===== 弃牌环节 =====")
-                    print(f"{current.name} 手牌数量({len(current.hand)})超过最大保留数量({max_cards})，需要弃牌")
-
-                    # 不断弃牌直到手牌数量不超过最大保留数量
-                    while len(current.hand) > max_cards:
-                        print(f"\n{current.name} 手牌: {[f'{i}:{c.name}' for i,c in enumerate(current.hand)]}")
-                        print(f"需要弃掉 {len(current.hand) - max_cards} 张牌")
-
-                        try:
-                            choice = input(f"选择要弃掉的卡牌编号(0-{len(current.hand)-1}): ").strip()
-                            idx = int(choice)
-
-                            if 0 <= idx < len(current.hand):
-                                # 弃牌
-                                discarded_card = current.hand.pop(idx)
-                                current.discard.append(discarded_card)
-                                print(f"{current.name} 弃掉了 {discarded_card.name}")
-                            else:
-                                print("编号无效，请重新选择。")
-                        except ValueError:
-                            print("请输入数字编号。")
+                # 弃牌环节
+                discard_phase(current)
 
+                if tracer is not None:
+                    tracer.end("turn", turn_start, turn)
                 turn += 1
                 continue
 
@@ -768,8 +1643,13 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
         enemy._current_turn = turn
         
         # 在回合开始时应用延迟效果
+        if tracer is not None:
+            start = tracer.begin("delayed_effects")
         apply_delayed_effects(current, turn)
         apply_delayed_effects(enemy, turn)
+        if tracer is not None:
+            tracer.end("delayed_effects", start)
+            tracer.gauge("delayed_effects", len(current._delayed_effects) + len(enemy._delayed_effects))
         
         # --- 回合信息提示 ---
         # 计算当前回合数：两个玩家各完成一次自己的回合算一个总的回合
@@ -779,10 +1659,10 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
         player_turn = "先手" if current == first_player else "后手"
         print(f"\n===== 第 {round_num} 回合 =====")
         print("----------------------------")
-        print(f"{current.name} 状态 → HP:{current.hp} SAN:{current.san} 行动力:{current.actions} "
+        print(f"{current.name} 状态 → {current.stat_summary()} 行动力:{current.actions} "
               f"手牌数:{len(current.hand)} 牌库:{len(current.deck)} 弃牌堆:{len(current.discard)} "
               f"效果:{effect_status(current)} (闪现速:{current.dice_speed:.3f}s)")
-        print(f"{enemy.name} 状态 → HP:{enemy.hp} SAN:{enemy.san} 行动力:{enemy.actions} "
+        print(f"{enemy.name} 状态 → {enemy.stat_summary()} 行动力:{enemy.actions} "
               f"手牌数:{len(enemy.hand)} 牌库:{len(enemy.deck)} 弃牌堆:{len(enemy.discard)} "
               f"效果:{effect_status(enemy)} (闪现速:{enemy.dice_speed:.3f}s)")
         print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
@@ -791,38 +1671,19 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
 
         # 处理跳过回合状态
         if getattr(current, "_skip_next_turn", False):
+            if tracer is not None:
+                start = tracer.begin("skip_turn")
             print(f"{current.name} 被迫跳过本回合（受效果影响）")
             current._skip_next_turn = False
             current.draw(1)
+            if tracer is not None:
+                tracer.end("skip_turn", start)
 
-            # 弃牌环节 - 跳过回合时
-            # 计算玩家最多可以保留的牌数（行动力上限，最小为2）
-            max_cards = max(2, current._base_actions)
-
-            # 如果手牌数量超过最大保留数量，进入弃牌环节
-            if len(current.hand) > max_cards:
-                print(f"\n===== 弃牌环节 =====")
-                print(f"{current.name} 手牌数量({len(current.hand)})超过最大保留数量({max_cards})，需要弃牌")
-
-                # 不断弃牌直到手牌数量不超过最大保留数量
-                while len(current.hand) > max_cards:
-                    print(f"\n{current.name} 手牌: {[f'{i}:{c.name}' for i,c in enumerate(current.hand)]}")
-                    print(f"需要弃掉 {len(current.hand) - max_cards} 张牌")
-
-                    try:
-                        choice = input(f"选择要弃掉的卡牌编号(0-{len(current.hand)-1}): ").strip()
-                        idx = int(choice)
-
-                        if 0 <= idx < len(current.hand):
-                            # 弃牌
-                            discarded_card = current.hand.pop(idx)
-                            current.discard.append(discarded_card)
-                            print(f"{current.name} 弃掉了 {discarded_card.name}")
-                        else:
-                            print("编号无效，请重新选择。")
-                    except ValueError:
-                        print("请输入数字编号。")
+            # 弃牌环节
+            discard_phase(current)
 
+            if tracer is not None:
+                tracer.end("turn", turn_start, turn)
             turn += 1
             continue
 
@@ -835,7 +1696,7 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
         # 当还有行动力时，可以继续出牌
         while actions_remaining > 0:
             print(f"\n剩余行动力: {current.actions}")
-            print(f"{current.name} 手牌: {[f'{i}:{c.name}' for i,c in enumerate(current.hand)]}")
+            print(f"{current.name} 手牌: {current.hand_listing()}")
 
             # 如果没有手牌，自动抽一张并结束回合
             if not current.hand:
@@ -845,7 +1706,7 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
                 break
 
             # 提供选项：出牌、结束回合或投降
-            choice = input(f"选择要使用的卡牌编号(0-{len(current.hand)-1})，输入-1结束回合，输入-2投降: ").strip()
+            choice = prompt_input(f"选择要使用的卡牌编号(0-{len(current.hand)-1})，输入-1结束回合，输入-2投降: ", "card").strip()
 
             if choice == "-1":
                 print("选择结束回合")
@@ -853,30 +1714,40 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
             elif choice == "-2":
                 print(f"{current.name} 选择投降！")
                 print(f"{enemy.name} 获胜！")
-                input("按回车返回主菜单...")
+                if tracer is not None:
+                    tracer.end("turn", turn_start, turn)
+                prompt_input("按回车返回主菜单...", "end")
                 return
 
             try:
                 idx = int(choice)
                 if 0 <= idx < len(current.hand):
                     # 出牌
+                    if tracer is not None:
+                        start = tracer.begin("play")
                     result = current.play_card(idx, enemy)
                     print(result)
 
                     # 立即应用伤害修改器，使伤害生效
                     current.apply_modifiers()
                     enemy.apply_modifiers()
+                    if tracer is not None:
+                        tracer.end("play", start)
 
                     actions_remaining -= 1  # 每出一张牌消耗一点行动力
 
                     # 检查胜负
                     if current.is_dead():
                         print(f"{current.name} 已死亡，{enemy.name} 获胜！")
-                        input("按回车返回主菜单...")
+                        if tracer is not None:
+                            tracer.end("turn", turn_start, turn)
+                        prompt_input("按回车返回主菜单...", "end")
                         return
                     if enemy.is_dead():
                         print(f"{enemy.name} 已死亡，{current.name} 获胜！")
-                        input("按回车返回主菜单...")
+                        if tracer is not None:
+                            tracer.end("turn", turn_start, turn)
+                        prompt_input("按回车返回主菜单...", "end")
                         return
                 else:
                     print("编号无效，请重新选择。")
@@ -884,36 +1755,17 @@ def game_demo(deck_size=DEFAULT_DECK_SIZE, debug_mode=False):
                 print("请输入数字编号或-1结束回合。")
 
         # 回合结束抽牌（每回合抽一张）
+        if tracer is not None:
+            start = tracer.begin("draw")
         current.draw(1)
+        if tracer is not None:
+            tracer.end("draw", start)
 
         # 弃牌环节
-        # 计算玩家最多可以保留的牌数（行动力上限，最小为2）
-        max_cards = max(2, current._base_actions)
-
-        # 如果手牌数量超过最大保留数量，进入弃牌环节
-        if len(current.hand) > max_cards:
-            print(f"\n===== 弃牌环节 =====")
-            print(f"{current.name} 手牌数量({len(current.hand)})超过最大保留数量({max_cards})，需要弃牌")
-
-            # 不断弃牌直到手牌数量不超过最大保留数量
-            while len(current.hand) > max_cards:
-                print(f"\n{current.name} 手牌: {[f'{i}:{c.name}' for i,c in enumerate(current.hand)]}")
-                print(f"需要弃掉 {len(current.hand) - max_cards} 张牌")
-
-                try:
-                    choice = input(f"选择要弃掉的卡牌编号(0-{len(current.hand)-1}): ").strip()
-                    idx = int(choice)
-
-                    if 0 <= idx < len(current.hand):
-                        # 弃牌
-                        discarded_card = current.hand.pop(idx)
-                        current.discard.append(discarded_card)
-                        print(f"{current.name} 弃掉了 {discarded_card.name}")
-                    else:
-                        print("编号无效，请重新选择。")
-                except ValueError:
-                    print("请输入数字编号。")
+        discard_phase(current)
 
+        if tracer is not None:
+            tracer.end("turn", turn_start, turn)
         turn += 1
 
 
@@ -993,3 +1845,53 @@ if __name__ == "__main__":
 
 
 # v1.3.2
+# [更新1] 新增第三条属性生命线「记忆」，任何一条属性归零即败北
+# [更新2] Player 的属性改为属性向量（数值/修改器/上限三个紧凑数组），is_dead/apply_modifiers/status 统一遍历，新增属性只需修改 STAT_NAMES
+# [更新3] 死亡判定改为维护归零属性计数，判定为 O(1)，不随属性条数变慢
+# [更新4] 新增记忆类卡牌缚狐夺魂、忘川之水；300龟可以选择减少对方的记忆
+# [更新5] 新增无头模式（HEADLESS / headless_mode）：不闪现、不等待输入、不打印；300龟在无头模式下挂起选择，由引擎完成
+# [更新6] 新增无头对局引擎 Match 与 simulate_match，规则与 game_demo 一致，供模拟和 AI 使用
+# [更新7] 新增 gameVecEnv.py：NumPy 向量化多局环境，一次 step 同时结算 N 局
+# [更新8] 新增 gameEnv.py：Gym 风格单局环境（reset/step/observation/legal_action_mask），观测按座位分块增量编码
+# [更新9] 卡牌编号化：原型在 CARD_REGISTRY 中分配一字节编号，牌堆/手牌/弃牌堆改为 array('B') 编号数组，构建牌堆不再 clone 卡牌
+# [更新10] game_demo 中三处重复的弃牌环节合并为 discard_phase
+# [更新11] 对局快照：Player/Match 新增 snapshot/restore，Match.clone 供搜索分支使用；牌堆写时复制；鸡机延迟效果改为模块级函数（不再捕获闭包）
+#          新增 gameBenchmark.py，对比 copy.deepcopy
+# [更新12] 新增 gameAI.py：蒙特卡洛树搜索电脑对手 MCTSBot（掷骰作为机会节点、按时间预算搜索、换手后复用搜索树）与终端人机对战 play_vs_bot
+#          apply_modifiers 没有修改器时直接返回
+# [更新13] gameAI.py 新增 ExpectiminimaxBot：深度受限期望极小极大搜索（Star1/Star2 机会节点剪枝、Zobrist 置换表），
+#          以及逐点试打得到的卡牌期望值表 CARD_OUTCOMES / CARD_EV / CARD_WORTH 和基于它的估值 ev_evaluate
+# [更新14] gameAI.py 新增 ISMCTSBot：信息集蒙特卡洛树搜索，不读取对手手牌和牌库顺序，按公开信息成批抽取确定化；人机对战默认使用它
+#          拆出 deck_composition（每种卡的副本数），build_deck_from_prototypes 改为调用它
+# [更新15] 增量 Zobrist 局面键：属性、修改器、牌堆在改动处同步更新哈希，Match.zobrist_key 与手牌顺序无关、双方镜像局面同键，
+#          observer 参数给出隐藏对手手牌和牌库的信息集键；gameAI 的搜索树、信息集和置换表改用它
+# [更新16] 新增 gameTablebase.py：属性竞赛模型的残局库，逆向分析多进程求解，结果存成内存映射文件，Tablebase 按局面 O(1) 查胜率
+# [更新17] gameAI.py 新增 AnytimeBot：按时间预算迭代加深的期望极小极大搜索，单调时钟截止、超时中断当前层，总在截止前返回合法动作
+# [更新18] headless_mode 改为只对当前线程生效（新增 is_headless）；gameAI 新增 Ponderer：人机对战中玩家思考时 MCTS/ISMCTS 在后台线程继续搜索，
+#          思考时间从下一步的预算里扣除
+# [更新19] gameAI 新增难度分级：BOT_TIERS 按迭代次数、树深度、每步时间、每局 CPU 定义，TieredBot 共用 ISMCTSBot，
+#          BotScheduler 按难度记录 CPU 时间并在负载高时自动降级；search_actions 只在手牌全是负收益时才考虑结束回合
+# [更新20] 新增 gameBook 开局库：无头自我对弈统计前两个回合的 (信息集键, 动作) 胜率，排序后内存映射二分查找；
+#          card_fingerprint 给卡牌定义算指纹，卡牌改动后开局库自动失效；各电脑对手新增 book 参数
+# [更新21] gameAI 新增 greedy_policy 一步贪心策略：按当前属性、上限、虚环递归和裘罗标记给手牌估值，弃牌和300龟也有对应选择
+# [更新22] gameBenchmark 扩充为基准套件：掷骰、结算（含虚环递归）、摸牌洗牌、建牌堆、延迟效果、修改器的微基准和整局对局的宏基准，
+#          结果连同机器信息存成 JSON，并与基准线比较找出变慢的项
+# [更新23] 新增追踪埋点：tracing() 打开后记录回合各阶段（延迟效果、跳过回合、出牌、摸牌、弃牌）和每次 Card.play 的 span，
+#          以及掷骰、虚环递归判定、洗牌、等待输入的计数，可导出 JSON 或 Chrome trace；关闭时每处只多一次判断
+# [更新24] 新增 gameProfile：模拟一批对局，按卡名统计结算耗时、CPU、掷骰和虚环递归次数、内存块净增量，输出排序报告和折叠栈；
+#          turn span 在分出胜负时也会结束，300龟挂起时 play span 照常结束，保证 span 严格嵌套
+# [更新25] 新增 gameMemory：逐局 tracemalloc 内存报告（峰值、对局结束后的占用斜率、净增最多的位置）和泄漏检查
+#          （Player/Match/Card/闭包 是否活过对局、玩家身上有没有多出来的属性），无头对局和 game_demo 都能检查
+# [更新26] 新增 gameMetrics：按线程分片的运行指标（对局开始/结束/放弃、回合和掷骰速率、结算与等待输入的耗时直方图、
+#          闪现中的骰子、排队的延迟效果、电脑 CPU），本地 /metrics 提供 Prometheus 格式，/stats 提供 JSON；
+#          等待输入统一走 prompt_input（prompt span），新增 resolve span、flicker/对局/bot_cpu_ns 计数器和 Tracer.gauge
+# [更新27] 新增 gameLatency：记录每个提示的发出、收到回车、输出写完三个时刻，按提示种类（出牌、弃牌、停骰、300龟……）
+#          报告玩家思考时间和响应时间，列出响应最慢的几次；prompt_input 多了 kind 参数，终局的“按回车返回主菜单”也算一个提示
+# [更新28] 新增 gameLog：每局一条只追加的二进制事件记录（varint 编码，平均每回合约 30 字节）：种子、建牌、摸牌、出牌、掷骰、
+#          属性结算、延迟效果、弃牌、300龟选择和结果；Match 新增 seed/events 参数，有种子时建牌洗牌用这一局自己的随机数
+# [更新29] 新增 gameReplay：按日志里的种子、决定和点数用真正的引擎无头回放，逐字节核对每个事件，报告第一处不一致；
+#          改卡牌代码后拿旧日志跑一遍做回归检查（单核每秒一千局左右，--processes 分给多个进程）
+# [更新30] 对局日志升到第 2 版：每 16 回合记一个关键帧（完整对局状态），洗回牌库时记下洗好的顺序；
+#          新增 gameViewer：从最近的关键帧恢复再重放之后的决定，跳到任意回合只要零点几毫秒，和对局多长无关
+# [更新31] 新增 gameHistory：把对局日志导入本地 SQLite（按批、每批一个事务），按卡牌和按掷骰点数建索引，
+#          可以查“300龟骰出300的对局”“输掉时带着2层虚环递归的对局”；查询走只读连接池，gameMetrics 加了 /history
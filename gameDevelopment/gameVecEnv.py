@@ -0,0 +1,710 @@
+
+import argparse
+import random
+import time
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+import gameV1_3_2 as game
+
+# ====== 向量化多局对战环境（struct-of-arrays） ======
+# 把 gameV1_3_2 规则下 N 局对战的状态保存成 NumPy 数组（每个数组第 0 维是对局，第 1 维是玩家），
+# 一次 step 用数组运算同时结算所有对局的出牌，骰子由一个 numpy Generator 批量生成。
+# 与 Match 的区别：
+#   - 弃牌环节随机弃牌，不需要额外动作
+#   - 300龟骰到300时的选择由 step 的 turtle_choices 参数给出（默认随机）
+#   - 慢速药/加速药/裘罗只影响闪现显示，这里不保存对应状态
+
+# 卡牌编号与 gameV1_3_2.CARD_REGISTRY 一致（调试卡牌不会进入牌堆，它那一行效果全为 0）
+CARD_PROTOTYPES = game.CARD_REGISTRY
+NUM_CARDS = len(CARD_PROTOTYPES)
+MAX_SIDES = max(card.dice_sides or 0 for card in CARD_PROTOTYPES)
+MAX_DELAYED = 8  # 每名玩家延迟效果计时槽的初始数量，用完时加倍
+STAT_CAPS = np.full(game.NUM_STATS, game.DEFAULT_STAT_CAP, np.int32)
+
+# ====== 卡牌效果表 ======
+# 效果表通过在哑玩家身上直接调用卡牌函数得到，保证与 Python 引擎的结算一致。
+# 以 (卡牌编号, 点数) 为下标；没有骰子的卡牌只使用点数 0。
+CARD_SIDES = np.zeros(NUM_CARDS, np.int64)
+CARD_MIN = np.zeros(NUM_CARDS, np.int64)
+CARD_SUBRANGE = np.full((NUM_CARDS, MAX_SIDES + 1), -1, np.int16)  # 点数所在子区间编号
+CARD_OUTCOME_OK = np.zeros((NUM_CARDS, MAX_SIDES + 1), bool)       # 点数是否匹配某个效果区间
+USER_DELTA = np.zeros((NUM_CARDS, MAX_SIDES + 1, game.NUM_STATS), np.int32)
+TARGET_DELTA = np.zeros((NUM_CARDS, MAX_SIDES + 1, game.NUM_STATS), np.int32)
+SETS_SKIP = np.zeros((NUM_CARDS, MAX_SIDES + 1), bool)
+SETS_VOID = np.full((NUM_CARDS, MAX_SIDES + 1), -1, np.int8)
+TURTLE_300 = np.zeros((NUM_CARDS, MAX_SIDES + 1), bool)
+MENTOS = np.zeros(NUM_CARDS, bool)
+DELAY_TURNS = np.zeros(NUM_CARDS, np.int32)
+DELAY_DELTA = np.zeros((NUM_CARDS, game.NUM_STATS), np.int32)
+DELAY_CARD_OF = {}  # 延迟效果函数 → 卡牌编号（从 Match 载入状态时用）
+# 曼妥思之神两次判定的原始恢复量（按点数），实际恢复量还要受上限限制
+MENTOS_SAN = np.zeros(8, np.int32)
+MENTOS_HP = np.zeros(8, np.int32)
+
+def _probe(effect, roll=None, stats=None, second_roll=None):
+    user = game.Player("user", [])
+    target = game.Player("target", [])
+    user._current_turn = 0
+    if stats is not None:
+        for i in range(game.NUM_STATS):
+            user.stat_values[i] = stats
+            user._stat_preview[i] = stats
+    if second_roll is not None:
+        user._next_roll_value = second_roll
+    if roll is None:
+        effect(user, target)
+    else:
+        effect(user, target, roll)
+    return user, target
+
+def _build_card_tables():
+    with game.headless_mode():
+        for c, card in enumerate(CARD_PROTOTYPES):
+            if not card.dice_sides:
+                user, target = _probe(card.stable_effect)
+                _record(c, 0, user, target)
+                continue
+            CARD_SIDES[c] = card.dice_sides
+            CARD_MIN[c] = card.min_value
+            for roll in range(card.min_value, card.dice_sides + 1):
+                for sub_index, (low, high) in enumerate(card.subranges):
+                    if low <= roll <= high:
+                        CARD_SUBRANGE[c, roll] = sub_index
+                        break
+                effect = next((fx for rng, fx in card.outcomes.items() if rng[0] <= roll <= rng[1]), None)
+                if not callable(effect):
+                    continue
+                CARD_OUTCOME_OK[c, roll] = True
+                if effect is game.mentos_god:
+                    MENTOS[c] = True
+                    # 把属性压到 1，测出不受上限影响的原始恢复量
+                    user, _ = _probe(effect, roll, stats=1, second_roll=roll)
+                    MENTOS_SAN[roll] = user.stat_modifiers[game.STAT_SAN]
+                    MENTOS_HP[roll] = user.stat_modifiers[game.STAT_HP]
+                    continue
+                user, target = _probe(effect, roll)
+                _record(c, roll, user, target)
+
+def _record(c, roll, user, target):
+    USER_DELTA[c, roll] = user.stat_modifiers
+    TARGET_DELTA[c, roll] = target.stat_modifiers
+    SETS_SKIP[c, roll] = getattr(target, "_skip_next_turn", False)
+    SETS_VOID[c, roll] = getattr(target, "_void_box_recursion", -1)
+    TURTLE_300[c, roll] = getattr(user, "_pending_turtle_300", False)
+    delayed = getattr(user, "_delayed_effects", [])
+    if delayed:
+        # 目前的延迟效果都只作用于使用者本人，触发一次后记录修改量
+        effect_turn, effect_func = delayed[0]
+        DELAY_TURNS[c] = effect_turn - user._current_turn
+        DELAY_CARD_OF[effect_func] = c
+        before = np.array(user.stat_modifiers)
+        effect_func(user)
+        DELAY_DELTA[c] = np.array(user.stat_modifiers) - before
+
+_build_card_tables()
+
+def base_deck_ids(deck_size=game.DEFAULT_DECK_SIZE):
+    # 按 build_deck_from_prototypes 的稀有度规则得到一副牌的卡牌编号（未洗牌）
+    deck = game.build_deck_from_prototypes(game.playable_prototypes(), deck_size=deck_size)
+    return np.sort(np.array(deck, np.int16))
+
+# ====== 环境 ======
+# 状态按 struct-of-arrays 存放：对局维放在最后且连续，每名玩家一“列”，列号 = 2 * 对局 + 玩家，
+# 对方的列号是 列号 ^ 1。多值状态（属性、手牌、牌堆、延迟计时器）在前面加一维，
+# 例如 stats 的形状是 (NUM_STATS, N, 2)，内部结算使用 (NUM_STATS, 2N) 的视图，
+# 这样每个读写都是一维的 take/散列写入，不需要逐局的 Python 循环。
+# 效果表同样展平，以 卡牌编号 * (MAX_SIDES + 1) + 点数 为下标。
+_ROLL_SPAN = MAX_SIDES + 1
+_USER_DELTA = np.ascontiguousarray(USER_DELTA.reshape(-1, game.NUM_STATS).T)
+_TARGET_DELTA = np.ascontiguousarray(TARGET_DELTA.reshape(-1, game.NUM_STATS).T)
+_SUBRANGE = CARD_SUBRANGE.ravel()
+_OUTCOME_OK = CARD_OUTCOME_OK.ravel()
+_SETS_SKIP = SETS_SKIP.ravel()
+_SETS_VOID = SETS_VOID.ravel()
+_TURTLE_300 = TURTLE_300.ravel()
+_NO_DELAY = np.iinfo(np.int32).max
+
+class VecCardGameEnv:
+    """同时推进 N 局对战的向量化环境
+
+    step(actions) 的 actions 为每局当前行动方的动作：0..手牌数-1 出对应手牌，-1 结束回合，-2 投降，
+    其它非法值按结束回合处理。已经结束的对局忽略动作，直到下一次 reset。
+    load(matches) 从 Match 对象载入每局的状态（对局停在出牌决定点时），之后照常 step。
+    """
+
+    def __init__(self, num_games, deck_size=game.DEFAULT_DECK_SIZE, max_turns=500, seed=None):
+        self.num_games = num_games
+        self.deck_size = deck_size
+        self.max_turns = max_turns
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        n, d, h = self.num_games, self.deck_size, game.MAX_HAND_SIZE
+        self.rng = np.random.default_rng(seed)
+        self.stats = np.full((game.NUM_STATS, n, 2), game.DEFAULT_STAT_CAP, np.int32)
+        self.neg_actions = np.zeros((n, 2), np.int32)
+        self.base_actions = np.full((n, 2), max(2, game.DEFAULT_STAT_CAP // 2), np.int32)
+        self.skip = np.zeros((n, 2), bool)
+        self.void_box = np.zeros((n, 2), np.int8)
+        self.hand = np.full((h, n, 2), -1, np.int16)
+        self.hand_n = np.zeros((n, 2), np.int32)
+        self.deck = np.empty((d, n, 2), np.int16)
+        self.deck_n = np.full((n, 2), d, np.int32)
+        self.discard = np.full((d, n, 2), -1, np.int16)
+        self.discard_n = np.zeros((n, 2), np.int32)
+        self.delay_turn = np.full((MAX_DELAYED, n, 2), -1, np.int32)
+        self.delay_card = np.zeros((MAX_DELAYED, n, 2), np.int16)
+        self.next_delay = np.full((n, 2), _NO_DELAY, np.int32)  # 最早到期的延迟效果回合，用于快速跳过
+        self.turn = np.zeros(n, np.int32)
+        self.actions_remaining = np.zeros(n, np.int32)
+        self.done = np.zeros(n, bool)
+        self.winner = np.full(n, -1, np.int8)
+        self._make_views()
+
+        # 洗牌：每列用随机键排序
+        base = base_deck_ids(d)
+        self.deck[:] = base[np.argsort(self.rng.random((d, n, 2)), axis=0)]
+        cols = np.arange(2 * n)
+        for _ in range(5):
+            self._draw(cols)
+
+        # 掷骰子决定先手，平局再掷一次，第二次平局时玩家A优先
+        rolls = self.rng.integers(1, 7, size=(2, 2, n))
+        first_round = np.where(rolls[0, 0] > rolls[0, 1], 0, 1)
+        second_round = np.where(rolls[1, 0] >= rolls[1, 1], 0, 1)
+        self.first = np.where(rolls[0, 0] == rolls[0, 1], second_round, first_round).astype(np.int32)
+
+        self._start_turn(np.arange(n))
+
+    def _make_views(self):
+        n = self.num_games
+        for name in ("neg_actions", "base_actions", "skip", "void_box", "hand_n", "deck_n", "discard_n", "next_delay"):
+            setattr(self, "_" + name, getattr(self, name).reshape(2 * n))
+        for name in ("stats", "hand", "deck", "discard", "delay_turn", "delay_card"):
+            values = getattr(self, name)
+            setattr(self, "_" + name, values.reshape(values.shape[0], 2 * n))
+
+    def _grow_delayed(self, slots):
+        # 延迟效果计时槽不够时扩到至少 slots 个（按倍数增长），已有的计时原样保留
+        size = self.delay_turn.shape[0]
+        while size < slots:
+            size *= 2
+        extra = size - self.delay_turn.shape[0]
+        if extra <= 0:
+            return
+        shape = (extra, self.num_games, 2)
+        self.delay_turn = np.concatenate([self.delay_turn, np.full(shape, -1, np.int32)])
+        self.delay_card = np.concatenate([self.delay_card, np.zeros(shape, np.int16)])
+        self._make_views()
+
+    def load(self, matches):
+        """从 Match 对象载入每局的状态（matches 与对局一一对应，都要停在出牌决定点）；随机数状态不变"""
+        if len(matches) != self.num_games:
+            raise ValueError(f"需要 {self.num_games} 局，给了 {len(matches)} 局")
+        for g, match in enumerate(matches):
+            if match.phase != game.PHASE_PLAY:
+                raise ValueError(f"第 {g} 局不在出牌决定点")
+            if max(len(player.hand) for player in match.players) > game.MAX_HAND_SIZE:
+                raise ValueError(f"第 {g} 局的手牌超过 {game.MAX_HAND_SIZE} 张")
+            if max(len(player.deck) + len(player.hand) + len(player.discard) for player in match.players) > self.deck_size:
+                raise ValueError(f"第 {g} 局的牌比 deck_size={self.deck_size} 多")
+            self._grow_delayed(max(len(player._delayed_effects) for player in match.players))
+            self.turn[g] = match.turn
+            self.first[g] = match.first
+            self.actions_remaining[g] = match.actions_remaining
+            self.done[g] = False
+            self.winner[g] = -1
+            for seat, player in enumerate(match.players):
+                self.stats[:, g, seat] = player.stat_values
+                self.neg_actions[g, seat] = player._negative_action_points
+                self.base_actions[g, seat] = player._base_actions
+                self.skip[g, seat] = bool(getattr(player, "_skip_next_turn", False))
+                self.void_box[g, seat] = getattr(player, "_void_box_recursion", 0)
+                self.hand[:, g, seat] = -1
+                self.hand[:len(player.hand), g, seat] = player.hand
+                self.hand_n[g, seat] = len(player.hand)
+                # Match 从牌库开头摸牌，这里从第 deck_n-1 格摸，所以倒过来放
+                self.deck[:len(player.deck), g, seat] = player.deck[::-1]
+                self.deck_n[g, seat] = len(player.deck)
+                self.discard[:, g, seat] = -1
+                self.discard[:len(player.discard), g, seat] = player.discard
+                self.discard_n[g, seat] = len(player.discard)
+                self.delay_turn[:, g, seat] = -1
+                for slot, (when, effect) in enumerate(player._delayed_effects):
+                    self.delay_turn[slot, g, seat] = when
+                    self.delay_card[slot, g, seat] = DELAY_CARD_OF[effect]
+                self.next_delay[g, seat] = min((when for when, _ in player._delayed_effects), default=_NO_DELAY)
+
+    def current_player(self, games=None):
+        if games is None:
+            return (self.first + self.turn) % 2
+        return (self.first[games] + self.turn[games]) % 2
+
+    def _current_cols(self, g):
+        return 2 * g + (self.first.take(g) + self.turn.take(g)) % 2
+
+    def random_actions(self):
+        # 随机策略：总是随机出一张手牌，与 game.random_policy 一致
+        count = self._hand_n.take(self._current_cols(np.arange(self.num_games)))
+        return (self.rng.random(self.num_games) * count).astype(np.int64)
+
+    # ----- 牌堆操作（参数 c 为列号数组） -----
+    def _draw(self, c):
+        empty = np.flatnonzero((self._deck_n.take(c) == 0) & (self._discard_n.take(c) > 0))
+        if empty.size:
+            self._reshuffle(c.take(empty))
+        c = c.take(np.flatnonzero(self._deck_n.take(c) > 0))
+        top = self._deck_n.take(c) - 1
+        self._deck_n[c] = top
+        count = self._hand_n.take(c)
+        self._hand[count, c] = self._deck[top, c]
+        self._hand_n[c] = count + 1
+
+    # ----- 随机数（check_against_match 里的对照环境换成 Match 的点数和选择） -----
+    def _dice(self, kind, low, high, shape):
+        # 每个元素在 [low, high] 里均匀取一个整数；kind 是 "roll"（出牌的判定）、"recursion"（虚环递归）、"mentos"（第二次判定）
+        return low + (self.rng.random(shape) * (high + 1 - low)).astype(np.int64)
+
+    def _discard_slots(self, c):
+        # 弃牌环节每列随机弃掉的手牌位置
+        return (self.rng.random(len(c)) * self._hand_n.take(c)).astype(np.int64)
+
+    def _reshuffle(self, c):
+        count = self._discard_n.take(c)
+        keys = self.rng.random((self.deck_size, len(c)))
+        keys[np.arange(self.deck_size)[:, None] >= count] = 2.0
+        self._deck[:, c] = np.take_along_axis(self._discard.take(c, axis=1), np.argsort(keys, axis=0), axis=0)
+        self._deck_n[c] = count
+        self._discard_n[c] = 0
+
+    def _remove_from_hand(self, c, slot):
+        # 打出/弃掉 slot 位置的手牌，后面的牌前移，被移除的牌放进弃牌堆
+        cards = self._hand[slot, c]
+        count = self._hand_n.take(c) - 1
+        if len(c):
+            # 各局要前移的位置区间不同，中间某个位置没有局要移也不能停
+            for j in range(int(slot.min()), int(count.max())):
+                shift = np.flatnonzero((slot <= j) & (j < count))
+                cs = c.take(shift)
+                self._hand[j, cs] = self._hand[j + 1, cs]
+        self._hand[count, c] = -1
+        self._hand_n[c] = count
+        top = self._discard_n.take(c)
+        self._discard[top, c] = cards
+        self._discard_n[c] = top + 1
+        return cards
+
+    def _discard_phase(self, c):
+        limit = np.maximum(2, self._base_actions.take(c))
+        while True:
+            over = np.flatnonzero(self._hand_n.take(c) > limit)
+            if not over.size:
+                return
+            c, limit = c.take(over), limit.take(over)
+            self._remove_from_hand(c, self._discard_slots(c))
+
+    # ----- 回合流程 -----
+    def _fire_delayed(self, c, turn):
+        due_cols = np.flatnonzero(self._next_delay.take(c) <= turn)
+        if not due_cols.size:
+            return
+        c, turn = c.take(due_cols), turn.take(due_cols)
+        timers = self._delay_turn.take(c, axis=1)
+        due = (timers >= 0) & (timers <= turn)
+        delta = (DELAY_DELTA[self._delay_card.take(c, axis=1)] * due[:, :, None]).sum(axis=0)
+        for k in range(game.NUM_STATS):
+            self._stats[k, c] = np.minimum(STAT_CAPS[k], self._stats[k].take(c) + delta[:, k])
+        timers[due] = -1
+        self._delay_turn[:, c] = timers
+        self._next_delay[c] = np.where(timers >= 0, timers, _NO_DELAY).min(axis=0)
+
+    def _finish_turn(self, g):
+        # 回合结束抽牌，弃牌环节，然后轮到对方
+        c = self._current_cols(g)
+        self._draw(c)
+        self._discard_phase(c)
+        self.turn[g] += 1
+
+    def _start_turn(self, g):
+        # 结算回合开始的自动流程，直到每局都停在可以出牌的决定点
+        while g.size:
+            over = self.turn.take(g) >= self.max_turns
+            if over.any():
+                self.done[g[over]] = True
+                g = g[~over]
+            c = self._current_cols(g)
+
+            # 每回合行动力减去负数储存值，行动力不足时跳过回合
+            neg = np.flatnonzero(self._neg_actions.take(c) > 0)
+            skip_games = [g.take(neg)[:0]]
+            if neg.size:
+                cn = c.take(neg)
+                recovery = np.maximum(2, self._stats[game.STAT_HP].take(cn) // 2)
+                remaining_neg = np.maximum(0, self._neg_actions.take(cn) - recovery)
+                self._neg_actions[cn] = remaining_neg
+                neg_skip = self._base_actions.take(cn) - remaining_neg <= 0
+                if neg_skip.any():
+                    skip_games.append(g.take(neg)[neg_skip])
+                    keep = np.ones(len(g), bool)
+                    keep[neg[neg_skip]] = False
+                    g, c = g[keep], c[keep]
+
+            turn = self.turn.take(g)
+            self._fire_delayed(c, turn)
+            self._fire_delayed(c ^ 1, turn)
+
+            skipped = np.flatnonzero(self._skip.take(c))
+            if skipped.size:
+                self._skip[c.take(skipped)] = False
+                skip_games.append(g.take(skipped))
+                keep = np.ones(len(g), bool)
+                keep[skipped] = False
+                g, c = g[keep], c[keep]
+
+            base = np.maximum(2, self._stats[game.STAT_HP].take(c) // 2)
+            self._base_actions[c] = base
+            remaining = base - self._neg_actions.take(c)
+            self.actions_remaining[g] = remaining
+
+            # 没有行动力直接结束回合；没有手牌先自动抽一张再结束回合
+            no_actions = remaining <= 0
+            empty = ~no_actions & (self._hand_n.take(c) == 0)
+            self._draw(c[empty])
+
+            skip_games.append(g[no_actions | empty])
+            g = np.concatenate(skip_games)
+            self._finish_turn(g)
+
+    def step(self, actions, turtle_choices=None):
+        """执行一步，返回 (行动方奖励 +1/-1/0, done)"""
+        actions = np.asarray(actions)
+        g = np.flatnonzero(~self.done)
+        a = actions.take(g)
+        c = self._current_cols(g)
+        reward = np.zeros(self.num_games, np.int8)
+
+        surrender = a == -2
+        if surrender.any():
+            self.done[g[surrender]] = True
+            self.winner[g[surrender]] = (c[surrender] ^ 1) & 1
+            reward[g[surrender]] = -1
+
+        play = (a >= 0) & (a < self._hand_n.take(c))
+        end_turn = g[~play & ~surrender]
+        playing = np.flatnonzero(play)
+        gp, cp = g.take(playing), c.take(playing)
+        cards = self._remove_from_hand(cp, a.take(playing).astype(np.int64))
+        self._resolve(gp, cp, cards, turtle_choices)
+        self.actions_remaining[gp] -= 1
+
+        # 检查胜负：先看出牌方，再看对方
+        user_dead = np.zeros(len(gp), bool)
+        target_dead = np.zeros(len(gp), bool)
+        for k in range(game.NUM_STATS):
+            user_dead |= self._stats[k].take(cp) <= 0
+            target_dead |= self._stats[k].take(cp ^ 1) <= 0
+        target_dead &= ~user_dead
+        finished = user_dead | target_dead
+        if finished.any():
+            self.done[gp[finished]] = True
+            self.winner[gp[user_dead]] = (cp[user_dead] ^ 1) & 1
+            self.winner[gp[target_dead]] = cp[target_dead] & 1
+            reward[gp[user_dead]] = -1
+            reward[gp[target_dead]] = 1
+            gp, cp = gp[~finished], cp[~finished]
+
+        out_of_actions = self.actions_remaining.take(gp) <= 0
+        empty = ~out_of_actions & (self._hand_n.take(cp) == 0)
+        self._draw(cp[empty])
+        ending = np.concatenate([end_turn, gp[out_of_actions | empty]])
+        self._finish_turn(ending)
+        self._start_turn(ending)
+        return reward, self.done
+
+    def _resolve(self, g, c, cards, turtle_choices):
+        rng = self.rng
+        e = c ^ 1
+        sides = CARD_SIDES.take(cards)
+        low = CARD_MIN.take(cards)
+        roll = self._dice("roll", low, sides, len(c))
+        key = cards * _ROLL_SPAN + roll
+        effective = _OUTCOME_OK.take(key) | (sides == 0)
+
+        # 虚环之匣：之后的 r 次判定必须与原始骰子落在同一个子区间，否则效果无效
+        recursion = self._void_box.take(c) * (sides > 0)
+        idx = np.flatnonzero(recursion)
+        if idx.size:
+            extra = self._dice("recursion", low.take(idx)[:, None], sides.take(idx)[:, None], (len(idx), 2))
+            original = _SUBRANGE.take(key.take(idx))
+            same = (_SUBRANGE.take(cards.take(idx)[:, None] * _ROLL_SPAN + extra) == original[:, None]) | (np.arange(2) >= recursion.take(idx)[:, None])
+            effective[idx] &= (original >= 0) & same.all(axis=1)
+            self._void_box[c.take(idx)] = 0
+
+        user_delta = _USER_DELTA.take(key, axis=1) * effective
+        target_delta = _TARGET_DELTA.take(key, axis=1) * effective
+
+        hit = np.flatnonzero(effective & _SETS_SKIP.take(key))
+        self._skip[e.take(hit)] = True
+        void_value = _SETS_VOID.take(key)
+        hit = np.flatnonzero(effective & (void_value >= 0))
+        self._void_box[e.take(hit)] = void_value.take(hit)
+
+        # 曼妥思之神：两次判定分别回 SAN 和 HP，都不超过上限
+        idx = np.flatnonzero(effective & MENTOS.take(cards))
+        if idx.size:
+            roll2 = self._dice("mentos", 1, 7, len(idx))
+            for stat, amounts, dice in ((game.STAT_SAN, MENTOS_SAN, roll.take(idx)), (game.STAT_HP, MENTOS_HP, roll2)):
+                room = STAT_CAPS[stat] - (self._stats[stat].take(c.take(idx)) + user_delta[stat].take(idx))
+                user_delta[stat, idx] += np.maximum(0, np.minimum(amounts.take(dice), room))
+
+        # 300龟：对方选中的数值 -300
+        idx = np.flatnonzero(effective & _TURTLE_300.take(key))
+        if idx.size:
+            if turtle_choices is None:
+                choice = rng.integers(0, len(game.TURTLE_300_CHOICES), size=len(idx))
+            else:
+                choice = np.asarray(turtle_choices).take(g.take(idx))
+            on_actions = choice == game.NUM_STATS
+            self._neg_actions[e[idx[on_actions]]] = 300
+            target_delta[choice[~on_actions], idx[~on_actions]] -= 300
+
+        # 延迟效果：放进第一个空的计时槽，有一列没有空槽时先把槽位加倍
+        idx = np.flatnonzero(effective & (DELAY_TURNS.take(cards) > 0))
+        if idx.size:
+            ci = c.take(idx)
+            free = self._delay_turn.take(ci, axis=1) < 0
+            if not free.any(axis=0).all():
+                self._grow_delayed(2 * len(free))
+                free = self._delay_turn.take(ci, axis=1) < 0
+            slot = free.argmax(axis=0)
+            due = self.turn.take(g.take(idx)) + DELAY_TURNS.take(cards.take(idx))
+            self._delay_turn[slot, ci] = due
+            self._delay_card[slot, ci] = cards.take(idx)
+            self._next_delay[ci] = np.minimum(self._next_delay.take(ci), due)
+
+        # 立即应用修改器
+        for k in range(game.NUM_STATS):
+            self._stats[k, c] = np.minimum(STAT_CAPS[k], self._stats[k].take(c) + user_delta[k])
+            self._stats[k, e] = np.minimum(STAT_CAPS[k], self._stats[k].take(e) + target_delta[k])
+
+# ====== 吞吐量对比 ======
+def benchmark(num_games=10000, python_games=1000, deck_size=game.DEFAULT_DECK_SIZE, seed=0):
+    """用随机策略跑完整局，对比向量化环境与逐局推进 Python Player 对象的吞吐量"""
+    start = time.perf_counter()
+    env = VecCardGameEnv(num_games, deck_size=deck_size, seed=seed)
+    steps = 0
+    while not env.done.all():
+        env.step(env.random_actions())
+        steps += 1
+    vec_elapsed = time.perf_counter() - start
+    vec_rate = num_games / vec_elapsed
+
+    random.seed(seed)
+    start = time.perf_counter()
+    python_turns = 0
+    for _ in range(python_games):
+        python_turns += game.simulate_match(deck_size=deck_size)[1]
+    py_elapsed = time.perf_counter() - start
+    py_rate = python_games / py_elapsed
+
+    print(f"向量化环境: {num_games} 局 / {vec_elapsed:.2f}s = {vec_rate:.0f} 局/秒（{steps} 步，平均 {env.turn.mean():.1f} 回合）")
+    print(f"Python 对局: {python_games} 局 / {py_elapsed:.2f}s = {py_rate:.0f} 局/秒（平均 {python_turns / python_games:.1f} 回合）")
+    print(f"加速比: {vec_rate / py_rate:.1f}x")
+    return vec_rate, py_rate
+
+# ====== 与 Match 逐局对照 ======
+# 效果表是在哑玩家身上测出来的，回合流程是照着 Match 重写的，两边可能悄悄走岔，只比胜率和局长看不出来。
+# check_against_match 从带种子的 Match 载入一局（load），双方走同样的动作，每一步之后比较两边的完整状态：
+#   点数    由一个带种子的随机数强制给定，两边用同样的值；四分之一取区间两端，300龟的300、虚环之匣的5也会经常出现
+#   洗牌    向量化环境洗出来的顺序交给 Match 照做（_ForcedSeat.reshuffle）
+#   弃牌    向量化环境随机弃的位置交给 Match 当作弃牌决定
+# 第一处不同报告成 Divergence。
+Divergence = namedtuple("Divergence", "seed step field match vec")  # 种子、第几步、哪一项、Match 的值、向量化环境的值
+
+class _ForcedSeat:
+    # Match 一方的事件钩子：掷骰换成给定的点数，洗牌换成向量化环境洗好的顺序，其余事件不用
+    def __init__(self):
+        self.rolls = []   # 这一步还没用掉的点数，按掷骰顺序
+        self.orders = []  # 向量化环境洗好的牌库（Match 的顺序，先摸的在前）
+
+    def roll(self, sides, value):
+        return self.rolls.pop(0) if self.rolls else value
+
+    def reshuffle(self, deck):
+        # 向量化环境没有洗牌时保留 Match 自己的顺序，交给状态比较报告
+        if self.orders:
+            deck[:] = array(deck.typecode, self.orders.pop(0))
+
+    def draw(self, card_id):
+        pass
+
+    def play(self, card_id):
+        pass
+
+    def discard(self, card_id):
+        pass
+
+    def commit(self, stat, value):
+        pass
+
+    def turtle(self, choice):
+        pass
+
+    def delayed(self, effect):
+        pass
+
+class _ScriptedVecEnv(VecCardGameEnv):
+    # 只有一局的对照环境：点数取自 script（[判定, 虚环递归..., 曼妥思第二次判定]），记下每次洗牌和弃牌
+    script = ()
+    recursion = 0
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        self.reshuffles = ([], [])
+        self.discards = ([], [])
+
+    def _dice(self, kind, low, high, shape):
+        script, r = list(self.script), self.recursion
+        if kind == "roll":
+            values = script[:1] or [0]
+        elif kind == "recursion":
+            values = (script[1:1 + r] + [int(np.min(low))] * 2)[:2]
+        else:
+            values = script[1 + r:2 + r] or [1]
+        return np.array(values, np.int64)[:int(np.prod(shape))].reshape(shape)
+
+    def _discard_slots(self, c):
+        slots = super()._discard_slots(c)
+        for col, slot in zip(c.tolist(), slots.tolist()):
+            self.discards[col & 1].append(slot)
+        return slots
+
+    def _reshuffle(self, c):
+        super()._reshuffle(c)
+        for col in c.tolist():
+            self.reshuffles[col & 1].append(self._deck[:self._deck_n[col], col][::-1].tolist())
+
+def _match_state(match):
+    state = {"done": match.done, "turn": match.turn, "winner": -1 if match.winner is None else match.winner}
+    if not match.done:
+        state["actions_remaining"] = match.actions_remaining
+    for seat, player in enumerate(match.players):
+        state.update({
+            f"{seat}.stats": player.stat_values.tolist(),
+            f"{seat}.neg_actions": player._negative_action_points,
+            f"{seat}.base_actions": player._base_actions,
+            f"{seat}.skip": bool(getattr(player, "_skip_next_turn", False)),
+            f"{seat}.void_box": getattr(player, "_void_box_recursion", 0),
+            f"{seat}.hand": player.hand.tolist(),
+            f"{seat}.deck": player.deck.tolist(),
+            f"{seat}.discard": player.discard.tolist(),
+            f"{seat}.delayed": sorted(when for when, _ in player._delayed_effects),
+        })
+    return state
+
+def _vec_state(env, g=0):
+    done = bool(env.done[g])
+    state = {"done": done, "turn": int(env.turn[g]), "winner": int(env.winner[g])}
+    if not done:
+        state["actions_remaining"] = int(env.actions_remaining[g])
+    for seat in range(2):
+        timers = env.delay_turn[:, g, seat]
+        state.update({
+            f"{seat}.stats": env.stats[:, g, seat].tolist(),
+            f"{seat}.neg_actions": int(env.neg_actions[g, seat]),
+            f"{seat}.base_actions": int(env.base_actions[g, seat]),
+            f"{seat}.skip": bool(env.skip[g, seat]),
+            f"{seat}.void_box": int(env.void_box[g, seat]),
+            f"{seat}.hand": env.hand[:env.hand_n[g, seat], g, seat].tolist(),
+            f"{seat}.deck": env.deck[:env.deck_n[g, seat], g, seat][::-1].tolist(),
+            f"{seat}.discard": env.discard[:env.discard_n[g, seat], g, seat].tolist(),
+            f"{seat}.delayed": sorted(timers[timers >= 0].tolist()),
+        })
+    return state
+
+def _first_difference(match, env):
+    # (哪一项, Match 的值, 向量化环境的值)；完全一致时返回 None
+    expected, actual = _match_state(match), _vec_state(env)
+    for field, value in expected.items():
+        if actual.get(field) != value:
+            return field, value, actual.get(field)
+    return None
+
+def _forced_roll(chooser, low, high):
+    if chooser.random() < 0.25:
+        return chooser.choice((low, high))
+    return chooser.randint(low, high)
+
+def compare_with_match(match, seed=0, max_steps=1000):
+    """让向量化环境和 match（停在出牌决定点）走同样的动作，第一处状态不同时返回 Divergence，否则返回 None"""
+    chooser = random.Random(seed)
+    seats = (_ForcedSeat(), _ForcedSeat())
+    for player, seat in zip(match.players, seats):
+        player._events = seat
+    env = _ScriptedVecEnv(1, deck_size=max(len(player.deck) + len(player.hand) + len(player.discard)
+                                           for player in match.players),
+                          max_turns=match.max_turns if match.max_turns is not None else 1 << 30, seed=seed)
+    env.load([match])
+    for step in range(max_steps):
+        if match.done:
+            break
+        current, seat = match.current, match.current_index
+        # 九成出一张随机的手牌，一成结束回合
+        action = chooser.randrange(len(current.hand)) if chooser.random() < 0.9 else game.ACTION_END_TURN
+        rolls = []
+        env.recursion = 0
+        if action != game.ACTION_END_TURN:
+            card = game.card_of(current.hand[action])
+            if card.dice_sides:
+                env.recursion = getattr(current, "_void_box_recursion", 0)
+                rolls = [_forced_roll(chooser, card.min_value, card.dice_sides) for _ in range(1 + env.recursion)]
+                rolls.append(_forced_roll(chooser, 1, 7))
+        env.script = seats[seat].rolls = list(rolls)
+        for orders in env.reshuffles:
+            orders.clear()
+        turtle = chooser.randrange(len(game.TURTLE_300_CHOICES))
+        env.step(np.array([-1 if action == game.ACTION_END_TURN else action]), turtle_choices=np.array([turtle]))
+        for forced, orders in zip(seats, env.reshuffles):
+            forced.orders = list(orders)
+        with game.headless_mode():
+            match.step(action)
+            if match.phase == game.PHASE_TURTLE_300:
+                match.step(game.ACTION_TURTLE_BASE + turtle)
+            while match.phase == game.PHASE_DISCARD:
+                queue = env.discards[match.current_index]
+                if not queue:
+                    return Divergence(seed, step, "discard", len(match.current.hand), "（没有弃牌）")
+                match.step(queue.pop(0))
+        difference = _first_difference(match, env)
+        if difference is not None:
+            return Divergence(seed, step, *difference)
+    return None
+
+def check_against_match(seeds=range(200), deck_size=30, max_turns=200):
+    """对每个种子建一局 Match 和向量化环境逐步对照（见 compare_with_match），返回 [Divergence...]"""
+    found = []
+    for seed in seeds:
+        with game.headless_mode():
+            match = game.Match(deck_size=deck_size, max_turns=max_turns, seed=seed)
+        if match.done:
+            continue
+        divergence = compare_with_match(match, seed)
+        if divergence is not None:
+            found.append(divergence)
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="向量化环境的吞吐量对比，或者和 Match 逐局对照")
+    parser.add_argument("--check", type=int, metavar="N", help="用 N 个种子和 Match 逐步对照，有不一致时以非零状态退出")
+    parser.add_argument("--deck-size", type=int, default=game.DEFAULT_DECK_SIZE)
+    args = parser.parse_args()
+    if args.check:
+        divergences = check_against_match(range(args.check), args.deck_size)
+        print(f"对照 {args.check} 局，不一致 {len(divergences)} 局")
+        for item in divergences[:10]:
+            print(f"  种子 {item.seed} 第 {item.step} 步 {item.field}：Match {item.match}，向量化环境 {item.vec}")
+        raise SystemExit(1 if divergences else 0)
+    benchmark(deck_size=args.deck_size)
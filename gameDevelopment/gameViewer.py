@@ -0,0 +1,129 @@
+
+import argparse
+import sys
+import time
+from bisect import bisect_right
+
+import gameLog
+import gameReplay
+import gameV1_3_2 as game
+
+# ====== 回放查看器 ======
+# 查看对局日志（见 gameLog）里的一局：跳到任意回合，或者一步（一个决定）一步往前走，
+# 每一步列出这一步产生的事件、双方状态和上一张牌的结算结果。
+# 跳转时从不超过目标回合的最近一个关键帧恢复出对局，只重放它之后的决定（gameReplay.Replay），
+# 代价和到关键帧的距离成正比（不超过日志的关键帧间隔），与对局本身有多长无关：
+# 300龟连锁、负行动力拖出来的几百回合长局，跳到最后几回合和跳到开头一样快。往回走也是一次跳转。
+
+PHASE_LABELS = {game.PHASE_PLAY: "出牌", game.PHASE_DISCARD: "弃牌", game.PHASE_TURTLE_300: "300龟选择",
+                game.PHASE_OVER: "已结束"}
+
+class MatchViewer:
+    """日志里一局的查看器；replay 是当前位置的回放（gameReplay.Replay），replay.match 是当前局面"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.start = gameLog.parse_start(payload)[0]
+        # 关键帧索引：打开时扫一遍事件，记下每个关键帧的回合和位置（按回合排序）
+        self.keyframes = [(gameLog.keyframe_turn(event.values[0]), event.offset)
+                          for event in gameLog.iter_events(payload) if event.kind == gameLog.EV_KEYFRAME]
+        self._keyframe_turns = [turn for turn, _ in self.keyframes]
+        self.replay = None
+        self.seek(0)
+
+    @property
+    def match(self):
+        return self.replay.match
+
+    def seek(self, turn):
+        """跳到第 turn 回合的第一个决定（对局在那之前结束时停在结尾），返回这一步产生的事件（从关键帧开始时为空）"""
+        index = bisect_right(self._keyframe_turns, turn) - 1
+        if index >= 0:
+            self.replay = gameReplay.Replay(self.payload, self.keyframes[index][1])
+        else:
+            self.replay = gameReplay.Replay(self.payload)
+        mark = len(self.replay.recorder.buffer)
+        with game.headless_mode():
+            while self.replay.match.turn < turn and self.replay.step():
+                pass
+        return self._events_since(mark)
+
+    def step(self):
+        """往前走一个决定，返回这一步产生的事件（[Event...]）；已经到结尾时返回 []"""
+        mark = len(self.replay.recorder.buffer)
+        with game.headless_mode():
+            self.replay.step()
+        return self._events_since(mark)
+
+    def _events_since(self, mark):
+        buffer = self.replay.recorder.buffer
+        events = []
+        pos = mark if self.replay.origin or mark else gameLog.parse_start(buffer)[1]
+        while pos < len(buffer):
+            event, pos = gameLog.read_event(buffer, pos)
+            events.append(event)
+        return events
+
+    def describe(self):
+        """当前局面的文字说明"""
+        match = self.match
+        if match.done:
+            winner = "平局" if match.winner is None else f"{match.players[match.winner].name} 获胜"
+            lines = [f"对局结束：{winner}（{match.turn} 回合）"]
+        else:
+            lines = [f"第 {match.turn} 回合  {match.current.name}  {PHASE_LABELS[match.phase]}"
+                     f"（还剩 {match.actions_remaining} 次行动）"]
+        lines.extend(player.status() for player in match.players)
+        if match.last_result:
+            lines.append(f"上一张牌：{match.last_result}")
+        if not self.replay.ok:
+            mismatch = self.replay.mismatch()
+            if mismatch is not None:
+                lines.append(f"回放和日志对不上（字节 {mismatch.offset}）：日志 {mismatch.expected}，回放 {mismatch.actual}")
+        return "\n".join(lines)
+
+def _print_events(events):
+    for event in events:
+        if event.kind != gameLog.EV_KEYFRAME:
+            print(f"  {gameLog.describe(event)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看对局日志里的一局：跳到任意回合、逐步前进")
+    parser.add_argument("path")
+    parser.add_argument("index", type=int, nargs="?", default=0, help="第几局（从 0 开始）")
+    parser.add_argument("--turn", type=int, default=0, help="从第几回合开始看")
+    parser.add_argument("--print", action="store_true", help="只打印这一回合的局面，不进入交互")
+    args = parser.parse_args()
+    for number, (_, record) in enumerate(gameLog.LogReader(args.path)):
+        if number == args.index:
+            break
+    else:
+        sys.exit(f"日志里没有第 {args.index} 局")
+    viewer = MatchViewer(record)
+    print(f"种子 {viewer.start.seed}，关键帧 {len(viewer.keyframes)} 个（每 {viewer.start.keyframe_turns} 回合）")
+    begin = time.perf_counter()
+    viewer.seek(args.turn)
+    print(f"跳到第 {args.turn} 回合用了 {(time.perf_counter() - begin) * 1e3:.2f} ms")
+    print(viewer.describe())
+    if args.print:
+        sys.exit(0)
+    print("回车：下一步  t N：跳到第 N 回合  b：上一回合  q：退出")
+    while True:
+        try:
+            command = input("> ").strip()
+        except EOFError:
+            break
+        if command == "q":
+            break
+        if command.startswith("t") or command == "b":
+            try:
+                target = max(0, viewer.match.turn - 1) if command == "b" else int(command[1:])
+            except ValueError:
+                print("用法：t 回合数")
+                continue
+            begin = time.perf_counter()
+            viewer.seek(target)
+            print(f"跳到第 {target} 回合用了 {(time.perf_counter() - begin) * 1e3:.2f} ms")
+        else:
+            _print_events(viewer.step())
+        print(viewer.describe())
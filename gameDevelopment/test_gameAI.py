@@ -0,0 +1,76 @@
+import builtins
+import random
+
+import pytest
+
+import gameV1_3_2 as game
+import gameAI
+import gameTablebase as tb
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tablebase") / "c4.cgtb"
+    return tb.Tablebase(tb.generate(str(path), stat_cap=4, processes=1))
+
+class _Counting:
+    # 记下调用次数的叶子估值
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.calls = 0
+
+    def __call__(self, match, seat):
+        self.calls += 1
+        return self.fallback(match, seat)
+
+def _opening(seed=3):
+    with game.headless_mode():
+        return game.Match(deck_size=12, seed=seed)
+
+@pytest.mark.parametrize("make", [
+    lambda evaluator: gameAI.MCTSBot(time_budget=10.0, max_iterations=50, evaluator=evaluator),
+    lambda evaluator: gameAI.ISMCTSBot(time_budget=10.0, max_iterations=50, evaluator=evaluator),
+    lambda evaluator: gameAI.ExpectiminimaxBot(depth=2, evaluator=evaluator),
+])
+def test_bots_use_the_given_evaluator(make):
+    evaluator = _Counting(gameAI.evaluate)
+    match = _opening()
+    assert make(evaluator).choose_action(match) in match.legal_actions()
+    assert evaluator.calls > 0
+
+@pytest.mark.parametrize("make", [
+    lambda: gameAI.ExpectiminimaxBot(depth=3),
+    lambda: gameAI.AnytimeBot(time_budget=10.0, max_depth=3),
+])
+def test_expectiminimax_leaves_global_random_alone(make, monkeypatch):
+    # 搜索只用 bot 自己的随机数：不重设、不回退全局随机状态，结果也不受全局状态影响
+    match = _opening()
+    expected = make().choose_action(match)
+
+    def forbidden(*args):
+        raise AssertionError("搜索改动了全局随机状态")
+
+    random.seed(12345)
+    state = random.getstate()
+    monkeypatch.setattr(random, "seed", forbidden)
+    monkeypatch.setattr(random, "setstate", forbidden)
+    bot = make()
+    assert bot.choose_action(match) == expected
+    assert bot.nodes > 1
+    assert random.getstate() == state
+
+def test_tablebase_evaluator_falls_back_outside_the_table(tablebase):
+    evaluator = gameAI.tablebase_evaluator(tablebase, fallback=lambda match, seat: -1.0)
+    match = _opening()
+    # 默认属性超过 stat_cap=4，不在表里
+    assert evaluator(match, 0) == -1.0
+    for player in match.players:
+        for stat in range(game.NUM_STATS):
+            player._set_stat(stat, 3)
+    assert evaluator(match, 0) == tablebase.evaluate(match, 0)
+    assert 0.0 <= evaluator(match, 0) <= 1.0
+
+def test_play_vs_bot_shows_tablebase_win_probability(tablebase, monkeypatch, capsys):
+    monkeypatch.setattr(builtins, "input", lambda text="": "q")
+    gameAI.play_vs_bot(gameAI.MCTSBot(time_budget=10.0, max_iterations=10), deck_size=12, ponder=False,
+                       tablebase=tablebase)
+    assert "胜率（残局库）" in capsys.readouterr().out
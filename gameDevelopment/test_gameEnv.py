@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+
+import gameV1_3_2 as game
+import gameEnv
+
+def _move(env):
+    # 与 random_episode 一样，从环境自己的 rng 里选一个随机合法动作
+    legal = np.flatnonzero(env.legal_action_mask())
+    if env.match.phase == game.PHASE_PLAY:
+        legal = legal[legal < game.ACTION_END_TURN]
+    return env.step(env.rng.choice(legal))
+
+def test_reset_leaves_global_random_alone():
+    random.seed(99)
+    state = random.getstate()
+    env = gameEnv.CardGameEnv()
+    env.reset(5)
+    gameEnv.random_episode(env, 6)
+    assert random.getstate() == state
+
+def test_seeded_envs_do_not_disturb_each_other():
+    expected = [gameEnv.random_episode(gameEnv.CardGameEnv(deck_size=30), seed) for seed in (1, 2)]
+    # 两个环境交替推进，中间再消耗全局随机数，各自的结果和单独跑时相同
+    envs = [gameEnv.CardGameEnv(deck_size=30) for _ in range(2)]
+    for env, seed in zip(envs, (1, 2)):
+        env.reset(seed)
+    results = [None, None]
+    steps = [0, 0]
+    while None in results:
+        for index, env in enumerate(envs):
+            if results[index] is None:
+                random.random()
+                _, _, done, info = _move(env)
+                steps[index] += 1
+                if done:
+                    results[index] = (info["winner"], steps[index])
+    assert results == expected
@@ -0,0 +1,93 @@
+import random
+
+import gameV1_3_2 as game
+import gameHistory
+import gameLog
+
+def _reference(payload):
+    # 逐个 read_event 的参考实现：{(座位, 卡牌): 打出次数}, {(卡牌, 点数)}
+    plays, rolls = {}, set()
+    card = None
+    for event in gameLog.iter_events(payload):
+        if event.kind == gameLog.EV_PLAY:
+            card = event.values[0]
+            key = (event.seat, card)
+            plays[key] = plays.get(key, 0) + 1
+        elif event.kind in (gameLog.EV_TURN, gameLog.EV_ACTION, gameLog.EV_DELAYED):
+            card = None
+        elif event.kind == gameLog.EV_ROLL and card is not None:
+            rolls.add((card, event.values[1]))
+    return plays, rolls
+
+def _crafted():
+    # 座位 0 打出 300龟 骰出 300 后获胜，座位 1 带着 2 层虚环递归输掉
+    turtle, void = gameHistory.card_id("300龟"), gameHistory.card_id("虚环之匣")
+    buf = bytearray()
+    for value in (1700000000, 42, 30, 0, 0, gameLog.KEYFRAME_TURNS):
+        gameLog._put(buf, value)
+    seats = (gameLog._SeatEvents(buf, 0), gameLog._SeatEvents(buf, 1))
+    seats[0].roll(6, 5)  # 决定先手，不属于任何一张牌
+    seats[1].roll(6, 2)
+    buf.append(gameLog.EV_TURN << 1 | 1)
+    gameLog._put(buf, 0)
+    buf.extend((gameLog.EV_ACTION << 1 | 1, 0))
+    seats[1].play(void)
+    buf.append(gameLog.EV_TURN << 1)
+    gameLog._put(buf, 1)
+    buf.extend((gameLog.EV_ACTION << 1, 0))
+    seats[0].play(turtle)
+    seats[0].roll(300, 300)
+    buf.extend((gameLog.EV_TURTLE << 1, 0))
+    seats[1].commit(game.STAT_HP, -290)
+    buf.append(gameLog.EV_RESULT << 1)
+    for value in (1, 2):  # 座位 0 获胜，2 回合
+        gameLog._put(buf, value)
+    for recursion, stats in ((0, (10, 10, 10)), (2, (-290, 10, 10))):
+        for value in (0, recursion, 0):
+            gameLog._put(buf, value)
+        for value in stats:
+            gameLog._put_signed(buf, value)
+    return bytes(buf)
+
+def test_summarize_matches_read_event_reference(tmp_path):
+    path = str(tmp_path / "matches.cgel")
+    random.seed(3)
+    gameLog.record_matches(path, 200, deck_size=30)
+    cards, rolled = {}, {}
+    for _, payload in gameLog.LogReader(path):
+        plays, rolls = _reference(payload)
+        summary = gameHistory.summarize(payload)
+        assert summary[2] == plays
+        assert summary[3] == rolls
+        for card in {card for _, card in plays}:
+            cards[card] = cards.get(card, 0) + 1
+        for key in rolls:
+            rolled[key] = rolled.get(key, 0) + 1
+    with gameHistory.MatchHistory(str(tmp_path / "history.db")) as history:
+        assert history.add_log(path) == 200
+        for card in range(len(game.CARD_REGISTRY)):
+            assert history.matches_with_card(card)[0] == cards.get(card, 0)
+        assert dict(((card, value), count) for card, value, count
+                    in history.query("SELECT card_id, value, matches FROM roll_counts")) == rolled
+        for (card, value), count in list(rolled.items())[:20]:
+            assert history.matches_with_roll(card, value, limit=1000)[0] == count
+            assert len(history.matches_with_roll(card, value, limit=1000)[1]) == count
+        assert history.add_log(path) == 0
+        assert history.stats()["matches"] == 200
+
+def test_rare_events_on_a_crafted_record(tmp_path):
+    path = str(tmp_path / "crafted.cgel")
+    payload = _crafted()
+    assert gameHistory.summarize(payload)[2:] == _reference(payload)
+    with gameLog.MatchLog(path) as log:
+        log.append(payload)
+    with gameHistory.MatchHistory(str(tmp_path / "history.db")) as history:
+        assert history.add_log(path) == 1
+        assert history.matches_with_roll("300龟", 300) == (1, [1])
+        assert history.matches_with_roll("300龟", 299) == (0, [])
+        assert history.lookup(card="虚环之匣") == {"count": 1, "matches": [1]}
+        assert history.matches_lost_with_void(2) == (1, [1])
+        assert history.matches_lost_with_void(1) == (0, [])
+        # 决定先手的掷骰不属于任何一张牌
+        assert history.query("SELECT COUNT(*) FROM rolls")[0][0] == 1
+        assert history.add_log(path) == 0
@@ -0,0 +1,76 @@
+import gameV1_3_2 as game
+import gameLog as log
+
+VALUES = (0, 1, 127, 128, 300, 16383, 16384, 2 ** 40)
+
+def test_varint_round_trip():
+    buf = bytearray()
+    for value in VALUES:
+        log._put(buf, value)
+    signed = (0, 1, -1, 63, -64, 64, 127, -128, 128, 300, -300, -(2 ** 40))
+    for value in signed:
+        log._put_signed(buf, value)
+    pos = 0
+    for value in VALUES:
+        decoded, pos = log._get(buf, pos)
+        assert decoded == value
+    for value in signed:
+        decoded, pos = log._get(buf, pos)
+        assert log._unzigzag(decoded) == value
+    assert pos == len(buf)
+    # 小于 128 只占一个字节，128 开始占两个
+    for value, size in ((127, 1), (128, 2), (300, 2), (16384, 3)):
+        buf = bytearray()
+        log._put(buf, value)
+        assert len(buf) == size
+
+def test_seat_event_fast_paths_decode():
+    # 小于 128 直接写字节、commit 直接写 value << 1 的写法，与按 SPECS 解码的结果一致
+    buf = bytearray()
+    seat = log._SeatEvents(buf, 1)
+    expected = []
+    for card_id in (0, 127, 128, 200):
+        seat.draw(card_id)
+        expected.append((log.EV_DRAW, (card_id,)))
+    for sides, value in ((6, 6), (127, 127), (128, 1), (300, 300)):
+        assert seat.roll(sides, value) == value
+        expected.append((log.EV_ROLL, (sides, value)))
+    for stat, value in ((0, 0), (1, 63), (2, 64), (0, -1), (1, -300)):
+        seat.commit(stat, value)
+        expected.append((log.EV_COMMIT, (stat, value)))
+    seat.reshuffle([3, 1, 2])
+    expected.append((log.EV_RESHUFFLE, (3, 1, 2)))
+    events = list(log.iter_events(buf, 0))
+    assert [(event.kind, event.values) for event in events] == expected
+    assert all(event.seat == 1 for event in events)
+
+def test_keyframe_round_trip():
+    with game.headless_mode():
+        match = game.Match(deck_size=30, seed=5, max_turns=200)
+        for _ in range(40):
+            if match.done:
+                break
+            match.step(game.random_policy(match))
+    current, enemy = match.current, match.enemy
+    current._next_roll_value = 7
+    current._void_box_recursion = 2
+    enemy._next_roll_value = -3
+    enemy._skip_next_turn = True
+    enemy._delayed_effects = [(match.turn + 2, game.chicken_machine_payoff)]
+    for player in match.players:
+        player._rehash()
+    data = log.encode_keyframe(match)
+    assert log.keyframe_turn(data) == match.turn
+    restored = log.decode_keyframe(data)
+    assert restored.snapshot() == match.snapshot()
+    assert restored.zobrist_key() == match.zobrist_key()
+
+def test_truncated_trailing_record_is_skipped(tmp_path):
+    path = str(tmp_path / "matches.cgel")
+    assert log.record_matches(path, 3, deck_size=12) == 3
+    complete = [offset for offset, _ in log.LogReader(path)]
+    assert len(complete) == 3
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 5)
+    reader = log.LogReader(path)
+    assert [offset for offset, _, _ in reader.records()] == complete[:2]
@@ -0,0 +1,48 @@
+import random
+
+import gameV1_3_2 as game
+import gameLog
+import gameReplay
+
+def _recorded(seed=7, deck_size=30):
+    # 无头跑一局并返回它的日志记录
+    recorder = gameLog.MatchRecorder()
+    random.seed(seed)
+    game.simulate_match(deck_size, game.random_policy, 500, events=recorder)
+    assert recorder.finished
+    return bytes(recorder.buffer)
+
+def test_clean_replay(tmp_path):
+    assert gameReplay.replay_match(_recorded()) is None
+    path = str(tmp_path / "matches.cgel")
+    random.seed(1)
+    gameLog.record_matches(path, 20, deck_size=12)
+    assert gameReplay.replay_log(path) == (20, [])
+
+def test_corrupted_byte_is_reported_at_its_offset():
+    payload = _recorded()
+    # 改掉第一次回合内摸牌的卡牌编号：这个字节回放时不读，只能靠逐字节比较发现
+    events = list(gameLog.iter_events(payload))
+    first_turn = next(event.offset for event in events if event.kind == gameLog.EV_TURN)
+    draw = next(event for event in events if event.kind == gameLog.EV_DRAW and event.offset > first_turn)
+    offset = draw.offset + 1
+    corrupted = bytearray(payload)
+    corrupted[offset] = (payload[offset] + 1) % len(game.CARD_REGISTRY)
+    mismatch = gameReplay.replay_match(bytes(corrupted), index=3)
+    assert mismatch is not None
+    assert mismatch.index == 3
+    assert mismatch.offset == offset
+    assert "draw" in mismatch.expected and "draw" in mismatch.actual
+    assert mismatch.expected != mismatch.actual
+
+def test_engine_error_is_reported(monkeypatch):
+    payload = _recorded()
+
+    def broken(self, user, target):
+        raise RuntimeError("卡牌结算出错")
+
+    monkeypatch.setattr(game.Card, "play", broken)
+    replay = gameReplay.Replay(payload)
+    assert not replay.run()
+    assert replay.error == "RuntimeError: 卡牌结算出错"
+    assert gameReplay.replay_match(payload).actual == replay.error
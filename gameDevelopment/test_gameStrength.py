@@ -0,0 +1,16 @@
+import pytest
+
+import gameStrength as strength
+
+def test_same_seeds_give_same_result():
+    first = strength.measure_strength("mcts", "random", pairs=2, iterations=30, processes=1)
+    second = strength.measure_strength("mcts", "random", pairs=2, iterations=30, processes=1)
+    assert first == second
+    assert first.games == 4
+    assert first.low <= first.score <= first.high
+
+def test_wilson_interval():
+    low, high = strength.wilson_interval(25, 40)
+    assert low == pytest.approx(0.4703, abs=1e-4)
+    assert high == pytest.approx(0.7578, abs=1e-4)
+    assert strength.wilson_interval(0, 10)[0] == 0.0
@@ -0,0 +1,72 @@
+import os
+import random
+import sys
+import threading
+from fractions import Fraction
+
+import pytest
+
+import gameV1_3_2 as game
+import gameTablebase as tb
+
+def test_card_outcomes_are_distributions():
+    for card in game.playable_prototypes():
+        assert sum(tb.card_outcomes(card).values()) == Fraction(1), card.name
+
+def test_enumeration_leaves_other_threads_dice_alone():
+    # 枚举期间其他线程照常掷骰，不会碰到脚本骰子或中断异常
+    errors = []
+    stop = threading.Event()
+
+    def roller():
+        try:
+            while not stop.is_set():
+                assert 1 <= random.randint(1, 6) <= 6
+        except BaseException as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=roller)
+    thread.start()
+    try:
+        for card in game.playable_prototypes():
+            tb.card_outcomes(card)
+    finally:
+        stop.set()
+        thread.join()
+    assert errors == []
+
+def test_card_model_is_cached():
+    assert tb.card_model(12) is tb.card_model(12)
+
+def _table_states(tablebase):
+    # 属性都在表内的几个局面
+    with game.headless_mode():
+        match = game.Match(deck_size=12, seed=4)
+    for hp in range(1, tablebase.stat_cap + 1):
+        for player in match.players:
+            for stat in range(game.NUM_STATS):
+                player._set_stat(stat, min(tablebase.stat_cap, hp + stat))
+        match.players[1]._set_stat(game.STAT_HP, tablebase.stat_cap + 1 - hp)
+        yield match
+
+def test_big_endian_hosts_read_the_little_endian_table(tmp_path, monkeypatch):
+    path = tb.generate(str(tmp_path / "c4.cgtb"), stat_cap=4, processes=1)
+    native = tb.Tablebase(path)
+    monkeypatch.setattr(sys, "byteorder", "big")
+    swapped = tb.Tablebase(path)
+    pairs = [(native.probability(match), swapped.probability(match)) for match in _table_states(native)]
+    assert None not in pairs[0]
+    assert len({value for value, _ in pairs}) > 1
+    assert all(value == other for value, other in pairs)
+
+@pytest.mark.parametrize("stage", ["_open_work", "_solve_slice"])
+def test_failed_generation_keeps_its_error_and_cleans_up(stage, tmp_path, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("求解出错")
+
+    monkeypatch.setattr(tb, stage, broken)
+    path = str(tmp_path / "c4.cgtb")
+    with pytest.raises(RuntimeError, match="求解出错"):
+        tb.generate(path, stat_cap=4, processes=1)
+    assert not os.path.exists(path + ".work")
+    assert tb._work == {}
@@ -0,0 +1,152 @@
+
+import random
+
+import gameV1_3_2 as game
+
+# ====== Zobrist 键 ======
+def _new_match(seed=7):
+    with game.headless_mode():
+        match = game.Match(seed=seed)
+    return match
+
+def test_hand_order_does_not_change_key():
+    match = _new_match()
+    other = match.clone()
+    other.current._own_piles()
+    other.current.hand.reverse()
+    assert list(other.current.hand) != list(match.current.hand)
+    assert other.zobrist_key() == match.zobrist_key()
+    assert other.zobrist_key(observer=0) == match.zobrist_key(observer=0)
+
+def test_same_turn_delayed_effects_do_not_cancel():
+    match = _new_match()
+    player = match.current
+    due = match.turn + 4
+    keys = []
+    for count in range(3):
+        player._delayed_effects = [(due, game.chicken_machine_payoff)] * count
+        keys.append(match.zobrist_key())
+    assert len(set(keys)) == 3
+
+def test_preset_roll_value_is_hashed():
+    match = _new_match()
+    player = match.current
+    keys = {match.zobrist_key()}
+    for value in (3, 4):
+        player._next_roll_value = value
+        keys.add(match.zobrist_key())
+    assert len(keys) == 3
+
+# ====== 快照与写时复制 ======
+def _piles(match):
+    return [(list(player.deck), list(player.hand), list(player.discard)) for player in match.players]
+
+def test_clone_mutations_do_not_reach_the_original():
+    match = _new_match(3)
+    with game.headless_mode():
+        for _ in range(6):
+            match.step(game.random_policy(match))
+    snap = match.snapshot()
+    piles, key = _piles(match), match.zobrist_key()
+    clone = match.clone()
+    player, enemy = clone.current, clone.enemy
+    with game.headless_mode():
+        player.play_card(0, enemy)
+        player.discard_card(0)
+        # 摸空牌库，弃牌堆洗回牌库
+        player.draw(len(player.deck) + 1)
+        assert len(player.discard) == 0 and player.deck != match.current.deck
+        for _ in range(10):
+            if clone.done:
+                break
+            clone.step(game.random_policy(clone))
+    assert _piles(match) == piles
+    assert match.zobrist_key() == key
+    assert match.snapshot() == snap
+    clone.restore(snap)
+    assert clone.snapshot() == snap
+    assert clone.zobrist_key() == key
+    # 原对局改动之后，快照仍然可以恢复出原来的局面
+    with game.headless_mode():
+        match.current.draw(2)
+        match.step(game.random_policy(match))
+    assert _piles(match) != piles
+    restored = game.Match.from_snapshot(snap)
+    assert _piles(restored) == piles
+    assert restored.zobrist_key() == key
+
+# ====== 属性向量与归零计数 ======
+def _depleted(player):
+    # 逐条比较的参考实现
+    return sum(value + modifier <= 0 for value, modifier in zip(player.stat_values, player.stat_modifiers))
+
+def test_depleted_stats_follow_zero_crossings():
+    player = game.Player("p", [])
+    hp, san = game.STAT_HP, game.STAT_SAN
+    assert player._depleted_stats == 0 and not player.is_dead()
+    # 修改器让属性归零，再恢复回正数
+    player.add_modifier(hp, -player.hp)
+    assert player._depleted_stats == 1 and player.is_dead()
+    player.add_modifier(san, -20)
+    assert player._depleted_stats == 2
+    player.add_modifier(hp, 3)
+    assert player._depleted_stats == 1
+    # 结算修改器不改变归零条数，之后的恢复再把它拉回正数
+    with game.headless_mode():
+        player.apply_modifiers()
+    assert player.stat_values[san] == -10 and player._depleted_stats == 1
+    player.add_modifier(san, 15)
+    with game.headless_mode():
+        player.apply_modifiers()
+    assert player.stat_values[san] == 5 and player._depleted_stats == 0 and not player.is_dead()
+    player._set_stat(hp, 0)
+    assert player._depleted_stats == 1
+    player._set_stat(hp, 4)
+    assert player._depleted_stats == 0
+
+def test_depleted_stats_match_a_full_scan():
+    rng = random.Random(5)
+    player = game.Player("p", [])
+    with game.headless_mode():
+        for _ in range(2000):
+            index = rng.randrange(game.NUM_STATS)
+            op = rng.randrange(3)
+            if op == 0:
+                player.add_modifier(index, rng.randint(-6, 6))
+            elif op == 1:
+                player.apply_modifiers()
+            else:
+                player._set_stat(index, rng.randint(-3, 12))
+            assert player._depleted_stats == _depleted(player)
+            assert player.is_dead() == (_depleted(player) > 0)
+            assert list(player._stat_preview) == [value + modifier for value, modifier
+                                                  in zip(player.stat_values, player.stat_modifiers)]
+    assert player.stat_values.typecode == "i"
+
+# ====== 卡牌编号 ======
+def test_intern_card_ids_are_stable(monkeypatch):
+    for card in game.playable_prototypes():
+        card_id = game.intern_card(card)
+        assert game.intern_card(card) == card_id
+        assert game.card_of(card_id) is card
+    # 新原型拿到下一个编号（在副本注册表里分配，不影响其他测试）
+    monkeypatch.setattr(game, "CARD_REGISTRY", list(game.CARD_REGISTRY))
+    extra = game.Card("测试卡牌", "", stable_effect={"hp": 1})
+    card_id = game.intern_card(extra)
+    assert card_id == len(game.CARD_REGISTRY) - 1
+    assert game.intern_card(extra) == card_id and game.card_of(card_id) is extra
+
+def test_pile_round_trips_to_card_names():
+    deck = game.build_deck_from_prototypes(game.playable_prototypes(), 30, random.Random(1))
+    names = [game.card_of(card_id).name for card_id in deck]
+    # 副本与原型共用编号，转换回编号数组得到同一个牌堆
+    cards = [game.card_of(card_id).clone() for card_id in deck]
+    ids = game.card_ids(cards)
+    assert ids.typecode == "B" and ids == deck
+    assert game.card_ids(ids) == deck
+    assert [card.name for card in cards] == names
+    player = game.Player("p", cards, rng=random.Random(2))
+    with game.headless_mode():
+        player.draw(5)
+    assert player.hand_names() == [game.card_of(card_id).name for card_id in player.hand]
+    assert sorted(player.hand_names() + [game.card_of(card_id).name for card_id in player.deck]) == sorted(names)
@@ -0,0 +1,28 @@
+
+import numpy as np
+
+import gameV1_3_2 as game
+import gameVecEnv as vec
+
+def test_matches_engine_step_by_step():
+    # 固定种子、强制点数，每一步之后两边的完整状态一致
+    assert vec.check_against_match(range(40)) == []
+    assert vec.check_against_match(range(40), deck_size=30) == []
+
+def test_delayed_effects_beyond_initial_slots():
+    with game.headless_mode():
+        match = game.Match(deck_size=30, seed=1)
+    player, seat = match.current, match.current_index
+    chicken = next(card.card_id for card in game.CARD_REGISTRY if card.name == "鸡机")
+    player._own_piles()
+    player.hand[0] = chicken
+    player._rehash()
+    player._delayed_effects = [(match.turn + 2, game.chicken_machine_payoff)] * vec.MAX_DELAYED
+    env = vec.VecCardGameEnv(1, deck_size=30, seed=1)
+    env.load([match])
+    env.step(np.array([0]))
+    with game.headless_mode():
+        match.step(0)
+    timers = env.delay_turn[:, 0, seat]
+    assert (timers >= 0).sum() == vec.MAX_DELAYED + 1
+    assert vec._first_difference(match, env) is None
@@ -0,0 +1,37 @@
+import random
+
+import gameV1_3_2 as game
+import gameAI
+import gameLog
+import gameReplay
+import gameViewer
+
+def _long_match(min_turns=40, keyframe_turns=8):
+    # 贪心策略对打的局比随机策略长；找一局至少 min_turns 回合的记录
+    for seed in range(1000):
+        recorder = gameLog.MatchRecorder(keyframe_turns=keyframe_turns)
+        random.seed(seed)
+        _, turns = game.simulate_match(30, gameAI.greedy_policy, 500, events=recorder)
+        if turns >= min_turns:
+            return bytes(recorder.buffer), turns
+    raise AssertionError("没有找到足够长的对局")
+
+def test_seek_from_keyframe_matches_replay_from_start():
+    payload, turns = _long_match()
+    viewer = gameViewer.MatchViewer(payload)
+    assert len(viewer.keyframes) >= 4
+    reference = gameReplay.Replay(payload)
+    with game.headless_mode():
+        for turn in range(turns + 1):
+            while reference.match.turn < turn and reference.step():
+                pass
+            assert viewer.seek(turn) is not None
+            assert viewer.match.snapshot() == reference.match.snapshot(), turn
+            assert viewer.match.zobrist_key() == reference.match.zobrist_key(), turn
+
+def test_replay_from_each_keyframe_reaches_the_end():
+    payload, _ = _long_match()
+    for _, offset in gameViewer.MatchViewer(payload).keyframes:
+        replay = gameReplay.Replay(payload, offset)
+        assert replay.run()
+        assert replay.ok and replay.match.done